@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.auth import RegisterRequest, LoginRequest, TokenResponse
+from app.services import async_user
+from app.utils.security import create_access_token, oauth_scheme
+from app.utils.db_utils.async_database import get_async_db
+
+async_auth_router = APIRouter()
+
+
+@async_auth_router.post("/register", response_model=TokenResponse)
+async def register(data: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await async_user.register_user(db, data)
+    token = create_access_token({"sub": user.username})
+    return {"access_token": token}
+
+
+@async_auth_router.post("/login", response_model=TokenResponse)
+async def login(data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    user = await async_user.authenticate_user(db, data.username, data.password)
+    token = create_access_token({"sub": user.username})
+    return {"access_token": token}
+
+
+@async_auth_router.post("/refresh", response_model=TokenResponse)
+async def refresh(token: str = Depends(oauth_scheme), db: AsyncSession = Depends(get_async_db)):
+    payload = await async_user.verify_token(db, token)
+    new_token = create_access_token({"sub": payload["sub"]})
+    return {"access_token": new_token}
+
+
+@async_auth_router.post("/logout")
+async def logout(token: str = Depends(oauth_scheme), db: AsyncSession = Depends(get_async_db)):
+    await async_user.blacklist_token(db, token)
+    return {"message": "Successfully logged out"}
@@ -0,0 +1,291 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.events import EventUpdate, EventCreate, EventOut, PermissionOut, PermissionShare, PermissionUpdate, \
+    VersionOut, EventBatchUpdate, BatchItemResult, BulkShare
+from app.schemas.user import RoleEnum
+from app.models.user import User
+from app.utils.db_utils.async_database import get_async_db
+from app.services.async_user import get_current_user
+from app.utils.role_config import can_view, can_edit, can_delete, can_share
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from app.utils.streaming import STREAM_BATCH_SIZE, wants_ndjson, ndjson_response
+from app.utils.serialization import json_response
+from app.utils.etags import event_etag, changelog_etag, permissions_etag, if_match, not_modified
+from app.services import async_events as events
+from app.services import events as sync_events
+
+# Mirrors app.api.events with `async def` handlers. Event ids use the `:int` convertor so that
+# static paths which only exist on the sync router (e.g. /batch) still fall through to it.
+async_events_router = APIRouter()
+
+
+async def _require(db: AsyncSession, user: User, event_id: int, check):
+    role = await events.get_user_role(db, user.id, event_id)
+    if not check(role):
+        raise HTTPException(status_code=403, detail="Permission denied")
+
+
+@async_events_router.post("/", response_model=EventOut, status_code=201)
+async def create_event(
+        event_in: EventCreate,
+        check_conflicts: bool = False,
+        attendee: Optional[list[int]] = Query(None),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    if check_conflicts:
+        await events.check_new_event(db, current_user, event_in, attendee)
+    return json_response(await events.create_event(db=db, user=current_user, event_in=event_in), EventOut, 201)
+
+
+@async_events_router.get("/", response_model=list[EventOut])
+async def list_events(
+        request: Request,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        role: Optional[list[RoleEnum]] = Query(None),
+        permissions_limit: Optional[int] = Query(None, ge=0),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    filters = dict(
+        after=decode_cursor(cursor) if cursor else None,
+        start=start,
+        end=end,
+        roles=[r.value for r in role] if role else None,
+        permissions_limit=permissions_limit,
+    )
+    if wants_ndjson(request):
+        # Streams the whole result set (or `limit` rows) with constant memory.
+        return ndjson_response(
+            lambda session: sync_events.stream_events(session, current_user, STREAM_BATCH_SIZE, limit=limit, **filters),
+            EventOut,
+        )
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    page = await events.list_events(db=db, user=current_user, limit=limit + 1, **filters)
+    headers = {}
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(page[-1].start_time, page[-1].id)
+    return json_response(page, EventOut, headers=headers)
+
+
+async def _event_state(db: AsyncSession, event_id: int):
+    state = await events.get_event_state(db, event_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return state
+
+
+@async_events_router.get("/{event_id:int}", response_model=EventOut)
+async def get_event(
+        event_id: int,
+        request: Request,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    await _require(db, current_user, event_id, can_view)
+    state = await _event_state(db, event_id)
+    etag = event_etag(event_id, state.current_version, state.permissions_version)
+    return not_modified(request, etag) or json_response(await events.get_event_by_id(db, event_id), EventOut,
+                                                        headers={"ETag": etag})
+
+
+@async_events_router.put("/{event_id:int}", response_model=EventOut)
+async def update_event(
+        event_id: int,
+        event_in: EventUpdate,
+        request: Request,
+        check_conflicts: bool = False,
+        attendee: Optional[list[int]] = Query(None),
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    await _require(db, current_user, event_id, can_edit)
+    if check_conflicts:
+        await events.check_event_update(db, event_id, event_in, attendee)
+    return json_response(await events.update_event(db, event_id, event_in, if_match(request)), EventOut)
+
+
+@async_events_router.delete("/{event_id:int}", status_code=204)
+async def delete_event(
+        event_id: int,
+        request: Request,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    await _require(db, current_user, event_id, can_delete)
+    await events.delete_event(db, event_id, if_match(request))
+    return {"message": "event deleted successfully"}
+
+
+@async_events_router.post("/batch", response_model=list[EventOut])
+async def create_events_batch(
+        events_in: list[EventCreate],
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    return json_response(await events.create_events_batch(db=db, user=current_user, events_in=events_in), EventOut)
+
+
+@async_events_router.post("/batch/update", response_model=list[BatchItemResult])
+async def update_events_batch(
+        items: list[EventBatchUpdate],
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    return json_response(await events.update_events_batch(db, current_user, items), BatchItemResult)
+
+
+@async_events_router.post("/batch/delete", response_model=list[BatchItemResult])
+async def delete_events_batch(
+        event_ids: list[int],
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    return json_response(await events.delete_events_batch(db, current_user, event_ids), BatchItemResult)
+
+
+@async_events_router.post("/batch/share", response_model=list[BatchItemResult])
+async def share_events(
+        share: BulkShare,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    return json_response(await events.share_events(db, current_user, share.event_ids, share.shares), BatchItemResult)
+
+
+@async_events_router.post('/{event_id:int}/share', response_model=list[PermissionOut])
+async def share_permission(
+        event_id: int,
+        event_share: list[PermissionShare],
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    await _require(db, current_user, event_id, can_share)
+    return json_response(await events.share_permission(db=db, event_id=event_id, event_share=event_share),
+                         PermissionOut)
+
+
+@async_events_router.get('/{event_id:int}/permissions', response_model=list[PermissionOut])
+async def list_all_permissions(
+        event_id: int,
+        request: Request,
+        db: AsyncSession = Depends(get_async_db),
+):
+    etag = permissions_etag(event_id, (await _event_state(db, event_id)).permissions_version)
+    return not_modified(request, etag) or json_response(await events.get_event_permissions(db=db, event_id=event_id),
+                                                        PermissionOut, headers={"ETag": etag})
+
+
+@async_events_router.put('/{event_id:int}/permissions/{user_id:int}', response_model=PermissionOut)
+async def update_permission(
+        event_id: int,
+        user_id: int,
+        update: PermissionUpdate,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    await _require(db, current_user, event_id, can_share)
+    updated = await events.update_user_permission(db=db, event_id=event_id, user_id=user_id, update=update)
+    if not updated:
+        raise HTTPException(status_code=404, detail="Permission not found")
+    return json_response(updated, PermissionOut)
+
+
+@async_events_router.delete("/{event_id:int}/permissions/{user_id:int}", status_code=204)
+async def delete_permission(event_id: int,
+                            user_id: int,
+                            db: AsyncSession = Depends(get_async_db),
+                            current_user: User = Depends(get_current_user)
+                            ):
+    await _require(db, current_user, event_id, can_delete)
+    deleted = await events.delete_user_permission(db, event_id, user_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Permission not found")
+    return {"message": f"Permission deleted for User: {user_id}"}
+
+
+@async_events_router.get("/{event_id:int}/history/{version_id:int}", response_model=VersionOut)
+async def get_version(event_id: int,
+                      version_id: int,
+                      db: AsyncSession = Depends(get_async_db)
+                      ):
+    version = await events.get_event_version(db, event_id, version_id)
+    if not version:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return json_response(version, VersionOut)
+
+
+@async_events_router.post("/{event_id:int}/rollback/{version_id:int}", response_model=EventOut)
+async def rollback_version(event_id: int,
+                           version_id: int,
+                           db: AsyncSession = Depends(get_async_db)
+                           ):
+    rolled_back_event = await events.rollback_event_version(db, event_id, version_id)
+    if not rolled_back_event:
+        raise HTTPException(status_code=404, detail="Version or event not found")
+    return json_response(rolled_back_event, EventOut)
+
+
+@async_events_router.get("/{event_id:int}/changelog", response_model=list[VersionOut])
+async def get_event_changelog(
+        event_id: int,
+        request: Request,
+        include_archived: bool = False,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    await _require(db, current_user, event_id, can_view)
+    if wants_ndjson(request):
+        return ndjson_response(
+            lambda session: sync_events.stream_event_versions(session, event_id, STREAM_BATCH_SIZE,
+                                                              include_archived),
+            VersionOut,
+        )
+    state = await _event_state(db, event_id)
+    etag = changelog_etag(event_id, state.current_version, state.archived_versions, include_archived)
+    response = not_modified(request, etag)
+    if response:
+        return response
+    versions = await events.get_all_event_versions(db=db, event_id=event_id, include_archived=include_archived)
+    if not versions:
+        raise HTTPException(status_code=404, detail="No changelog found")
+    return json_response(versions, VersionOut, headers={"ETag": etag})
+
+
+@async_events_router.get("/{event_id:int}/diff/{version_id1:int}/{version_id2:int}")
+async def get_event_diff(
+        event_id: int,
+        version_id1: int,
+        version_id2: int,
+        db: AsyncSession = Depends(get_async_db)
+):
+    diff = await events.diff_event_versions_by_id(db, event_id, version_id1, version_id2)
+    if not diff:
+        raise HTTPException(status_code=404, detail="One or both versions not found")
+    return diff
+
+
+@async_events_router.get("/{event_id:int}/diff")
+async def get_event_range_diff(
+        event_id: int,
+        from_version: int = Query(..., ge=1),
+        to_version: int = Query(..., ge=1),
+        steps: bool = False,
+        text: bool = False,
+        db: AsyncSession = Depends(get_async_db),
+        current_user: User = Depends(get_current_user),
+):
+    await _require(db, current_user, event_id, can_view)
+    diff = await events.diff_event_versions(db, event_id, from_version, to_version, steps=steps, text=text)
+    if not diff:
+        raise HTTPException(status_code=404, detail="One or both versions not found")
+    return diff
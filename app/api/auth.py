@@ -10,14 +10,14 @@ auth_router = APIRouter()
 
 
 @auth_router.post("/register", response_model=TokenResponse)
-def register(data: RegisterRequest, db: Session = Depends(get_db)):
-    user = register_user(db, data)
+async def register(data: RegisterRequest):
+    user = await register_user(data)
     token = create_access_token({"sub": user.username})
     return {"access_token": token}
 
 @auth_router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
-    user = authenticate_user(db, data.username, data.password)
+async def login(data: LoginRequest):
+    user = await authenticate_user(data.username, data.password)
     token = create_access_token({"sub": user.username})
     return {"access_token": token}
 
@@ -1,108 +1,304 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
 from app.schemas.events import EventUpdate, EventCreate, EventOut, PermissionOut, PermissionShare, PermissionUpdate, \
-    VersionOut
+    VersionOut, OccurrenceOut, FreeBusyOut, EventBatchUpdate, BatchItemResult, BulkShare, ImportJobOut, \
+    SearchResultOut
 from app.models.user import User
-from app.utils.db_utils.database import get_db
+from app.schemas.user import RoleEnum
+from app.utils.db_utils.database import get_read_db
+from app.utils.db_utils.writer import write
 from app.services.user import get_current_user
 from app.utils.role_config import get_user_role, can_view, can_edit, can_delete, can_share
-from app.services import events
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from app.utils.streaming import STREAM_BATCH_SIZE, wants_ndjson, ndjson_response, stream_response, iter_body
+from app.utils.serialization import json_response, precompile
+from app.utils.etags import event_etag, changelog_etag, permissions_etag, if_match, not_modified
+from app.services import events, recurrence, availability, transfer, search, change_log
 
 events_router = APIRouter()
 
+precompile(EventOut, PermissionOut, VersionOut, BatchItemResult, ImportJobOut, SearchResultOut)
+
 
 @events_router.post("/", response_model=EventOut, status_code=201)
 def create_event(
         event_in: EventCreate,
-        db: Session = Depends(get_db),
+        check_conflicts: bool = False,
+        attendee: Optional[list[int]] = Query(None),
+        db: Session = Depends(get_read_db),
         current_user: User = Depends(get_current_user),
 ):
-    return events.create_event(db=db, user=current_user, event_in=event_in)
+    # With check_conflicts, 409 if the event overlaps anything on the owner's or attendees' calendars.
+    if check_conflicts:
+        availability.check_new_event(db, current_user, event_in, attendee)
+    return json_response(write(events.create_event, current_user, event_in, schema=EventOut), EventOut, 201)
 
 
 @events_router.get("/", response_model=list[EventOut])
 def list_events(
-        db: Session = Depends(get_db),
+        request: Request,
+        limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        role: Optional[list[RoleEnum]] = Query(None),
+        permissions_limit: Optional[int] = Query(None, ge=0),
+        db: Session = Depends(get_read_db),
+        current_user: User = Depends(get_current_user),
+):
+    # permissions_limit=0 returns events with an empty permissions list; N keeps the first N per event.
+    filters = dict(
+        after=decode_cursor(cursor) if cursor else None,
+        start=start,
+        end=end,
+        roles=[r.value for r in role] if role else None,
+        permissions_limit=permissions_limit,
+    )
+    if wants_ndjson(request):
+        # Streams the whole result set (or `limit` rows) with constant memory.
+        return ndjson_response(
+            lambda session: events.stream_events(session, current_user, STREAM_BATCH_SIZE, limit=limit, **filters),
+            EventOut,
+        )
+
+    limit = limit or DEFAULT_PAGE_SIZE
+    # One extra row tells us whether another page exists; its cursor goes out in X-Next-Cursor.
+    page = events.list_events(db=db, user=current_user, limit=limit + 1, **filters)
+    headers = {}
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(page[-1].start_time, page[-1].id)
+    return json_response(page, EventOut, headers=headers)
+
+
+@events_router.get("/occurrences", response_model=list[OccurrenceOut])
+def list_occurrences(
+        start: datetime,
+        end: datetime,
+        db: Session = Depends(get_read_db),
+        current_user: User = Depends(get_current_user),
+):
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=recurrence.RECURRENCE_MAX_WINDOW_DAYS):
+        raise HTTPException(status_code=400,
+                            detail=f"Window may span at most {recurrence.RECURRENCE_MAX_WINDOW_DAYS} days")
+    return recurrence.list_occurrences(db=db, user=current_user, start=start, end=end)
+
+
+@events_router.get("/freebusy", response_model=list[FreeBusyOut])
+def free_busy(
+        start: datetime,
+        end: datetime,
+        user_id: list[int] = Query(...),
+        db: Session = Depends(get_read_db),
+        current_user: User = Depends(get_current_user),
+):
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if len(user_id) > availability.FREEBUSY_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {availability.FREEBUSY_MAX_USERS} users per request")
+    return availability.free_busy(db, list(dict.fromkeys(user_id)), start, end)
+
+
+@events_router.get("/search", response_model=list[SearchResultOut])
+def search_events(
+        q: str,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        offset: int = Query(0, ge=0),
+        db: Session = Depends(get_read_db),
+        current_user: User = Depends(get_current_user),
+):
+    # Ranked results are paged by offset; X-Next-Offset is set while more remain.
+    page = search.search_events(db, current_user, q, limit=limit + 1, offset=offset)
+    headers = {}
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Offset"] = str(offset + limit)
+    return json_response(page, SearchResultOut, headers=headers)
+
+
+@events_router.get("/changes")
+async def change_feed(
+        request: Request,
+        since: Optional[int] = Query(None, ge=0),
+        current_user: User = Depends(get_current_user),
+):
+    # An EventSource reconnecting sends Last-Event-ID, which is newer than whatever `since` it was opened with.
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id:
+        if not last_event_id.isdigit():
+            raise HTTPException(status_code=400, detail="Last-Event-ID must be a change seq")
+        since = int(last_event_id)
+    return StreamingResponse(change_log.stream_changes(current_user.id, since), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+TransferFormat = Literal["ndjson", "csv", "ics"]
+
+
+# Export and import manage their own sessions and threads, so the async router serves them from here too.
+@events_router.get("/export")
+def export_events(
+        fmt: TransferFormat = Query("ndjson", alias="format"),
+        current_user: User = Depends(get_current_user),
+):
+    # Streamed a chunk of events (with their versions, for NDJSON) at a time, so memory stays flat.
+    return stream_response(
+        lambda session: transfer.export_events(session, current_user, fmt),
+        transfer.EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="events.{fmt}"'},
+    )
+
+
+@events_router.post("/import", response_model=ImportJobOut)
+async def import_events(
+        request: Request,
+        fmt: TransferFormat = Query("ndjson", alias="format"),
+        job_id: Optional[int] = None,
+        current_user: User = Depends(get_current_user),
+):
+    # The body is parsed as it arrives and committed IMPORT_CHUNK_SIZE events at a time. 422 if a record is
+    # invalid (the job's error says which); send the same file again with job_id to continue from there.
+    job = await run_in_threadpool(transfer.import_upload, current_user, fmt, iter_body(request), job_id)
+    return json_response(job, ImportJobOut, 422 if job.status == "failed" else 200)
+
+
+@events_router.get("/import/{job_id}", response_model=ImportJobOut)
+def get_import_job(
+        job_id: int,
+        db: Session = Depends(get_read_db),
         current_user: User = Depends(get_current_user),
 ):
-    return events.list_events(db=db, user=current_user)
+    return json_response(transfer.get_import_job(db, current_user, job_id), ImportJobOut)
+
+
+def _event_state(db: Session, event_id: int):
+    state = events.get_event_state(db, event_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return state
 
 
 @events_router.get("/{event_id}", response_model=EventOut)
 def get_event(
         event_id: int,
-        db: Session = Depends(get_db),
+        request: Request,
+        db: Session = Depends(get_read_db),
         current_user: User = Depends(get_current_user),
 ):
-    event = events.get_event_by_id(db, event_id)
-    role = get_user_role(current_user.id, event)
+    role = get_user_role(db, current_user.id, event_id)
     if not can_view(role):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    return event
+    # The ETag comes from two counters on the events row; a matching If-None-Match is answered
+    # before the event and its permissions are loaded.
+    state = _event_state(db, event_id)
+    etag = event_etag(event_id, state.current_version, state.permissions_version)
+    return not_modified(request, etag) or json_response(events.get_event_by_id(db, event_id), EventOut,
+                                                        headers={"ETag": etag})
 
 
 @events_router.put("/{event_id}", response_model=EventOut)
 def update_event(
         event_id: int,
         event_in: EventUpdate,
-        db: Session = Depends(get_db),
+        request: Request,
+        check_conflicts: bool = False,
+        attendee: Optional[list[int]] = Query(None),
+        db: Session = Depends(get_read_db),
         current_user: User = Depends(get_current_user),
 ):
-    event = events.get_event_by_id(db, event_id)
-    role = get_user_role(current_user.id, event)
+    role = get_user_role(db, current_user.id, event_id)
     if not can_edit(role):
         raise HTTPException(status_code=403, detail="Permission denied")
+    if check_conflicts:
+        availability.check_event_update(db, event_id, event_in, attendee)
 
-    return events.update_event(db, event_id, event_in)
+    # With If-Match, 412 unless the event still has that ETag when the write runs.
+    return json_response(write(events.update_event, event_id, event_in, if_match(request), schema=EventOut),
+                         EventOut)
 
 
 @events_router.delete("/{event_id}", status_code=204)
 def delete_event(
         event_id: int,
-        db: Session = Depends(get_db),
+        request: Request,
+        db: Session = Depends(get_read_db),
         current_user: User = Depends(get_current_user),
 ):
-    event = events.get_event_by_id(db, event_id)
-    role = get_user_role(current_user.id, event)
+    role = get_user_role(db, current_user.id, event_id)
     if not can_delete(role):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    events.delete_event(db, event_id)
+    write(events.delete_event, event_id, if_match(request))
     return {"message": "event deleted successfully"}
 
 
 @events_router.post("/batch", response_model=list[EventOut])
 def create_events_batch(
         events_in: list[EventCreate],
-        db: Session = Depends(get_db),
         current_user: User = Depends(get_current_user),
 ):
-    return events.create_events_batch(db=db, user=current_user, events_in=events_in)
+    return json_response(write(events.create_events_batch, current_user, events_in, schema=EventOut), EventOut)
+
+
+# Per-item status in the body (200/204, 403 without the role, 400 for a repeated id); the permitted
+# items are applied together in one transaction.
+@events_router.post("/batch/update", response_model=list[BatchItemResult])
+def update_events_batch(
+        items: list[EventBatchUpdate],
+        current_user: User = Depends(get_current_user),
+):
+    return json_response(write(events.update_events_batch, current_user, items), BatchItemResult)
+
+
+@events_router.post("/batch/delete", response_model=list[BatchItemResult])
+def delete_events_batch(
+        event_ids: list[int],
+        current_user: User = Depends(get_current_user),
+):
+    return json_response(write(events.delete_events_batch, current_user, event_ids), BatchItemResult)
+
+
+@events_router.post("/batch/share", response_model=list[BatchItemResult])
+def share_events(
+        share: BulkShare,
+        current_user: User = Depends(get_current_user),
+):
+    # Every share goes to every event the caller may share; 404 if any recipient does not exist.
+    return json_response(write(events.share_events, current_user, share.event_ids, share.shares), BatchItemResult)
 
 
 @events_router.post('/{event_id}/share', response_model=list[PermissionOut])
 def share_permission(
         event_id: int,
         event_share: list[PermissionShare],
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         current_user: User = Depends(get_current_user),
 ):
-    event = events.get_event_by_id(db, event_id)
-    role = get_user_role(current_user.id, event)
+    role = get_user_role(db, current_user.id, event_id)
     if not can_share(role):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    return events.share_permission(db=db, event_id=event_id, event_share=event_share)
+    return json_response(write(events.share_permission, event_id, event_share, schema=PermissionOut), PermissionOut)
 
 
 @events_router.get('/{event_id}/permissions', response_model=list[PermissionOut])
 def list_all_permissions(
         event_id: int,
-        db: Session = Depends(get_db),
+        request: Request,
+        db: Session = Depends(get_read_db),
 ):
-    return events.get_event_permissions(db=db, event_id=event_id)
+    etag = permissions_etag(event_id, _event_state(db, event_id).permissions_version)
+    return not_modified(request, etag) or json_response(events.get_event_permissions(db=db, event_id=event_id),
+                                                        PermissionOut, headers={"ETag": etag})
 
 
 @events_router.put('/{event_id}/permissions/{user_id}', response_model=PermissionOut)
@@ -110,32 +306,29 @@ def update_permission(
         event_id: int,
         user_id: int,
         update: PermissionUpdate,
-        db: Session = Depends(get_db),
+        db: Session = Depends(get_read_db),
         current_user: User = Depends(get_current_user),
 ):
-    event = events.get_event_by_id(db, event_id)
-    role = get_user_role(current_user.id, event)
+    role = get_user_role(db, current_user.id, event_id)
     if not can_share(role):
         raise HTTPException(status_code=403, detail="Permission denied")
 
-    updated = events.update_user_permission(db=db, event_id=event_id,
-                                            user_id=user_id, update=update)
+    updated = write(events.update_user_permission, event_id, user_id, update, schema=PermissionOut)
     if not updated:
         raise HTTPException(status_code=404, detail="Permission not found")
-    return updated
+    return json_response(updated, PermissionOut)
 
 
-@events_router.delete("{event_id}/permissions/{user_id}", status_code=204)
+@events_router.delete("/{event_id}/permissions/{user_id}", status_code=204)
 def delete_permission(event_id: int,
                       user_id: int,
-                      db: Session = Depends(get_db),
+                      db: Session = Depends(get_read_db),
                       current_user: User = Depends(get_current_user)
                       ):
-    event = events.get_event_by_id(db, event_id)
-    role = get_user_role(current_user.id, event)
+    role = get_user_role(db, current_user.id, event_id)
     if not can_delete(role):
         raise HTTPException(status_code=403, detail="Permission denied")
-    deleted = events.delete_user_permission(db, event_id, user_id)
+    deleted = write(events.delete_user_permission, event_id, user_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Permission not found")
     return {"message": f"Permission deleted for User: {user_id}"}
@@ -144,39 +337,49 @@ def delete_permission(event_id: int,
 @events_router.get("/{event_id}/history/{version_id}", response_model=VersionOut)
 def get_version(event_id: int,
                 version_id: int,
-                db: Session = Depends(get_db)
+                db: Session = Depends(get_read_db)
                 ):
     version = events.get_event_version(db, event_id, version_id)
     if not version:
         raise HTTPException(status_code=404, detail="Version not found")
-    return version
+    return json_response(version, VersionOut)
 
 
 @events_router.post("/{event_id}/rollback/{version_id}", response_model=EventOut)
 def rollback_version(event_id: int,
                      version_id: int,
-                     db: Session = Depends(get_db)
                      ):
-    rolled_back_event = events.rollback_event_version(db, event_id, version_id)
+    rolled_back_event = write(events.rollback_event_version, event_id, version_id, schema=EventOut)
     if not rolled_back_event:
         raise HTTPException(status_code=404, detail="Version or event not found")
-    return rolled_back_event
+    return json_response(rolled_back_event, EventOut)
 
 
 @events_router.get("/{event_id}/changelog", response_model=list[VersionOut])
 def get_event_changelog(
         event_id: int,
-        db: Session = Depends(get_db),
+        request: Request,
+        include_archived: bool = False,
+        db: Session = Depends(get_read_db),
         current_user: User = Depends(get_current_user),
 ):
-    event = events.get_event_by_id(db, event_id)
-    role = get_user_role(current_user.id, event)
+    role = get_user_role(db, current_user.id, event_id)
     if not can_view(role):
         raise HTTPException(status_code=403, detail="Permission denied")
-    versions = events.get_all_event_versions(db=db, event_id=event_id)
+    if wants_ndjson(request):
+        return ndjson_response(
+            lambda session: events.stream_event_versions(session, event_id, STREAM_BATCH_SIZE, include_archived),
+            VersionOut,
+        )
+    state = _event_state(db, event_id)
+    etag = changelog_etag(event_id, state.current_version, state.archived_versions, include_archived)
+    response = not_modified(request, etag)
+    if response:
+        return response
+    versions = events.get_all_event_versions(db=db, event_id=event_id, include_archived=include_archived)
     if not versions:
         raise HTTPException(status_code=404, detail="No changelog found")
-    return versions
+    return json_response(versions, VersionOut, headers={"ETag": etag})
 
 
 @events_router.get("/{event_id}/diff/{version_id1}/{version_id2}")
@@ -184,15 +387,28 @@ def get_event_diff(
         event_id: int,
         version_id1: int,
         version_id2: int,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_read_db)
 ):
-    v1 = events.get_event_version(db=db, event_id=event_id, version_id=version_id1)
-    v2 = events.get_event_version(db=db, event_id=event_id, version_id=version_id2)
-    if not v1 or not v2:
+    diff = events.diff_event_versions_by_id(db, event_id, version_id1, version_id2)
+    if not diff:
         raise HTTPException(status_code=404, detail="One or both versions not found")
+    return diff
 
-    diff = dict()
-    for column in v1.__table__.columns:
-        diff[column.name] = {'version_1': getattr(v1, column.name), 'version_2': getattr(v2, column.name)}
 
-    return {"diff": diff}
+@events_router.get("/{event_id}/diff")
+def get_event_range_diff(
+        event_id: int,
+        from_version: int = Query(..., ge=1),
+        to_version: int = Query(..., ge=1),
+        steps: bool = False,
+        text: bool = False,
+        db: Session = Depends(get_read_db),
+        current_user: User = Depends(get_current_user),
+):
+    role = get_user_role(db, current_user.id, event_id)
+    if not can_view(role):
+        raise HTTPException(status_code=403, detail="Permission denied")
+    diff = events.diff_event_versions(db, event_id, from_version, to_version, steps=steps, text=text)
+    if not diff:
+        raise HTTPException(status_code=404, detail="One or both versions not found")
+    return diff
@@ -0,0 +1,40 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.services.user import user_cache
+from app.utils import metrics
+from app.utils.db_utils.writer import db_writer
+from app.utils.password_pool import password_pool
+from app.utils.role_config import role_cache
+from app.utils.security import claims_cache
+
+metrics_router = APIRouter()
+
+CACHES = {"role": role_cache, "claims": claims_cache, "user": user_cache}
+
+
+@metrics.register_collector
+def _cache_metrics() -> list[str]:
+    stats = {name: cache.stats() for name, cache in CACHES.items()}
+    lines = []
+    for field in ("hits", "misses"):
+        lines += metrics.counter_lines(f"cache_{field}_total", f"Cache {field} since start.",
+                                       {name: values[field] for name, values in stats.items()}, "cache")
+    lines += metrics.gauge_lines("cache_size", "Entries held.",
+                                 {name: values["size"] for name, values in stats.items()}, "cache")
+    return lines
+
+
+@metrics.register_collector
+def _pool_metrics() -> list[str]:
+    lines = metrics.counter_lines("password_pool_rejected_total", "Password operations rejected with 503.",
+                                  {"password": password_pool.rejected}, "pool")
+    if db_writer is not None:
+        lines += metrics.counter_lines("db_writer_total", "Group-commit writer groups and jobs committed.",
+                                       {"groups": db_writer.groups, "jobs": db_writer.jobs}, "kind")
+    return lines
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,76 @@
+"""Bulk export and import, and other maintenance, from the command line without going through HTTP.
+
+    python -m app.cli export alice --format ics > alice.ics
+    python -m app.cli import alice events.ndjson [--format ndjson] [--job-id 3]
+    python -m app.cli rebuild-search
+"""
+import argparse
+import sys
+
+from fastapi import HTTPException
+
+from app.utils.db_utils.database import init_db, engine, ReadSessionLocal
+from app.utils.db_utils.search_index import rebuild_search_index, search_index_available
+from app.utils.db_utils.writer import db_writer
+from app.services import transfer
+from app.services.user import get_user_by_username
+
+READ_CHUNK_BYTES = 1 << 16
+
+
+def _read_chunks(path: str):
+    with open(path, "rb") if path != "-" else sys.stdin.buffer as f:
+        while chunk := f.read(READ_CHUNK_BYTES):
+            yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write everything the user can see to stdout")
+    export.add_argument("username")
+    export.add_argument("--format", choices=list(transfer.EXPORT_MEDIA_TYPES), default="ndjson")
+    load = commands.add_parser("import", help="import events owned by the user; resumable with --job-id")
+    load.add_argument("username")
+    load.add_argument("path", help="file to import, or - for stdin")
+    load.add_argument("--format", choices=list(transfer.EXPORT_MEDIA_TYPES))
+    load.add_argument("--job-id", type=int)
+    commands.add_parser("rebuild-search", help="rebuild the full-text search index from the events table")
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "rebuild-search":
+        with engine.begin() as conn:
+            if not search_index_available(conn):
+                parser.error("this database has no FTS5 search index")
+            rebuild_search_index(conn)
+        return
+    with ReadSessionLocal() as db:
+        user = get_user_by_username(db, args.username)
+        if user is None:
+            parser.error(f"no user {args.username!r}")
+
+    try:
+        if args.command == "export":
+            with ReadSessionLocal() as db:
+                for chunk in transfer.export_events(db, user, args.format):
+                    sys.stdout.buffer.write(chunk)
+            return
+        fmt = args.format or args.path.rsplit(".", 1)[-1]
+        if fmt not in transfer.EXPORT_MEDIA_TYPES:
+            parser.error("--format is required when the file extension is not ndjson, csv or ics")
+        job = transfer.import_upload(user, fmt, _read_chunks(args.path), args.job_id)
+    except HTTPException as exc:
+        parser.error(exc.detail)
+    finally:
+        if db_writer is not None:
+            db_writer.shutdown()
+    print(f"job {job.id}: {job.status}, {job.rows_done} records, {job.events_created} events, "
+          f"{job.rows_per_second:.0f} rows/s", file=sys.stderr)
+    if job.error:
+        print(job.error, file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
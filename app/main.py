@@ -1,22 +1,97 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.routing import APIRoute
 from fastapi.security import HTTPBearer
-from app.utils.db_utils.database import Base, engine
+from app.utils.db_utils.database import init_db, ASYNC_MODE, SessionLocal
+from app.utils.revocation import revocation_store
+from app.utils.password_pool import password_pool
+from app.utils.db_utils.writer import db_writer
+from app.utils.background import periodic
+from app.services.recurrence import RECURRENCE_REFRESH_INTERVAL, refresh_all_occurrences
+from app.services.retention import RETENTION_ENABLED, VERSION_RETENTION_INTERVAL, apply_retention
+from app.services.change_log import CHANGE_LOG_PRUNE_INTERVAL, start_feed, prune_change_log, relay_changes
+from app.utils.invalidation import MULTI_WORKER, INVALIDATION_POLL_INTERVAL, INVALIDATION_KEEP_SECONDS, \
+    start_invalidations, apply_invalidations, prune_invalidations
 from app.api.auth import auth_router
 from app.api.events import events_router
+from app.utils.metrics import METRICS_ENABLED, MetricsMiddleware
+from app.serve import SHUTDOWN_TIMEOUT
 import uvicorn
 import os
 
 
-# Create all DB tables
-Base.metadata.create_all(bind=engine)
+# Create all DB tables and indexes
+init_db()
+
+
+
+def follow_other_workers(db):
+    apply_invalidations(db)
+    relay_changes(db)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with SessionLocal() as db:
+        # Cursors first, so a revocation made while the store loads is applied rather than missed.
+        start_invalidations(db)
+        revocation_store.load(db)
+        # Changes from here on are all in the replay buffer; anything older is read from change_log.
+        start_feed(db)
+    # First run backfills occurrences for events created before the index existed.
+    tasks = [asyncio.create_task(periodic(RECURRENCE_REFRESH_INTERVAL, refresh_all_occurrences))]
+    if RETENTION_ENABLED:
+        tasks.append(asyncio.create_task(periodic(VERSION_RETENTION_INTERVAL, apply_retention)))
+    tasks.append(asyncio.create_task(periodic(CHANGE_LOG_PRUNE_INTERVAL, prune_change_log)))
+    if MULTI_WORKER:
+        tasks.append(asyncio.create_task(periodic(INVALIDATION_POLL_INTERVAL, follow_other_workers)))
+        tasks.append(asyncio.create_task(periodic(INVALIDATION_KEEP_SECONDS, prune_invalidations)))
+    yield
+    for task in tasks:
+        task.cancel()
+    if db_writer is not None:
+        db_writer.shutdown()
+    password_pool.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+if METRICS_ENABLED:
+    from app.api.metrics import metrics_router
+
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics_router)
+if ASYNC_MODE:
+    from app.api.async_auth import async_auth_router
+    from app.api.async_events import async_events_router
+
+    app.include_router(async_auth_router, prefix='/api/auth', tags=['Authentication'])
+    app.include_router(async_events_router, prefix="/api/events", tags=["Events"])
 app.include_router(auth_router,prefix='/api/auth',tags=['Authentication'])
 app.include_router(events_router,prefix="/api/events", tags=["Events"])
 
+
+def drop_shadowed_routes(app: FastAPI):
+    # Routes registered first win, so a sync route with the same path and method as an async one is dead.
+    seen = set()
+    routes = []
+    for route in app.router.routes:
+        if isinstance(route, APIRoute):
+            key = (route.path_format, frozenset(route.methods))
+            if key in seen:
+                continue
+            seen.add(key)
+        routes.append(route)
+    app.router.routes[:] = routes
+
+
+if ASYNC_MODE:
+    drop_shadowed_routes(app)
+
 bearer_scheme = HTTPBearer()
 
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=False)
-
+    # Single process; `python -m app.serve` runs several workers.
+    uvicorn.run("app.main:app", host="0.0.0.0", port=port, reload=False, timeout_graceful_shutdown=SHUTDOWN_TIMEOUT)
@@ -1,11 +1,16 @@
 import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.utils.db_utils.database import Base
 
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        Index("ix_events_start_time_id", "start_time", "id"),
+        Index("ix_events_occurrences_until", "occurrences_until"),
+        Index("ix_events_occurrences_from", "occurrences_from"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -18,6 +23,15 @@ class Event(Base):
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.now())
     updated_at = Column(DateTime)
+    current_version = Column(Integer, default=1)
+    # Bumped on every permission change; with current_version it makes up the event's ETag.
+    permissions_version = Column(Integer, default=1)
+    # Versions moved to the cold archive by retention; part of the changelog's ETag.
+    archived_versions = Column(Integer, default=0)
+    # Occurrences are materialized in event_occurrences up to this instant; NULL means not indexed yet.
+    occurrences_until = Column(DateTime, nullable=True)
+    # ...and from this instant; NULL means from the event's start. Older windows are expanded on the fly.
+    occurrences_from = Column(DateTime, nullable=True)
 
     owner = relationship("User", back_populates="events")
     permissions = relationship("Permission", back_populates="event")
@@ -26,6 +40,9 @@ class Event(Base):
 
 class EventVersion(Base):
     __tablename__ = "event_versions"
+    __table_args__ = (
+        Index("ix_event_versions_event_version", "event_id", "version_number"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     event_id = Column(Integer, ForeignKey("events.id"))
@@ -39,5 +56,74 @@ class EventVersion(Base):
     recurrence_pattern = Column(String, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # JSON list of the fields stored in this row; NULL marks a full snapshot (checkpoint).
+    changed_fields = Column(Text, nullable=True)
 
     event = relationship("Event", back_populates="versions")
+
+
+class EventVersionArchive(Base):
+    """Where a pruned version sits in the archive file: a gzip member holding one event's versions."""
+    __tablename__ = "event_version_archive"
+    __table_args__ = (
+        Index("ix_event_version_archive_event_version", "event_id", "version_number"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(Integer, nullable=False)
+    version_id = Column(Integer, nullable=False)
+    version_number = Column(Integer, nullable=False)
+    offset = Column(Integer, nullable=False)
+    length = Column(Integer, nullable=False)
+
+
+class EventOccurrence(Base):
+    __tablename__ = "event_occurrences"
+    __table_args__ = (
+        Index("ix_event_occurrences_event_end", "event_id", "end_time"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("events.id"), nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+
+
+class ImportJob(Base):
+    """Progress of one import; committed with each chunk of events, so a failed upload resumes where it stopped."""
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    format = Column(String, nullable=False)
+    # running, done or failed
+    status = Column(String, nullable=False, default="running")
+    # Records consumed from the upload, including ones that are not events (e.g. exported versions).
+    rows_done = Column(Integer, nullable=False, default=0)
+    events_created = Column(Integer, nullable=False, default=0)
+    elapsed_seconds = Column(Float, nullable=False, default=0.0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    updated_at = Column(DateTime, nullable=True)
+
+
+class ChangeLog(Base):
+    """One row per change to an event; `seq` orders the change feed and is what clients resume from."""
+    __tablename__ = "change_log"
+    __table_args__ = (
+        Index("ix_change_log_user_seq", "user_id", "seq"),
+        Index("ix_change_log_event_seq", "event_id", "seq"),
+        # AUTOINCREMENT, so a seq is never handed out again after pruning emptied the end of the table.
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True)
+    # NULL: everyone holding a permission on the event when the change is read. Set for the changes that end
+    # a user's access (permission.revoked, event.deleted), which no permission row is left to find.
+    user_id = Column(Integer, nullable=True)
+    event_id = Column(Integer, nullable=False)
+    # event.created, event.updated, event.deleted, permission.updated or permission.revoked
+    type = Column(String, nullable=False)
+    # The event's current_version after the change, for event.created and event.updated.
+    version = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.now)
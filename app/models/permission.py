@@ -1,14 +1,35 @@
-from sqlalchemy import Column, Integer, ForeignKey, String, UniqueConstraint
+from sqlalchemy import Column, Integer, ForeignKey, String, UniqueConstraint, Index, DateTime
 from sqlalchemy.orm import relationship
 from app.utils.db_utils.database import Base
 
+DEDUPLICATE = """
+DELETE FROM permissions WHERE id NOT IN (
+    SELECT id FROM (
+        SELECT id, ROW_NUMBER() OVER (
+            PARTITION BY event_id, user_id
+            ORDER BY CASE role WHEN 'owner' THEN 0 WHEN 'editor' THEN 1 ELSE 2 END, id
+        ) AS rank
+        FROM permissions
+    ) AS ranked WHERE rank = 1
+)"""
+
+
 class Permission(Base):
     __tablename__ = "permissions"
+    __table_args__ = (
+        Index("ix_permissions_user_event", "user_id", "event_id"),
+        # One grant per (event, user); share upserts against it. `deduplicate` runs before the index is
+        # (re)built on an existing database and keeps each pair's strongest role.
+        Index("ix_permissions_event_user", "event_id", "user_id", unique=True, info={"deduplicate": DEDUPLICATE}),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     event_id = Column(Integer, ForeignKey("events.id"))
     role = Column(String, nullable=False)
+    # Copy of the event's start_time, kept by SQLite triggers (see list_index.py) so a user's events
+    # can be paged from one index. NULL on other databases, which page through the events join instead.
+    start_time = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="permissions")
     event = relationship("Event", back_populates="permissions")
\ No newline at end of file
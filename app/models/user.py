@@ -18,9 +18,21 @@ class User(Base):
     permissions = relationship("Permission",back_populates="user")
 
 
-class BlacklistedToken(Base):
-    __tablename__ = "blacklisted_tokens"
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
-    token = Column(String, unique=True, index=True, nullable=False)
-    blacklisted_at = Column(DateTime, default=datetime.datetime.utcnow)
+    jti = Column(String, unique=True, index=True, nullable=False)
+    expires_at = Column(DateTime, index=True, nullable=False)
+    revoked_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+
+class Invalidation(Base):
+    """A cache entry the other worker processes must drop or refresh; see app.utils.invalidation."""
+    __tablename__ = "invalidations"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    cache = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.now)
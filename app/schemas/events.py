@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, computed_field, field_validator
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 from app.schemas.user import RoleEnum
+from app.utils.recurrence import parse_rule
 
 
 class EventBase(BaseModel):
@@ -14,30 +15,66 @@ class EventBase(BaseModel):
     recurrence_pattern: Optional[str] = None
 
 
-class EventCreate(EventBase):
+class EventIn(EventBase):
+    @field_validator("recurrence_pattern")
+    @classmethod
+    def check_recurrence_pattern(cls, value: Optional[str]) -> Optional[str]:
+        if value:
+            parse_rule(value)
+        return value
+
+
+class EventCreate(EventIn):
     pass
 
 
-class EventUpdate(EventBase):
+class EventUpdate(EventIn):
     pass
 
 
+class EventBatchUpdate(EventUpdate):
+    id: int
+
+
+class BatchItemResult(BaseModel):
+    id: int
+    status: int
+    detail: Optional[str] = None
+
+
+class OccurrenceOut(BaseModel):
+    event_id: int
+    title: str
+    location: Optional[str] = None
+    start_time: datetime
+    end_time: datetime
+    is_recurring: bool
+
+
+class BusyInterval(BaseModel):
+    start_time: datetime
+    end_time: datetime
+
+
+class FreeBusyOut(BaseModel):
+    user_id: int
+    busy: list[BusyInterval]
+
+
 class PermissionSchema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     user_id: int
     role: RoleEnum
 
-    class Config:
-        orm_mode = True
-
 
 class EventOut(EventBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     owner_id: int
     permissions: list[PermissionSchema] | PermissionSchema = None
 
-    class Config:
-        orm_mode = True
-
 
 class PermissionOut(BaseModel):
     id: int
@@ -51,6 +88,11 @@ class PermissionShare(BaseModel):
     role: RoleEnum
 
 
+class BulkShare(BaseModel):
+    event_ids: list[int]
+    shares: list[PermissionShare]
+
+
 class PermissionUpdate(BaseModel):
     role: RoleEnum
 
@@ -61,3 +103,41 @@ class VersionOut(BaseModel):
     version_number: int
     title: str
     created_at: datetime
+
+
+class SearchResultOut(BaseModel):
+    event: EventOut
+    # BM25 score; lower is a better match.
+    rank: float
+    snippet: Optional[str] = None
+
+
+# Export lines carry a `type` so one NDJSON file can hold events and their history.
+class EventExport(EventOut):
+    type: Literal["event"] = "event"
+
+
+class VersionExport(EventBase):
+    type: Literal["version"] = "version"
+    id: int
+    event_id: int
+    version_number: int
+    owner_id: int
+    created_at: Optional[datetime] = None
+
+
+class ImportJobOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    format: str
+    status: str
+    rows_done: int
+    events_created: int
+    elapsed_seconds: float
+    error: Optional[str] = None
+
+    @computed_field
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_done / self.elapsed_seconds if self.elapsed_seconds else 0.0
@@ -0,0 +1,109 @@
+"""Production serving: several uvicorn worker processes accepting connections on one shared socket.
+
+    python -m app.serve [--workers 4] [--host 0.0.0.0] [--port 8000] [--max-requests 10000] [--max-requests-jitter 1000]
+
+Signals to the supervisor: SIGHUP restarts the workers one at a time, each replacement serving before
+the worker it replaces is stopped; SIGTTIN / SIGTTOU add or remove a worker; SIGINT / SIGTERM stop
+gracefully. A worker that exits (e.g. after --max-requests) is replaced.
+"""
+import argparse
+import functools
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import time
+
+import uvicorn
+from uvicorn.supervisors.multiprocess import Multiprocess, Process
+
+logger = logging.getLogger("uvicorn.error")
+
+WORKERS = int(os.environ.get("WORKERS", os.cpu_count() or 1))
+# Recycle a worker after this many requests (0: never), plus up to the jitter so they do not all go at once.
+WORKER_MAX_REQUESTS = int(os.environ.get("WORKER_MAX_REQUESTS", 0))
+# Defaults to a tenth of the limit.
+WORKER_MAX_REQUESTS_JITTER = os.environ.get("WORKER_MAX_REQUESTS_JITTER")
+WORKER_BOOT_TIMEOUT = float(os.environ.get("WORKER_BOOT_TIMEOUT", 60))
+# Change feed streams never finish by themselves; stop waiting for them after this long on shutdown.
+SHUTDOWN_TIMEOUT = int(os.environ.get("SHUTDOWN_TIMEOUT", 10))
+
+
+class _WorkerServer(uvicorn.Server):
+    def __init__(self, config: uvicorn.Config, ready):
+        super().__init__(config)
+        self.ready = ready
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if self.started:
+            self.ready.put(os.getpid())
+
+
+def run_worker(config: uvicorn.Config, ready, jitter: int, sockets=None):
+    if config.limit_max_requests:
+        config.limit_max_requests += random.randint(0, jitter)
+    _WorkerServer(config, ready).run(sockets=sockets)
+
+
+class Supervisor(Multiprocess):
+    """uvicorn's process supervisor with a rolling restart that never leaves fewer than `workers` serving."""
+
+    def __init__(self, config: uvicorn.Config, sockets, jitter: int = 0):
+        self.ready = multiprocessing.get_context("spawn").Queue()
+        super().__init__(config, functools.partial(run_worker, config, self.ready, jitter), sockets)
+
+    def _wait_until_serving(self, process: Process):
+        deadline = time.monotonic() + WORKER_BOOT_TIMEOUT
+        while time.monotonic() < deadline and process.process.is_alive():
+            try:
+                if self.ready.get(timeout=0.5) == process.pid:
+                    return True
+            except queue.Empty:
+                pass
+        return False
+
+    def restart_all(self):
+        for index, old in enumerate(list(self.processes)):
+            new = Process(self.config, self.target, self.sockets)
+            new.start()
+            if not self._wait_until_serving(new):
+                logger.error("Worker [%s] did not start; keeping [%s]", new.pid, old.pid)
+                new.terminate()
+                new.join()
+                continue
+            self.processes[index] = new
+            old.terminate()
+            old.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.serve")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8000)))
+    parser.add_argument("--max-requests", type=int, default=WORKER_MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=WORKER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    # Create the schema once here rather than racing to do it in every worker.
+    from app.utils.db_utils.database import init_db
+    import app.models.events, app.models.permission, app.models.user  # noqa: F401  (register tables)
+
+    init_db()
+    # Inherited by the workers: caches and the change feed follow the other workers' writes.
+    os.environ["MULTI_WORKER"] = "true"
+    # Each worker has its own password hashing pool; together they should not exceed the cores.
+    os.environ.setdefault("PASSWORD_POOL_SIZE", str(max(1, (os.cpu_count() or 1) // args.workers)))
+
+    config = uvicorn.Config("app.main:app", host=args.host, port=args.port, workers=args.workers,
+                            limit_max_requests=args.max_requests or None, log_level=args.log_level,
+                            timeout_graceful_shutdown=SHUTDOWN_TIMEOUT)
+    jitter = args.max_requests // 10 if args.max_requests_jitter is None else args.max_requests_jitter
+    Supervisor(config, sockets=[config.bind_socket()], jitter=jitter).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.events import EventCreate, EventUpdate, EventOut, PermissionOut, PermissionShare, PermissionUpdate, \
+    VersionOut, EventBatchUpdate
+from app.models.user import User
+from app.services import events, availability
+from app.utils import role_config
+from app.utils.db_utils.writer import db_writer, as_schema
+
+
+# The sync service functions run unchanged inside AsyncSession.run_sync. Results are converted to schemas
+# before leaving run_sync, because lazy loads (e.g. Event.permissions) cannot be awaited afterwards.
+async def _run(db: AsyncSession, fn, *args, schema=None, **kwargs):
+    return await db.run_sync(lambda session: as_schema(fn(session, *args, **kwargs), schema))
+
+
+async def _write(db: AsyncSession, fn, *args, schema=None, **kwargs):
+    # With the SQLite group-commit writer, writes are queued to it instead of using this session.
+    if db_writer is not None:
+        return await db_writer.run_async(fn, *args, schema=schema, **kwargs)
+    return await _run(db, fn, *args, schema=schema, **kwargs)
+
+
+async def create_event(db: AsyncSession, user: User, event_in: EventCreate):
+    return await _write(db, events.create_event, user, event_in, schema=EventOut)
+
+
+async def check_new_event(db: AsyncSession, user: User, event_in: EventCreate, attendees: list[int] | None = None):
+    await _run(db, availability.check_new_event, user, event_in, attendees)
+
+
+async def check_event_update(db: AsyncSession, event_id: int, event_in: EventUpdate,
+                             attendees: list[int] | None = None):
+    await _run(db, availability.check_event_update, event_id, event_in, attendees)
+
+
+async def get_event_by_id(db: AsyncSession, event_id: int):
+    return await _run(db, events.get_event_by_id, event_id, schema=EventOut)
+
+
+async def get_event_state(db: AsyncSession, event_id: int):
+    return await _run(db, events.get_event_state, event_id)
+
+
+async def get_user_role(db: AsyncSession, user_id: int, event_id: int) -> str:
+    return await _run(db, role_config.get_user_role, user_id, event_id)
+
+
+async def list_events(db: AsyncSession, user: User, **filters):
+    return await _run(db, events.list_events, user, schema=EventOut, **filters)
+
+
+async def update_event(db: AsyncSession, event_id: int, event_in: EventUpdate, if_match: list[str] | None = None):
+    return await _write(db, events.update_event, event_id, event_in, if_match, schema=EventOut)
+
+
+async def delete_event(db: AsyncSession, event_id: int, if_match: list[str] | None = None):
+    return await _write(db, events.delete_event, event_id, if_match)
+
+
+async def create_events_batch(db: AsyncSession, user: User, events_in: list[EventCreate]):
+    return await _write(db, events.create_events_batch, user, events_in, schema=EventOut)
+
+
+async def update_events_batch(db: AsyncSession, user: User, items: list[EventBatchUpdate]):
+    return await _write(db, events.update_events_batch, user, items)
+
+
+async def delete_events_batch(db: AsyncSession, user: User, event_ids: list[int]):
+    return await _write(db, events.delete_events_batch, user, event_ids)
+
+
+async def share_events(db: AsyncSession, user: User, event_ids: list[int], shares: list[PermissionShare]):
+    return await _write(db, events.share_events, user, event_ids, shares)
+
+
+async def share_permission(db: AsyncSession, event_id: int, event_share: list[PermissionShare]):
+    return await _write(db, events.share_permission, event_id, event_share, schema=PermissionOut)
+
+
+async def get_event_permissions(db: AsyncSession, event_id: int):
+    return await _run(db, events.get_event_permissions, event_id, schema=PermissionOut)
+
+
+async def update_user_permission(db: AsyncSession, event_id: int, user_id: int, update: PermissionUpdate):
+    return await _write(db, events.update_user_permission, event_id, user_id, update, schema=PermissionOut)
+
+
+async def delete_user_permission(db: AsyncSession, event_id: int, user_id: int):
+    return await _write(db, events.delete_user_permission, event_id, user_id)
+
+
+async def get_event_version(db: AsyncSession, event_id: int, version_id: int):
+    return await _run(db, events.get_event_version, event_id, version_id)
+
+
+async def rollback_event_version(db: AsyncSession, event_id: int, version_id: int):
+    return await _write(db, events.rollback_event_version, event_id, version_id, schema=EventOut)
+
+
+async def get_all_event_versions(db: AsyncSession, event_id: int, include_archived: bool = False):
+    return await _run(db, events.get_all_event_versions, event_id, include_archived=include_archived,
+                      schema=VersionOut)
+
+
+async def diff_event_versions(db: AsyncSession, event_id: int, from_version: int, to_version: int,
+                              steps: bool = False, text: bool = False):
+    return await _run(db, events.diff_event_versions, event_id, from_version, to_version, steps=steps, text=text)
+
+
+async def diff_event_versions_by_id(db: AsyncSession, event_id: int, version_id1: int, version_id2: int):
+    return await _run(db, events.diff_event_versions_by_id, event_id, version_id1, version_id2)
@@ -0,0 +1,81 @@
+from fastapi import HTTPException, status, Depends
+from jose import JWTError, ExpiredSignatureError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.user import User
+from app.schemas.auth import RegisterRequest
+from app.utils.db_utils.async_database import get_async_db
+from app.utils.security import password_hash_async, verify_and_rehash_async, oauth_scheme, decode_access_token, token_id
+from app.utils.revocation import revocation_store
+from app.services.user import user_cache
+
+
+async def _get_user(db: AsyncSession, username: str):
+    return (await db.execute(select(User).filter_by(username=username))).scalar_one_or_none()
+
+
+async def register_user(db: AsyncSession, data: RegisterRequest):
+    if await _get_user(db, data.username):
+        raise HTTPException(status_code=400, detail="Username already taken")
+    user = User(
+        username=data.username,
+        email=data.email,
+        hashed_password=await password_hash_async(data.password)
+    )
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await _get_user(db, username)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await verify_and_rehash_async(password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    return user
+
+
+async def get_current_user(token: str = Depends(oauth_scheme), db: AsyncSession = Depends(get_async_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = await verify_token(db, token)
+    username: str = payload.get("sub")
+    if username is None:
+        raise credentials_exception
+
+    user = user_cache.get(username)
+    if user is None:
+        user = await _get_user(db, username)
+        if user is None:
+            raise credentials_exception
+        db.expunge(user)
+        user_cache.set(username, user)
+    return user
+
+
+async def blacklist_token(db: AsyncSession, token: str):
+    payload = await verify_token(db, token)
+    await db.run_sync(revocation_store.revoke, token_id(payload, token), payload["exp"])
+
+
+async def verify_token(db: AsyncSession, token: str):
+    try:
+        payload = decode_access_token(token)
+    except ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if revocation_store.is_revoked(token_id(payload, token)):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been blacklisted")
+    return payload
@@ -0,0 +1,151 @@
+import bisect
+import datetime
+import os
+from collections import defaultdict
+from types import SimpleNamespace
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.events import Event, EventOccurrence
+from app.models.permission import Permission
+from app.models.user import User
+from app.schemas.events import EventCreate, EventUpdate
+from app.services import recurrence
+from app.utils.db_utils.busy_index import occurrences_rtree, busy_index_available
+
+FREEBUSY_MAX_USERS = int(os.environ.get("FREEBUSY_MAX_USERS", 100))
+MAX_REPORTED_CONFLICTS = int(os.environ.get("MAX_REPORTED_CONFLICTS", 50))
+# Cost of one R*Tree window row relative to one per-event seek; see _window_is_narrow.
+BUSY_INDEX_ROW_COST = int(os.environ.get("BUSY_INDEX_ROW_COST", 8))
+EPOCH = datetime.datetime(1970, 1, 1)
+MINUTE = datetime.timedelta(minutes=1)
+
+
+def _minute(value: datetime.datetime, round_up: bool = False) -> int:
+    minutes, remainder = divmod(value - EPOCH, MINUTE)
+    return minutes + 1 if round_up and remainder else minutes
+
+
+def _window_is_narrow(db: Session, user_ids: list[int], first: int, last: int) -> bool:
+    """Whether walking the R*Tree window is cheaper than walking every event the users hold.
+
+    A window row costs about BUSY_INDEX_ROW_COST event seeks (it is looked up, then matched against
+    permissions), so the window is counted only as far as that break-even point.
+    """
+    held = db.scalar(select(func.count()).where(Permission.user_id.in_(user_ids)))
+    budget = held // BUSY_INDEX_ROW_COST
+    in_window = db.scalar(select(func.count()).select_from(
+        select(occurrences_rtree.c.id)
+        .where(occurrences_rtree.c.start_lo < last, occurrences_rtree.c.end_hi > first)
+        .limit(budget + 1).subquery()
+    ))
+    return in_window <= budget
+
+
+def _indexed_query(db: Session, user_ids: list[int], start: datetime.datetime, end: datetime.datetime):
+    columns = (Permission.user_id, EventOccurrence.event_id, EventOccurrence.start_time, EventOccurrence.end_time)
+    first, last = _minute(start), _minute(end, round_up=True)
+    if busy_index_available(db.connection()) and _window_is_narrow(db, user_ids, first, last):
+        # One R*Tree window, O(log n + k), then each occurrence's event is matched against the users'
+        # permissions, so the index holds an occurrence once however many users share the event.
+        # `+ 0` keeps SQLite from driving the join from permissions instead.
+        query = (
+            select(*columns)
+            .select_from(occurrences_rtree)
+            .join(EventOccurrence, EventOccurrence.id == occurrences_rtree.c.id)
+            .join(Permission, Permission.event_id == EventOccurrence.event_id)
+            .where(occurrences_rtree.c.start_lo < last, occurrences_rtree.c.end_hi > first,
+                   (Permission.user_id + 0).in_(user_ids))
+        )
+    else:
+        # Wide windows (or no R*Tree): seek each of the users' events in ix_event_occurrences_event_end.
+        query = (
+            select(*columns).join(EventOccurrence, EventOccurrence.event_id == Permission.event_id)
+            .where(Permission.user_id.in_(user_ids))
+        )
+    return (
+        query.join(Event, Event.id == EventOccurrence.event_id)
+        .where(EventOccurrence.end_time > start, EventOccurrence.start_time < end, *recurrence.index_covers(start, end))
+    )
+
+
+def busy_intervals(db: Session, user_ids: list[int], start: datetime.datetime, end: datetime.datetime,
+                   exclude_event_id: int | None = None) -> dict[int, list[tuple]]:
+    """(start, end, event_id) of every occurrence on each user's calendar overlapping [start, end)."""
+    busy = defaultdict(set)
+    for user_id, event_id, occ_start, occ_end in db.execute(_indexed_query(db, user_ids, start, end)):
+        if event_id != exclude_event_id:
+            busy[user_id].add((occ_start, occ_end, event_id))
+
+    # Events not indexed up to `end` are expanded on the fly, as in recurrence.list_occurrences.
+    pending = (
+        db.query(Permission.user_id, Event)
+        .join(Event, Event.id == Permission.event_id)
+        .filter(Event.id.in_(recurrence.unindexed_events(start, end)),
+                Permission.user_id.in_(user_ids),
+                Event.start_time < end)
+    )
+    for user_id, event in pending:
+        if event.id != exclude_event_id:
+            busy[user_id].update((occ_start, occ_end, event.id)
+                                 for occ_start, occ_end in recurrence.expand_event(event, start, end))
+    return {user_id: sorted(busy.get(user_id, ())) for user_id in user_ids}
+
+
+def free_busy(db: Session, user_ids: list[int], start: datetime.datetime, end: datetime.datetime):
+    """Merged busy blocks per user; event details are not exposed."""
+    result = []
+    for user_id, intervals in busy_intervals(db, user_ids, start, end).items():
+        merged = []
+        for occ_start, occ_end, _ in intervals:
+            if merged and occ_start <= merged[-1]["end_time"]:
+                merged[-1]["end_time"] = max(merged[-1]["end_time"], occ_end)
+            else:
+                merged.append({"start_time": occ_start, "end_time": occ_end})
+        result.append({"user_id": user_id, "busy": merged})
+    return result
+
+
+def find_conflicts(db: Session, candidate, user_ids: list[int], exclude_event_id: int | None = None):
+    """Busy intervals of `user_ids` that overlap any occurrence of `candidate` within the horizon."""
+    spans, _, _ = recurrence.occurrences_for(candidate)
+    if not spans or not user_ids:
+        return []
+    # Occurrences of one event share a duration, so both starts and ends are sorted.
+    starts = [span_start for span_start, _ in spans]
+    ends = [span_end for _, span_end in spans]
+    busy = busy_intervals(db, user_ids, starts[0], max(ends), exclude_event_id)
+
+    conflicts = []
+    for user_id, intervals in busy.items():
+        for busy_start, busy_end, _ in intervals:
+            if bisect.bisect_right(ends, busy_start) < bisect.bisect_left(starts, busy_end):
+                conflicts.append({"user_id": user_id, "start_time": busy_start, "end_time": busy_end})
+                if len(conflicts) >= MAX_REPORTED_CONFLICTS:
+                    return conflicts
+    return conflicts
+
+
+def _ensure_no_conflicts(conflicts: list[dict]):
+    if conflicts:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": "Event overlaps existing events", "conflicts": jsonable_encoder(conflicts)},
+        )
+
+
+def check_new_event(db: Session, user: User, event_in: EventCreate, attendees: list[int] | None = None):
+    _ensure_no_conflicts(find_conflicts(db, event_in, sorted({user.id, *(attendees or [])})))
+
+
+def check_event_update(db: Session, event_id: int, event_in: EventUpdate, attendees: list[int] | None = None):
+    event = db.get(Event, event_id)
+    candidate = SimpleNamespace(**{field: getattr(event, field) for field in recurrence.SCHEDULE_FIELDS})
+    for key, value in event_in.dict(exclude_unset=True).items():
+        setattr(candidate, key, value)
+    user_ids = {user_id for user_id, in db.query(Permission.user_id).filter(Permission.event_id == event.id)}
+    user_ids.update(attendees or [])
+    _ensure_no_conflicts(find_conflicts(db, candidate, sorted(user_ids), exclude_event_id=event.id))
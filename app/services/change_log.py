@@ -0,0 +1,249 @@
+import asyncio
+import datetime
+import json
+import os
+
+from sqlalchemy import and_, delete, event, func, insert, select, union_all
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.events import ChangeLog
+from app.models.permission import Permission
+from app.utils.change_feed import change_feed
+from app.utils.db_utils.database import ReadSessionLocal
+from app.utils.db_utils.writer import on_commit
+from app.utils.invalidation import MULTI_WORKER
+from app.utils.role_config import role_cache
+
+CHANGE_LOG_KEEP_DAYS = float(os.environ.get("CHANGE_LOG_KEEP_DAYS", 7))
+CHANGE_LOG_PRUNE_INTERVAL = float(os.environ.get("CHANGE_LOG_PRUNE_INTERVAL", 3600))
+CHANGE_FEED_HEARTBEAT = float(os.environ.get("CHANGE_FEED_HEARTBEAT", 15))
+CHANGE_REPLAY_PAGE = 1000
+# Event ids per IN (...) when looking up who holds a permission on them.
+_LOOKUP_CHUNK = 500
+# Changes after which a user's cached role on the event may be stale.
+ROLE_CHANGES = ("permission.updated", "permission.revoked", "event.deleted")
+
+_relayed = 0
+_previous_roles = []
+
+
+def record(db: Session, change_type: str, event_ids: list[int], versions: dict[int, int] | None = None):
+    """Log one change per event, for whoever holds a permission on it, in the caller's transaction.
+
+    The rows reach the change feed once that transaction commits, and never if it rolls back.
+    """
+    _insert(db, change_type, [(None, event_id) for event_id in event_ids], versions)
+
+
+def record_for_users(db: Session, change_type: str, audience: dict[int, list[int]]):
+    """Log a change for each of the given users of each event: for changes that end their access."""
+    _insert(db, change_type, [(user_id, event_id) for event_id, user_ids in audience.items()
+                              for user_id in user_ids])
+
+
+def _insert(db: Session, change_type: str, targets: list[tuple[int | None, int]],
+            versions: dict[int, int] | None = None):
+    now = datetime.datetime.now()
+    rows = [{"user_id": user_id, "event_id": event_id, "type": change_type,
+             "version": versions.get(event_id) if versions else None, "created_at": now}
+            for user_id, event_id in targets]
+    if not rows:
+        return
+    if db.get_bind().dialect.insert_executemany_returning:
+        # (user_id, event_id) is unique within one call, so rows are matched by key rather than asking
+        # for RETURNING in parameter order, which SQLite can only give one INSERT per row.
+        stmt = insert(ChangeLog).returning(ChangeLog.seq, ChangeLog.user_id, ChangeLog.event_id)
+        seqs = {(user_id, event_id): seq for seq, user_id, event_id in db.execute(stmt, rows)}
+    else:
+        logged = [ChangeLog(**row) for row in rows]
+        db.add_all(logged)
+        db.flush()
+        seqs = {(row.user_id, row.event_id): row.seq for row in logged}
+    for row in rows:
+        row["seq"] = seqs[row["user_id"], row["event_id"]]
+        del row["created_at"]
+    rows.sort(key=lambda row: row["seq"])
+    db.info.setdefault("changes", []).extend(rows)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session):
+    changes = session.info.pop("changes", None)
+    # With several workers, relay_changes publishes everyone's changes in seq order instead.
+    if changes and not MULTI_WORKER:
+        on_commit(lambda: change_feed.publish(changes))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard(session, previous_transaction):
+    session.info.pop("changes", None)
+
+
+def latest_seq(db: Session) -> int:
+    return db.scalar(select(func.max(ChangeLog.seq))) or 0
+
+
+def _holders(event_ids) -> dict[int, list[int]]:
+    event_ids, holders = list(event_ids), {}
+    with ReadSessionLocal() as db:
+        for start in range(0, len(event_ids), _LOOKUP_CHUNK):
+            chunk = event_ids[start:start + _LOOKUP_CHUNK]
+            for event_id, user_id in db.execute(select(Permission.event_id, Permission.user_id)
+                                                .where(Permission.event_id.in_(chunk))):
+                holders.setdefault(event_id, []).append(user_id)
+    return holders
+
+
+def start_feed(db: Session):
+    """Called once per process before serving: everything after the current seq is this process's to publish."""
+    global _relayed
+    _relayed = latest_seq(db)
+    change_feed.start(_relayed, _holders)
+
+
+def relay_changes(db: Session):
+    """Publish changes committed by any worker since the last call, and drop the cached roles they touch.
+
+    Used instead of publishing on commit when several workers share the database: reading the log keeps
+    every worker's feed in seq order, which SSE resumption relies on. As with apply_invalidations, the
+    previous call's roles are dropped once more for reads that raced the commit.
+    """
+    global _relayed, _previous_roles
+    roles = []
+    while True:
+        rows = [dict(row) for row in db.execute(
+            select(ChangeLog.seq, ChangeLog.user_id, ChangeLog.event_id, ChangeLog.type, ChangeLog.version)
+            .where(ChangeLog.seq > _relayed)
+            .order_by(ChangeLog.seq)
+            .limit(CHANGE_REPLAY_PAGE)
+        ).mappings()]
+        if not rows:
+            break
+        roles.extend((row["user_id"], row["event_id"]) for row in rows if row["type"] in ROLE_CHANGES)
+        change_feed.publish(rows)
+        _relayed = rows[-1]["seq"]
+    # A change logged for everyone on the event may concern any of its cached roles.
+    shared = set()
+    for user_id, event_id in _previous_roles + roles:
+        if user_id is None:
+            shared.add(event_id)
+        else:
+            role_cache.invalidate((user_id, event_id))
+    if shared:
+        role_cache.invalidate_where(lambda key: key[1] in shared)
+    _previous_roles = roles
+
+
+def changes_since(db: Session, user_id: int, since: int, limit: int = CHANGE_REPLAY_PAGE) -> list[dict] | None:
+    """The user's logged changes after `since`, oldest first; None if some of them were already pruned."""
+    oldest = db.scalar(select(func.min(ChangeLog.seq)))
+    if oldest is not None and since + 1 < oldest:
+        return None
+    columns = (ChangeLog.seq, ChangeLog.user_id, ChangeLog.event_id, ChangeLog.type, ChangeLog.version)
+    # Two index lookups rather than one OR: the user's own rows by (user_id, seq), and changes for everyone
+    # on the events the user holds a permission on, through (event_id, seq).
+    own = select(*columns).where(ChangeLog.user_id == user_id, ChangeLog.seq > since)
+    shared = (
+        select(*columns)
+        .join(Permission, and_(Permission.event_id == ChangeLog.event_id, Permission.user_id == user_id))
+        .where(ChangeLog.user_id.is_(None), ChangeLog.seq > since)
+    )
+    logged = union_all(own, shared).subquery()
+    rows = db.execute(select(logged).order_by(logged.c.seq).limit(limit)).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def _visible(db: Session, user_id: int, changes: list[dict]) -> list[dict]:
+    # Buffered changes for everyone on an event, kept only where the user holds a permission on it.
+    event_ids, allowed = list({change["event_id"] for change in changes if change["user_id"] is None}), set()
+    for start in range(0, len(event_ids), _LOOKUP_CHUNK):
+        chunk = event_ids[start:start + _LOOKUP_CHUNK]
+        allowed.update(db.scalars(select(Permission.event_id)
+                                  .where(Permission.user_id == user_id, Permission.event_id.in_(chunk))))
+    return [change for change in changes if change["user_id"] is not None or change["event_id"] in allowed]
+
+
+def prune_change_log(db: Session):
+    """Drop changes older than CHANGE_LOG_KEEP_DAYS. The newest row always stays, so `seq` keeps counting up
+    and a client resuming from before the pruned range can still be told to start over."""
+    newest = latest_seq(db)
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=CHANGE_LOG_KEEP_DAYS)
+    db.execute(delete(ChangeLog).where(ChangeLog.created_at < cutoff, ChangeLog.seq < newest))
+    db.commit()
+
+
+def _read(fn, *args):
+    with ReadSessionLocal() as db:
+        return fn(db, *args)
+
+
+def _message(change: dict) -> bytes:
+    data = {key: change[key] for key in ("seq", "type", "event_id", "version")}
+    return f"id: {change['seq']}\nevent: {change['type']}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def _control(name: str, seq: int) -> bytes:
+    return f"id: {seq}\nevent: {name}\ndata: {json.dumps({'seq': seq})}\n\n".encode()
+
+
+async def _catch_up(user_id: int, since: int):
+    """Yield (changes, reset_seq) pages from the buffer or, further back, from the change log."""
+    recent = change_feed.recent(user_id, since)
+    if recent is not None:
+        yield await run_in_threadpool(_read, _visible, user_id, recent), None
+        return
+    while True:
+        page = await run_in_threadpool(_read, changes_since, user_id, since)
+        if page is None:
+            yield [], await run_in_threadpool(_read, latest_seq)
+            return
+        yield page, None
+        if len(page) < CHANGE_REPLAY_PAGE:
+            return
+        since = page[-1]["seq"]
+
+
+async def stream_changes(user_id: int, since: int | None):
+    """Server-sent events for the user's changes after `since`, then live ones as they commit.
+
+    Every message's id is its seq, so a reconnecting EventSource resumes with Last-Event-ID. Without
+    `since` the stream starts now with a `ready` message. A `reset` message means changes since
+    then were pruned: reload everything and carry on from its id.
+    """
+    subscription = change_feed.subscribe(user_id)
+    try:
+        if since is None:
+            since = await run_in_threadpool(_read, latest_seq)
+            yield _control("ready", since)
+        last = since
+        while True:
+            async for page, reset in _catch_up(user_id, last):
+                if reset is not None:
+                    last = max(last, reset)
+                    yield _control("reset", last)
+                elif page:
+                    yield b"".join(_message(change) for change in page)
+                    last = page[-1]["seq"]
+            while True:
+                try:
+                    change = await asyncio.wait_for(subscription.queue.get(), CHANGE_FEED_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if change is None:
+                    # Fell too far behind: read what was missed from the buffer or the log.
+                    subscription.resume()
+                    break
+                batch = [change]
+                while not subscription.queue.empty() and (change := subscription.queue.get_nowait()) is not None:
+                    batch.append(change)
+                fresh = [item for item in batch if item["seq"] > last]
+                if fresh:
+                    yield b"".join(_message(item) for item in fresh)
+                    last = fresh[-1]["seq"]
+                if change is None:
+                    subscription.resume()
+                    break
+    finally:
+        change_feed.unsubscribe(subscription)
@@ -1,38 +1,40 @@
 import datetime
+import os
 
-from sqlalchemy.orm import Session
+from types import SimpleNamespace
 
-from app.schemas.events import EventCreate, EventUpdate, EventOut, PermissionShare, PermissionUpdate
-from app.models.events import Event, EventVersion
+from fastapi import HTTPException
+from sqlalchemy import and_, delete, func, insert, or_, select, true, tuple_, update
+from sqlalchemy.orm import Session, aliased, noload, selectinload
+
+from app.schemas.events import EventCreate, EventUpdate, EventOut, PermissionShare, PermissionUpdate, EventBatchUpdate
+from app.models.events import Event, EventVersion, EventVersionArchive, EventOccurrence
 from app.models.permission import Permission
 from app.models.user import User
+from app.utils.role_config import invalidate_role, invalidate_event_roles, can_edit, can_delete, can_share
+from app.utils.etags import parse_event_etag, precondition_failed
+from app.utils.db_utils.list_index import list_index_available
+from app.services import versions, recurrence, change_log
+
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 500))
+
+
+def _schedule_changed(previous: dict, event: Event) -> bool:
+    return any(previous[field] != getattr(event, field) for field in recurrence.SCHEDULE_FIELDS)
 
 
 def create_event(db: Session, user: User, event_in: EventCreate):
     event = Event(**event_in.dict(), owner_id=user.id)
     db.add(event)
-    db.commit()
-    db.refresh(event)
+    db.flush()
 
     permission = Permission(user_id=user.id, event_id=event.id, role="owner")
     db.add(permission)
+    versions.record_version(db, event)
+    recurrence.index_events(db, [event])
+    change_log.record(db, "event.created", [event.id], {event.id: 1})
     db.commit()
-
-    version = EventVersion(
-        event_id=event.id,
-        version_number=1,
-        title=event.title,
-        description=event.description,
-        start_time=event.start_time,
-        end_time=event.end_time,
-        location=event.location,
-        is_recurring=event.is_recurring,
-        recurrence_pattern=event.recurrence_pattern,
-        owner_id=event.owner_id,
-        created_at=datetime.datetime.now()
-    )
-    db.add(version)
-    db.commit()
+    db.refresh(event)
 
     return event
 
@@ -41,76 +43,369 @@ def get_event_by_id(db: Session, event_id: int):
     return db.query(Event).filter(Event.id == event_id).first()
 
 
-def list_events(db: Session, user: User):
-    return (
-        db.query(Event)
-        .join(Permission)
-        .filter_by(user_id=user.id)
-        .all()
+def get_event_state(db: Session, event_id: int):
+    """(current_version, permissions_version, archived_versions) of the event, or None; all an ETag needs."""
+    return (db.query(Event.current_version, Event.permissions_version, Event.archived_versions)
+            .filter(Event.id == event_id).first())
+
+
+def _require_match(db: Session, event_id: int, if_match: list[str]):
+    # A conditional UPDATE in the write's own transaction, so two editors holding the same ETag
+    # cannot both pass: the second one finds the version already moved on.
+    if "*" in if_match:
+        condition = true()
+    else:
+        states = [parsed[1:] for parsed in map(parse_event_etag, if_match) if parsed and parsed[0] == event_id]
+        if not states:
+            precondition_failed()
+        condition = or_(*(
+            and_(func.coalesce(Event.current_version, 0) == version,
+                 func.coalesce(Event.permissions_version, 0) == permissions_version)
+            for version, permissions_version in states
+        ))
+    stmt = (
+        update(Event)
+        .where(Event.id == event_id, condition)
+        .values(permissions_version=Event.permissions_version)
+        .execution_options(synchronize_session=False)
     )
+    if not db.execute(stmt).rowcount:
+        precondition_failed()
 
 
-def update_event(db: Session, event_id: int, event_in: EventUpdate):
+def _touch_permissions(db: Session, *event_ids: int):
+    db.execute(
+        update(Event)
+        .where(Event.id.in_(event_ids))
+        .values(permissions_version=func.coalesce(Event.permissions_version, 0) + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _audience(db: Session, event_ids: list[int]) -> dict[int, list[int]]:
+    """Users holding a permission on each event: who a deletion is logged for, before the permissions go."""
+    db.flush()
+    users = {event_id: [] for event_id in event_ids}
+    for start in range(0, len(event_ids), BATCH_CHUNK_SIZE):
+        chunk = event_ids[start:start + BATCH_CHUNK_SIZE]
+        for event_id, user_id in db.execute(select(Permission.event_id, Permission.user_id)
+                                            .where(Permission.event_id.in_(chunk))):
+            users[event_id].append(user_id)
+    return users
+
+
+def list_events(db: Session, user: User, **filters):
+    return list_events_query(db, user, **filters).all()
+
+
+def permissions_loader(limit: int | None = None):
+    """Loader option for Event.permissions: all of them, none (`limit=0`) or the first `limit` per event.
+
+    Either way it is one extra SELECT per page (or per `yield_per` batch), never one per event.
+    """
+    if limit is None:
+        return selectinload(Event.permissions)
+    if limit == 0:
+        return noload(Event.permissions)
+    first = aliased(Permission)
+    first_ids = select(first.id).where(first.event_id == Permission.event_id).order_by(first.id).limit(limit)
+    return selectinload(Event.permissions.and_(Permission.id.in_(first_ids)))
+
+
+def list_events_query(db: Session, user: User, limit: int | None = None,
+                      after: tuple[datetime.datetime, int] | None = None, start: datetime.datetime | None = None,
+                      end: datetime.datetime | None = None, roles: list[str] | None = None,
+                      permissions_limit: int | None = None):
+    if list_index_available(db.connection()):
+        # Permission rows carry their event's start_time, so ix_permissions_user_start yields the
+        # caller's events already in page order and `after` is a seek, not a join and sort.
+        start_key, id_key = Permission.start_time, Permission.event_id
+    else:
+        start_key, id_key = Event.start_time, Event.id
+    # The join only filters on the caller's own row; EventOut's permissions come from the loader.
+    query = (db.query(Event).join(Permission).filter(Permission.user_id == user.id)
+             .options(permissions_loader(permissions_limit)))
+    if roles:
+        query = query.filter(Permission.role.in_(roles))
+    if start:
+        query = query.filter(Event.end_time > start)
+    if end:
+        query = query.filter(start_key < end)
+    if after:
+        query = query.filter(tuple_(start_key, id_key) > after)
+    query = query.order_by(start_key, id_key)
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+def update_event(db: Session, event_id: int, event_in: EventUpdate, if_match: list[str] | None = None):
+    if if_match is not None:
+        _require_match(db, event_id, if_match)
     event = get_event_by_id(db, event_id)
+    previous = versions.snapshot(event)
     for key, value in event_in.dict(exclude_unset=True).items():
         setattr(event, key, value)
+    number = versions.record_version(db, event, previous)
+    if _schedule_changed(previous, event):
+        recurrence.index_events(db, [event])
+    change_log.record(db, "event.updated", [event_id], {event_id: number})
     db.commit()
     db.refresh(event)
 
-    latest_version_number = db.query(EventVersion).filter_by(event_id=event.id).count() + 1
-    version = EventVersion(
-        event_id=event.id,
-        version_number=latest_version_number,
-        title=event.title,
-        description=event.description,
-        start_time=event.start_time,
-        end_time=event.end_time,
-        location=event.location,
-        is_recurring=event.is_recurring,
-        recurrence_pattern=event.recurrence_pattern,
-        owner_id=event.owner_id,
-        created_at=datetime.datetime.now()
-    )
-    db.add(version)
-    db.commit()
-
     return event
 
 
-def delete_event(db: Session, event_id: int):
+def delete_event(db: Session, event_id: int, if_match: list[str] | None = None):
+    if if_match is not None:
+        _require_match(db, event_id, if_match)
     event = get_event_by_id(db, event_id)
     if not event:
         return
 
     db.query(EventVersion).filter_by(event_id=event_id).delete()
+    db.query(EventVersionArchive).filter_by(event_id=event_id).delete()
+
+    recurrence.remove_events(db, [event_id])
 
+    change_log.record_for_users(db, "event.deleted", _audience(db, [event_id]))
     db.query(Permission).filter_by(event_id=event_id).delete()
 
     db.delete(event)
     db.commit()
+    invalidate_event_roles(event_id)
 
 
 def create_events_batch(db: Session, user: User, events_in: list[EventCreate]):
-    events = []
-    for event_in in events_in:
-        event = create_event(db, user, event_in)
-        events.append(event)
-    return events
+    # All chunks share one transaction, so a failure anywhere leaves nothing behind.
+    try:
+        event_ids = insert_events(db, user, events_in)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return _load_events(db, event_ids)
+
+
+def insert_events(db: Session, user: User, events_in: list[EventCreate]) -> list[int]:
+    """Insert events owned by `user` with their permissions, versions and occurrences; the caller commits."""
+    event_ids = []
+    for start in range(0, len(events_in), BATCH_CHUNK_SIZE):
+        event_ids.extend(_bulk_insert_events(db, user, events_in[start:start + BATCH_CHUNK_SIZE]))
+    return event_ids
+
+
+def _bulk_insert_events(db: Session, user: User, events_in: list[EventCreate]) -> list[int]:
+    now = datetime.datetime.now()
+    rows = [dict(event_in.dict(), owner_id=user.id, created_at=now) for event_in in events_in]
+    schedules = []
+    for row in rows:
+        spans, row["occurrences_from"], row["occurrences_until"] = recurrence.occurrences_for(SimpleNamespace(**row))
+        schedules.append(spans)
+
+    if db.get_bind().dialect.insert_executemany_returning_sort_by_parameter_order:
+        stmt = insert(Event).returning(Event.id, sort_by_parameter_order=True)
+        event_ids = list(db.scalars(stmt, rows))
+    else:
+        new_events = [Event(**row) for row in rows]
+        db.add_all(new_events)
+        db.flush()
+        event_ids = [event.id for event in new_events]
+
+    db.execute(
+        insert(Permission),
+        [{"user_id": user.id, "event_id": event_id, "role": "owner"} for event_id in event_ids],
+    )
+    db.execute(
+        insert(EventVersion),
+        [dict(_version_fields(row), event_id=event_id, version_number=1) for row, event_id in zip(rows, event_ids)],
+    )
+    change_log.record(db, "event.created", event_ids, dict.fromkeys(event_ids, 1))
+    occurrence_rows = [{"event_id": event_id, "start_time": start, "end_time": end}
+                       for spans, event_id in zip(schedules, event_ids) for start, end in spans]
+    if occurrence_rows:
+        db.execute(insert(EventOccurrence), occurrence_rows)
+    return event_ids
+
+
+def _authorize_batch(db: Session, user: User, event_ids: list[int], check, ok_status: int):
+    """Check the caller's role on every event with one permission query per chunk.
+
+    Returns one result per requested id, in order, and the ids that passed. Repeated ids are
+    rejected so each event is changed at most once per batch.
+    """
+    unique = list(dict.fromkeys(event_ids))
+    roles = {}
+    for start in range(0, len(unique), BATCH_CHUNK_SIZE):
+        chunk = unique[start:start + BATCH_CHUNK_SIZE]
+        roles.update(db.query(Permission.event_id, Permission.role)
+                     .filter(Permission.user_id == user.id, Permission.event_id.in_(chunk)).all())
+    results, allowed, seen = [], [], set()
+    for event_id in event_ids:
+        if event_id in seen:
+            results.append({"id": event_id, "status": 400, "detail": "Duplicate id in batch"})
+        elif not check(roles.get(event_id, "")):
+            results.append({"id": event_id, "status": 403, "detail": "Permission denied"})
+        else:
+            results.append({"id": event_id, "status": ok_status})
+            allowed.append(event_id)
+        seen.add(event_id)
+    return results, allowed
+
+
+def update_events_batch(db: Session, user: User, items: list[EventBatchUpdate]):
+    """Apply many updates in one transaction. Each permitted event gets a new version, as with update_event."""
+    results, allowed = _authorize_batch(db, user, [item.id for item in items], can_edit, 200)
+    changes = {}
+    for item in items:
+        changes.setdefault(item.id, item.dict(exclude_unset=True, exclude={"id"}))
+    try:
+        for start in range(0, len(allowed), BATCH_CHUNK_SIZE):
+            _bulk_update_events(db, allowed[start:start + BATCH_CHUNK_SIZE], changes)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return results
+
+
+def _bulk_update_events(db: Session, event_ids: list[int], changes: dict[int, dict]):
+    # Version numbers first: the UPDATE takes the write lock before anything is read.
+    numbers = versions.next_version_numbers(db, event_ids)
+    columns = [Event.id, Event.owner_id, *(getattr(Event, field) for field in versions.VERSIONED_FIELDS)]
+    previous_rows = db.execute(select(*columns).where(Event.id.in_(event_ids))).mappings().all()
+
+    event_rows, version_rows, reindexed, occurrence_rows = [], [], [], []
+    for row in previous_rows:
+        previous = {field: row[field] for field in versions.VERSIONED_FIELDS}
+        current = dict(previous, **changes[row["id"]])
+        event_row = dict(changes[row["id"]], id=row["id"])
+        if any(previous[field] != current[field] for field in recurrence.SCHEDULE_FIELDS):
+            spans, event_row["occurrences_from"], event_row["occurrences_until"] = recurrence.occurrences_for(
+                SimpleNamespace(**current))
+            reindexed.append(row["id"])
+            occurrence_rows.extend({"event_id": row["id"], "start_time": start, "end_time": end}
+                                   for start, end in spans)
+        event_rows.append(event_row)
+        version_rows.append(versions.version_row(row["id"], row["owner_id"], numbers[row["id"]], current, previous))
+
+    db.execute(update(Event), event_rows)
+    db.execute(insert(EventVersion), version_rows)
+    if reindexed:
+        recurrence.remove_events(db, reindexed)
+    if occurrence_rows:
+        db.execute(insert(EventOccurrence), occurrence_rows)
+    change_log.record(db, "event.updated", event_ids, numbers)
+
+
+def delete_events_batch(db: Session, user: User, event_ids: list[int]):
+    """Delete every event the caller owns, with its versions, occurrences and permissions, in one transaction."""
+    results, allowed = _authorize_batch(db, user, event_ids, can_delete, 204)
+    try:
+        for start in range(0, len(allowed), BATCH_CHUNK_SIZE):
+            chunk = allowed[start:start + BATCH_CHUNK_SIZE]
+            db.execute(delete(EventVersion).where(EventVersion.event_id.in_(chunk)))
+            db.execute(delete(EventVersionArchive).where(EventVersionArchive.event_id.in_(chunk)))
+            recurrence.remove_events(db, chunk)
+            change_log.record_for_users(db, "event.deleted", _audience(db, chunk))
+            db.execute(delete(Permission).where(Permission.event_id.in_(chunk)))
+            db.execute(delete(Event).where(Event.id.in_(chunk)))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    invalidate_event_roles(*allowed)
+    return results
+
+
+def _version_fields(row: dict) -> dict:
+    return {key: row[key] for key in (*versions.VERSIONED_FIELDS, "owner_id", "created_at")}
+
+
+def _load_events(db: Session, event_ids: list[int]):
+    loaded = []
+    for start in range(0, len(event_ids), BATCH_CHUNK_SIZE):
+        chunk = event_ids[start:start + BATCH_CHUNK_SIZE]
+        loaded.extend(db.query(Event).filter(Event.id.in_(chunk)).options(selectinload(Event.permissions))
+                      .order_by(Event.id).all())
+    return loaded
 
 
 def share_permission(db: Session, event_id: int, event_share: list[PermissionShare]):
-    for user in event_share:
-        print(user.role)
-        perm = db.query(Permission).filter_by(event_id=event_id, user_id=user.user_id).first()
-        if perm:
-            perm.role = user.role.value
-        else:
-            perm = Permission(event_id=event_id, user_id=user.user_id, role=user.role.value)
-            db.add(perm)
-    db.commit()
+    _grant(db, [event_id], event_share)
     return db.query(Permission).filter_by(event_id=event_id).all()
 
 
+def share_events(db: Session, user: User, event_ids: list[int], shares: list[PermissionShare]):
+    """Grant every share on every event the caller may share, in one transaction; one result per event."""
+    results, allowed = _authorize_batch(db, user, event_ids, can_share, 200)
+    _grant(db, allowed, shares)
+    return results
+
+
+def _grant(db: Session, event_ids: list[int], shares: list[PermissionShare]):
+    # Later entries for the same recipient win, as they did when rows were written one by one.
+    roles = {share.user_id: share.role.value for share in shares}
+    if not event_ids or not roles:
+        return
+    recipients, known = list(roles), set()
+    for start in range(0, len(recipients), BATCH_CHUNK_SIZE):
+        chunk = recipients[start:start + BATCH_CHUNK_SIZE]
+        known.update(db.scalars(select(User.id).where(User.id.in_(chunk))))
+    missing = [user_id for user_id in recipients if user_id not in known]
+    if missing:
+        raise HTTPException(status_code=404, detail={"message": "Users not found", "user_ids": missing})
+
+    rows = [{"event_id": event_id, "user_id": user_id, "role": role}
+            for event_id in event_ids for user_id, role in roles.items()]
+    try:
+        _upsert_permissions(db, rows)
+        _touch_permissions(db, *event_ids)
+        change_log.record(db, "permission.updated", event_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    invalidate_event_roles(*event_ids)
+
+
+def _upsert_permissions(db: Session, rows: list[dict]):
+    """INSERT ... ON CONFLICT (event_id, user_id) DO UPDATE. An owner's own grant is never downgraded."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert
+    else:
+        _merge_permissions(db, rows)
+        return
+    stmt = upsert(Permission.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Permission.event_id, Permission.user_id],
+        set_={"role": stmt.excluded.role},
+        where=Permission.role != "owner",
+    )
+    db.execute(stmt, rows)
+
+
+def _merge_permissions(db: Session, rows: list[dict]):
+    # Dialects without ON CONFLICT: one lookup of the existing pairs, then bulk UPDATE and INSERT.
+    pairs = [(row["event_id"], row["user_id"]) for row in rows]
+    existing = {}
+    for start in range(0, len(pairs), BATCH_CHUNK_SIZE):
+        chunk = pairs[start:start + BATCH_CHUNK_SIZE]
+        existing.update(((event_id, user_id), (permission_id, role)) for permission_id, event_id, user_id, role in
+                        db.execute(select(Permission.id, Permission.event_id, Permission.user_id, Permission.role)
+                                   .where(tuple_(Permission.event_id, Permission.user_id).in_(chunk))))
+    updates = [{"id": existing[pair][0], "role": row["role"]} for pair, row in zip(pairs, rows)
+               if pair in existing and existing[pair][1] != "owner"]
+    inserts = [row for pair, row in zip(pairs, rows) if pair not in existing]
+    if updates:
+        db.execute(update(Permission), updates)
+    if inserts:
+        db.execute(insert(Permission), inserts)
+
+
 def get_event_permissions(db: Session, event_id: int):
     return db.query(Permission).filter_by(event_id=event_id).all()
 
@@ -119,8 +414,11 @@ def update_user_permission(db: Session, event_id: int, user_id: int, update: Per
     permission = db.query(Permission).filter_by(event_id=event_id, user_id=user_id).first()
     if not permission:
         return None
-    permission.role = update.role
+    permission.role = update.role.value
+    _touch_permissions(db, event_id)
+    change_log.record(db, "permission.updated", [event_id])
     db.commit()
+    invalidate_role(user_id, event_id)
     db.refresh(permission)
     return permission
 
@@ -130,12 +428,16 @@ def delete_user_permission(db: Session, event_id: int, user_id: int):
     if not permission:
         return False
     db.delete(permission)
+    _touch_permissions(db, event_id)
+    change_log.record(db, "permission.updated", [event_id])
+    change_log.record_for_users(db, "permission.revoked", {event_id: [user_id]})
     db.commit()
+    invalidate_role(user_id, event_id)
     return True
 
 
 def get_event_version(db: Session, event_id: int, version_id: int):
-    return db.query(EventVersion).filter_by(event_id=event_id, id=version_id).first()
+    return versions.get_version_by_id(db, event_id, version_id)
 
 
 def rollback_event_version(db: Session, event_id: int, version_id: int):
@@ -144,22 +446,41 @@ def rollback_event_version(db: Session, event_id: int, version_id: int):
         return None
 
     event = get_event_by_id(db, event_id)
+    previous = versions.snapshot(event)
 
-
-
-    # Apply rollback
-    event.title = version.title
-    event.description = version.description
-    event.start_time = version.start_time
-    event.end_time = version.end_time
-    event.location = version.location
-    event.is_recurring = version.is_recurring
-    event.recurrence_pattern = version.recurrence_pattern
+    # Apply rollback; it is recorded as a new version so later deltas stay relative to the real state.
+    for field in versions.VERSIONED_FIELDS:
+        setattr(event, field, getattr(version, field))
+    number = versions.record_version(db, event, previous)
+    if _schedule_changed(previous, event):
+        recurrence.index_events(db, [event])
+    change_log.record(db, "event.updated", [event_id], {event_id: number})
 
     db.commit()
     db.refresh(event)
     return event
 
 
-def get_all_event_versions(db: Session, event_id: int):
-    return db.query(EventVersion).filter_by(event_id=event_id).order_by(EventVersion.version_number.asc()).all()
+def get_all_event_versions(db: Session, event_id: int, include_archived: bool = False):
+    return versions.get_all_versions(db, event_id, include_archived=include_archived)
+
+
+def stream_events(db: Session, user: User, batch_size: int, **filters):
+    return list_events_query(db, user, **filters).yield_per(batch_size)
+
+
+def stream_event_versions(db: Session, event_id: int, batch_size: int, include_archived: bool = False):
+    return versions.iter_versions(db, event_id, batch_size, include_archived=include_archived)
+
+
+def diff_event_versions(db: Session, event_id: int, from_version: int, to_version: int, steps: bool = False,
+                        text: bool = False):
+    return versions.diff_range(db, event_id, from_version, to_version, steps=steps,
+                               text_fields=("description",) if text else ())
+
+
+def diff_event_versions_by_id(db: Session, event_id: int, version_id1: int, version_id2: int):
+    numbers = versions.version_numbers(db, event_id, [version_id1, version_id2])
+    if version_id1 not in numbers or version_id2 not in numbers:
+        return None
+    return diff_event_versions(db, event_id, numbers[version_id1], numbers[version_id2])
@@ -0,0 +1,152 @@
+import datetime
+import os
+
+from sqlalchemy import delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.models.events import Event, EventOccurrence
+from app.models.permission import Permission
+from app.models.user import User
+from app.utils.db_utils.writer import write
+from app.utils.recurrence import MAX_OCCURRENCES, RecurrenceError, parse_rule, expand, ends_before
+
+RECURRENCE_HORIZON_DAYS = int(os.environ.get("RECURRENCE_HORIZON_DAYS", 365))
+# Occurrences older than this are not indexed; windows reaching further back are expanded on the fly.
+RECURRENCE_LOOKBACK_DAYS = int(os.environ.get("RECURRENCE_LOOKBACK_DAYS", 30))
+RECURRENCE_REFRESH_BATCH = int(os.environ.get("RECURRENCE_REFRESH_BATCH", 500))
+RECURRENCE_REFRESH_INTERVAL = float(os.environ.get("RECURRENCE_REFRESH_INTERVAL", 3600))
+RECURRENCE_MAX_WINDOW_DAYS = int(os.environ.get("RECURRENCE_MAX_WINDOW_DAYS", 366))
+SCHEDULE_FIELDS = ("start_time", "end_time", "is_recurring", "recurrence_pattern")
+# Marks an event whose every occurrence is already in the index.
+COMPLETE = datetime.datetime(9999, 12, 31)
+
+
+def _rule(event):
+    if not event.is_recurring or not event.recurrence_pattern:
+        return None
+    try:
+        return parse_rule(event.recurrence_pattern)
+    except RecurrenceError:
+        # Patterns stored before validation existed are treated as one-off events.
+        return None
+
+
+def expand_event(event, window_start: datetime.datetime, window_end: datetime.datetime):
+    rule = _rule(event)
+    duration = event.end_time - event.start_time
+    if rule is None:
+        if event.start_time < window_end and event.end_time > window_start:
+            yield event.start_time, event.end_time
+        return
+    yield from expand(rule, event.start_time, duration, window_start, window_end)
+
+
+def occurrences_for(event, horizon: datetime.datetime | None = None):
+    """Occurrence spans of `event` from the lookback up to `horizon`, the instant the spans start from
+    (None: the event's start) and the instant they are complete up to."""
+    rule = _rule(event)
+    if rule is None:
+        return [(event.start_time, event.end_time)], None, COMPLETE
+    now = datetime.datetime.now()
+    horizon = horizon or max(now, event.start_time) + datetime.timedelta(days=RECURRENCE_HORIZON_DAYS)
+    since = now - datetime.timedelta(days=RECURRENCE_LOOKBACK_DAYS)
+    if since <= event.start_time:
+        since = None
+    spans = list(expand(rule, event.start_time, event.end_time - event.start_time, since or event.start_time,
+                        horizon))
+    if len(spans) >= MAX_OCCURRENCES:
+        # Expansion was cut short; windows past the last indexed start are expanded on the fly.
+        return spans, since, spans[-1][0]
+    # Nothing left before the horizon (or nothing at all): the index is complete up to it.
+    return spans, since, COMPLETE if ends_before(rule, event.start_time, horizon) else horizon
+
+
+def index_events(db: Session, events: list[Event]):
+    """(Re)build the occurrence index for `events` from the lookback to the rolling horizon. Does not commit."""
+    if not events:
+        return
+    db.execute(delete(EventOccurrence).where(EventOccurrence.event_id.in_([event.id for event in events])))
+    rows = []
+    for event in events:
+        spans, event.occurrences_from, event.occurrences_until = occurrences_for(event)
+        rows.extend({"event_id": event.id, "start_time": start, "end_time": end} for start, end in spans)
+    if rows:
+        db.execute(insert(EventOccurrence), rows)
+
+
+def remove_events(db: Session, event_ids: list[int]):
+    db.execute(delete(EventOccurrence).where(EventOccurrence.event_id.in_(event_ids)))
+
+
+def refresh_occurrences(db: Session, event_ids: list[int]):
+    """Re-index `event_ids`, and commit."""
+    index_events(db, db.query(Event).filter(Event.id.in_(event_ids)).all())
+    db.commit()
+
+
+def refresh_all_occurrences(db: Session, batch_size: int = RECURRENCE_REFRESH_BATCH):
+    """Index events that were never indexed, or whose horizon has fallen behind, a batch per write.
+
+    Each kind of staleness is walked once in id order, so an event whose index cannot reach the target
+    (a truncated expansion) waits for the next run instead of being picked again forever.
+    """
+    horizon = datetime.datetime.now() + datetime.timedelta(days=RECURRENCE_HORIZON_DAYS // 2)
+    for stale in (Event.occurrences_until.is_(None), Event.occurrences_until < horizon):
+        cursor = 0
+        while event_ids := list(db.scalars(select(Event.id).where(stale, Event.id > cursor)
+                                           .order_by(Event.id).limit(batch_size))):
+            # End the read transaction so the next batch sees what the writer committed.
+            db.rollback()
+            write(refresh_occurrences, event_ids)
+            cursor = event_ids[-1]
+
+
+def unindexed_events(start: datetime.datetime, end: datetime.datetime):
+    """Ids of events whose occurrence index does not cover [start, end). Split so every part seeks
+    ix_events_occurrences_until or ix_events_occurrences_from instead of scanning them."""
+    return (
+        select(Event.id).where(Event.occurrences_until.is_(None))
+        .union_all(select(Event.id).where(Event.occurrences_until < end),
+                   select(Event.id).where(Event.occurrences_from > start))
+    )
+
+
+def index_covers(start: datetime.datetime, end: datetime.datetime):
+    """Criteria on Event: its occurrence index covers [start, end). The complement of unindexed_events."""
+    return Event.occurrences_until >= end, or_(Event.occurrences_from.is_(None), Event.occurrences_from <= start)
+
+
+def list_occurrences(db: Session, user: User, start: datetime.datetime, end: datetime.datetime):
+    """Every occurrence visible to `user` overlapping [start, end), ordered by start time."""
+    visible = db.query(Permission.event_id).filter(Permission.user_id == user.id)
+    indexed = (
+        db.query(EventOccurrence.start_time, EventOccurrence.end_time, Event)
+        .join(Event, Event.id == EventOccurrence.event_id)
+        .filter(EventOccurrence.event_id.in_(visible),
+                EventOccurrence.end_time > start,
+                EventOccurrence.start_time < end,
+                *index_covers(start, end))
+    )
+    occurrences = [_occurrence(event, occ_start, occ_end) for occ_start, occ_end, event in indexed]
+
+    # Events not indexed that far ahead (or back) are expanded on the fly for this window only.
+    pending = (
+        db.query(Event)
+        .filter(Event.id.in_(unindexed_events(start, end)), Event.id.in_(visible), Event.start_time < end)
+    )
+    for event in pending:
+        occurrences.extend(_occurrence(event, occ_start, occ_end)
+                           for occ_start, occ_end in expand_event(event, start, end))
+    occurrences.sort(key=lambda occurrence: (occurrence["start_time"], occurrence["event_id"]))
+    return occurrences
+
+
+def _occurrence(event, start: datetime.datetime, end: datetime.datetime) -> dict:
+    return {
+        "event_id": event.id,
+        "title": event.title,
+        "location": event.location,
+        "start_time": start,
+        "end_time": end,
+        "is_recurring": event.is_recurring,
+    }
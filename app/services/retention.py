@@ -0,0 +1,119 @@
+import datetime
+import logging
+import os
+
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.models.events import Event, EventVersion, EventVersionArchive
+from app.services import versions
+from app.services.events import BATCH_CHUNK_SIZE
+from app.utils.archive import append_member
+from app.utils.db_utils.writer import write
+
+logger = logging.getLogger(__name__)
+
+# Every policy is optional; a version survives if any enabled one keeps it. With none set, nothing is pruned.
+VERSION_KEEP_LAST = int(os.environ.get("VERSION_KEEP_LAST", 0))
+VERSION_KEEP_DAYS = int(os.environ.get("VERSION_KEEP_DAYS", 0))
+# "daily" or "weekly": versions outside the two windows above are thinned to the last one per day/week.
+VERSION_THIN = os.environ.get("VERSION_THIN", "").lower()
+VERSION_RETENTION_BATCH = int(os.environ.get("VERSION_RETENTION_BATCH", 100))
+VERSION_RETENTION_INTERVAL = float(os.environ.get("VERSION_RETENTION_INTERVAL", 3600))
+
+RETENTION_ENABLED = bool(VERSION_KEEP_LAST or VERSION_KEEP_DAYS or VERSION_THIN)
+
+_BUCKETS = {
+    "daily": lambda created: created.date(),
+    "weekly": lambda created: created.isocalendar()[:2],
+}
+
+
+def kept_versions(rows: list[EventVersion], now: datetime.datetime) -> set[int]:
+    """Version numbers the policies keep for one event; `rows` are ordered by version_number."""
+    keep = {rows[-1].version_number}
+    if VERSION_KEEP_LAST:
+        keep.update(row.version_number for row in rows[-VERSION_KEEP_LAST:])
+    if VERSION_KEEP_DAYS:
+        cutoff = now - datetime.timedelta(days=VERSION_KEEP_DAYS)
+        keep.update(row.version_number for row in rows if row.created_at and row.created_at >= cutoff)
+    if VERSION_THIN in _BUCKETS:
+        bucket_of = _BUCKETS[VERSION_THIN]
+        last_in_bucket = {}
+        for row in rows:
+            last_in_bucket[bucket_of(row.created_at or datetime.datetime.min)] = row.version_number
+        keep.update(last_in_bucket.values())
+    return keep
+
+
+def next_batch(db: Session, after_event_id: int, batch_size: int = VERSION_RETENTION_BATCH) -> list[int]:
+    """Ids of the next `batch_size` events with versions after `after_event_id`."""
+    return list(db.scalars(
+        select(EventVersion.event_id).where(EventVersion.event_id > after_event_id)
+        .distinct().order_by(EventVersion.event_id).limit(batch_size)
+    ))
+
+
+def prune_batch(db: Session, event_ids: list[int]) -> int:
+    """Apply retention to the events `event_ids`, and commit. Returns the number of versions pruned.
+
+    Pruned versions are appended to the archive fully materialized (one gzip member per event),
+    then removed. A kept delta whose chain lost a row is rewritten as a checkpoint, so every live
+    version still rebuilds from live rows only.
+    """
+    rows = (db.query(EventVersion).filter(EventVersion.event_id.in_(event_ids))
+            .order_by(EventVersion.event_id, EventVersion.version_number).all())
+    by_event = {}
+    for row in rows:
+        by_event.setdefault(row.event_id, []).append(row)
+
+    now = datetime.datetime.now()
+    archive_rows, pruned_ids, checkpoints, counts = [], [], [], []
+    for event_id, event_rows in by_event.items():
+        keep = kept_versions(event_rows, now)
+        if len(keep) == len(event_rows):
+            continue
+        records, chain_intact = [], True
+        for row, state in versions.iter_states(event_rows):
+            if row.version_number not in keep:
+                records.append((row, versions.archive_record(row, state)))
+                chain_intact = False
+            elif row.changed_fields is None:
+                chain_intact = True
+            elif not chain_intact:
+                checkpoints.append(dict(state, id=row.id, changed_fields=None))
+                chain_intact = True
+        offset, length = append_member(versions.VERSION_ARCHIVE_PATH, [line for _, line in records])
+        archive_rows.extend({"event_id": event_id, "version_id": row.id, "version_number": row.version_number,
+                             "offset": offset, "length": length} for row, _ in records)
+        pruned_ids.extend(row.id for row, _ in records)
+        counts.append({"b_id": event_id, "b_count": len(records)})
+
+    if archive_rows:
+        db.execute(insert(EventVersionArchive), archive_rows)
+        if checkpoints:
+            db.execute(update(EventVersion), checkpoints)
+        for start in range(0, len(pruned_ids), BATCH_CHUNK_SIZE):
+            chunk = pruned_ids[start:start + BATCH_CHUNK_SIZE]
+            db.execute(delete(EventVersion).where(EventVersion.id.in_(chunk))
+                       .execution_options(synchronize_session=False))
+        db.execute(
+            update(Event.__table__)
+            .where(Event.id == bindparam("b_id"))
+            .values(archived_versions=func.coalesce(Event.archived_versions, 0) + bindparam("b_count")),
+            counts,
+        )
+    db.commit()
+    return len(pruned_ids)
+
+
+def apply_retention(db: Session):
+    """One pass over all events. Each batch is pruned as one job on the writer, so the pass
+    never holds the write lock against request writes for longer than a batch."""
+    cursor, batches, pruned = 0, 0, 0
+    while event_ids := next_batch(db, cursor):
+        # End the read transaction so the pass doesn't pin an old WAL snapshot between batches.
+        db.rollback()
+        pruned += write(prune_batch, event_ids)
+        cursor, batches = event_ids[-1], batches + 1
+    logger.info("Version retention pass done (%d batches, %d versions pruned)", batches, pruned)
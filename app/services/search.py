@@ -0,0 +1,94 @@
+import html
+import os
+import re
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, literal, literal_column, null, or_, select
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.events import Event
+from app.models.permission import Permission
+from app.models.user import User
+from app.utils.db_utils.search_index import events_fts, search_index_available
+
+# bm25 weights for title, description and location: a word in the title counts most.
+SEARCH_WEIGHTS = (10.0, 1.0, 3.0)
+SEARCH_SNIPPET_TOKENS = int(os.environ.get("SEARCH_SNIPPET_TOKENS", 12))
+SNIPPET_OPEN, SNIPPET_CLOSE = "<mark>", "</mark>"
+# What SQLite wraps matches in: control characters, so the snippet can be HTML-escaped before adding the tags.
+_MATCH_START, _MATCH_END = "\x02", "\x03"
+_WORD = re.compile(r"\w+")
+
+
+def words(query: str) -> list[str]:
+    found = _WORD.findall(query)
+    if not found:
+        raise HTTPException(status_code=400, detail="q must contain at least one word")
+    return found
+
+
+def match_expression(query_words: list[str]) -> str:
+    """Every word required and the last one matched as a prefix, so results update as the user types.
+    Each word is quoted, so nothing the user types is parsed as FTS5 syntax."""
+    return " ".join(f'"{word}"' for word in query_words) + "*"
+
+
+def _ranked_ids(db: Session, user: User, query_words: list[str], limit: int, offset: int):
+    fts = literal_column("events_fts")
+    rank = func.bm25(fts, *SEARCH_WEIGHTS)
+    snippet = func.snippet(fts, -1, _MATCH_START, _MATCH_END, "…", SEARCH_SNIPPET_TOKENS)
+    query = (
+        select(events_fts.c.rowid, rank.label("rank"), snippet.label("snippet"))
+        .select_from(events_fts)
+        .join(Permission, and_(Permission.event_id == events_fts.c.rowid, Permission.user_id == user.id))
+        .where(fts.op("MATCH")(match_expression(query_words)))
+        .order_by(rank, events_fts.c.rowid)
+        .limit(limit).offset(offset)
+    )
+    return db.execute(query).all()
+
+
+def _like_pattern(word: str) -> str:
+    # `_` is a word character, so it reaches the pattern; matched literally like everything else.
+    return "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _like_ids(db: Session, user: User, query_words: list[str], limit: int, offset: int):
+    # Without FTS5: every word must appear in some column; no ranking or snippets, newest start first.
+    conditions = [
+        or_(*(column.ilike(_like_pattern(word), escape="\\")
+              for column in (Event.title, Event.description, Event.location)))
+        for word in query_words
+    ]
+    query = (
+        select(Event.id, literal(0.0).label("rank"), null().label("snippet"))
+        .join(Permission, and_(Permission.event_id == Event.id, Permission.user_id == user.id))
+        .where(*conditions)
+        .order_by(Event.start_time.desc(), Event.id)
+        .limit(limit).offset(offset)
+    )
+    return db.execute(query).all()
+
+
+def highlight(snippet: str | None) -> str | None:
+    """The snippet as HTML: event text escaped, matches wrapped in SNIPPET_OPEN / SNIPPET_CLOSE."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_MATCH_START, SNIPPET_OPEN).replace(_MATCH_END, SNIPPET_CLOSE)
+
+
+def search_events(db: Session, user: User, query: str, limit: int, offset: int = 0):
+    """Events the user has a permission on matching every word of `query`, best BM25 score first.
+
+    Each item is {"event", "rank", "snippet"}; the snippet is the best-matching fragment of text with
+    matched words wrapped in <mark>…</mark>, HTML-escaped otherwise.
+    """
+    query_words = words(query)
+    if search_index_available(db.connection()):
+        hits = _ranked_ids(db, user, query_words, limit, offset)
+    else:
+        hits = _like_ids(db, user, query_words, limit, offset)
+    loaded = {event.id: event for event in
+              db.query(Event).filter(Event.id.in_([hit[0] for hit in hits])).options(selectinload(Event.permissions))}
+    return [{"event": loaded[event_id], "rank": rank, "snippet": highlight(snippet)}
+            for event_id, rank, snippet in hits if event_id in loaded]
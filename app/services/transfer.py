@@ -0,0 +1,217 @@
+import codecs
+import csv
+import datetime
+import io
+import json
+import os
+import time
+from typing import Iterable, Iterator
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.models.events import EventVersion, ImportJob
+from app.models.user import User
+from app.schemas.events import EventCreate, EventExport, VersionExport, ImportJobOut
+from app.services import events, versions
+from app.utils import ical
+from app.utils.db_utils.database import ReadSessionLocal
+from app.utils.db_utils.writer import write
+from app.utils.serialization import dump_json
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv", "ics": "text/calendar"}
+# Events read (and versions buffered) per step of an export; memory is bounded by this, not by the calendar.
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
+# Events inserted per import transaction; the job's progress is committed with each one.
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 1000))
+CSV_COLUMNS = ("id", "title", "description", "start_time", "end_time", "location", "is_recurring",
+               "recurrence_pattern", "owner_id", "permissions")
+
+
+def _event_chunks(db: Session, user: User) -> Iterator[list]:
+    # Keyset pages over everything the user can see, so no cursor stays open between chunks.
+    after = None
+    while chunk := events.list_events_query(db, user, limit=EXPORT_BATCH_SIZE, after=after).all():
+        yield chunk
+        after = (chunk[-1].start_time, chunk[-1].id)
+        db.expunge_all()
+
+
+def _chunk_versions(db: Session, event_ids: list[int]):
+    rows = (db.query(EventVersion).filter(EventVersion.event_id.in_(event_ids))
+            .order_by(EventVersion.event_id, EventVersion.version_number).yield_per(EXPORT_BATCH_SIZE))
+    # Plain dicts: building an EventVersion per row (as materialize does) costs more than serializing it.
+    for row, state in versions.iter_states(rows):
+        yield dict(state, id=row.id, event_id=row.event_id, version_number=row.version_number,
+                   owner_id=row.owner_id, created_at=row.created_at)
+
+
+def _export_ndjson(db: Session, user: User):
+    for chunk in _event_chunks(db, user):
+        yield b"".join(dump_json(event, EventExport) + b"\n" for event in chunk)
+        lines = []
+        for version in _chunk_versions(db, [event.id for event in chunk]):
+            lines.append(dump_json(version, VersionExport) + b"\n")
+            if len(lines) >= EXPORT_BATCH_SIZE:
+                yield b"".join(lines)
+                lines = []
+        if lines:
+            yield b"".join(lines)
+
+
+def _export_csv(db: Session, user: User):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for chunk in _event_chunks(db, user):
+        for event in chunk:
+            writer.writerow([
+                event.id, event.title, event.description or "", event.start_time.isoformat(),
+                event.end_time.isoformat(), event.location or "", "true" if event.is_recurring else "false",
+                event.recurrence_pattern or "", event.owner_id,
+                " ".join(f"{permission.user_id}:{permission.role}" for permission in event.permissions),
+            ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _export_ics(db: Session, user: User):
+    yield ical.CALENDAR_HEADER.encode()
+    now = datetime.datetime.now()
+    for chunk in _event_chunks(db, user):
+        yield "".join(ical.vevent(f"event-{event.id}@neofi", event.updated_at or event.created_at or now,
+                                  versions.snapshot(event)) for event in chunk).encode()
+    yield ical.CALENDAR_FOOTER.encode()
+
+
+_EXPORTERS = {"ndjson": _export_ndjson, "csv": _export_csv, "ics": _export_ics}
+
+
+def export_events(db: Session, user: User, fmt: str) -> Iterator[bytes]:
+    """Everything `user` can see, as body chunks. NDJSON adds each event's live version history
+    ("type": "version" lines after the chunk's events); CSV and iCalendar hold events only."""
+    return _EXPORTERS[fmt](db, user)
+
+
+def _lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    # Line endings are kept: csv needs them to read quoted fields spanning lines.
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    for chunk in chunks:
+        *complete, pending = (pending + decoder.decode(chunk)).split("\n")
+        for line in complete:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _ndjson_records(lines: Iterable[str]):
+    for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"expected a JSON object, got {type(record).__name__}")
+            yield record if record.get("type", "event") == "event" else None
+
+
+def _csv_records(lines: Iterable[str]):
+    for row in csv.DictReader(lines):
+        yield {key: value for key, value in row.items() if key is not None and value != ""}
+
+
+# Each yields one item per record of the file: the event's fields, or None for a record that is not an event.
+_PARSERS = {"ndjson": _ndjson_records, "csv": _csv_records, "ics": ical.iter_vevents}
+
+
+def create_import_job(db: Session, user: User, fmt: str):
+    job = ImportJob(user_id=user.id, format=fmt, status="running", rows_done=0, events_created=0,
+                    elapsed_seconds=0.0, updated_at=datetime.datetime.now())
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_import_job(db: Session, user: User, job_id: int):
+    job = db.get(ImportJob, job_id)
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+def _update_job(db: Session, job_id: int, elapsed: float, **values):
+    db.execute(update(ImportJob).where(ImportJob.id == job_id).values(
+        elapsed_seconds=ImportJob.elapsed_seconds + elapsed, updated_at=datetime.datetime.now(), **values))
+
+
+def _commit_chunk(db: Session, user: User, job_id: int, events_in: list[EventCreate], rows_done: int,
+                  elapsed: float, status: str):
+    # The events and the job's progress commit together: a resumed import never inserts a row twice.
+    event_ids = events.insert_events(db, user, events_in)
+    _update_job(db, job_id, elapsed, rows_done=rows_done, status=status, error=None,
+                events_created=ImportJob.events_created + len(event_ids))
+    db.commit()
+
+
+def _fail_job(db: Session, job_id: int, elapsed: float, error: str):
+    _update_job(db, job_id, elapsed, status="failed", error=error)
+    db.commit()
+
+
+def _describe(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, error['loc'])) or 'record'}: {error['msg']}" for error in exc.errors())
+    return str(exc)
+
+
+def import_stream(user: User, job_id: int, fmt: str, chunks: Iterable[bytes], skip: int = 0):
+    """Parse the upload incrementally and insert its events IMPORT_CHUNK_SIZE per transaction.
+
+    The first `skip` records (the job's rows_done) are passed over, so sending the same file
+    again resumes a failed or interrupted import. A bad record stops the job as failed.
+    """
+    batch, done, started = [], skip, time.perf_counter()
+    committed = skip
+    records = _PARSERS[fmt](_lines(chunks))
+    try:
+        for number, record in enumerate(records, 1):
+            if number > skip and record is not None:
+                batch.append(EventCreate.model_validate(record))
+            done = number
+            if len(batch) >= IMPORT_CHUNK_SIZE:
+                # Each chunk is charged from the previous chunk's commit on, so rows/sec includes the writes.
+                now = time.perf_counter()
+                write(_commit_chunk, user, job_id, batch, done, now - started, "running")
+                batch, started, committed = [], now, done
+        write(_commit_chunk, user, job_id, batch, done, time.perf_counter() - started, "done")
+    except (ValueError, csv.Error) as exc:
+        # Events parsed before the bad record but not yet committed are dropped; a resume re-reads them.
+        write(_fail_job, job_id, time.perf_counter() - started, f"Record {done + 1}: {_describe(exc)}")
+    except Exception as exc:
+        # Anything else is a server error, but the job must not stay "running": mark it failed so it can be
+        # resumed, naming the records that were not committed.
+        write(_fail_job, job_id, time.perf_counter() - started,
+              f"Records from {committed + 1} on: {type(exc).__name__}: {exc}")
+        raise
+
+
+def import_upload(user: User, fmt: str, chunks: Iterable[bytes], job_id: int | None = None):
+    """Start an import job, or resume `job_id`, from the upload `chunks`; returns the job as ImportJobOut."""
+    if job_id is None:
+        job = write(create_import_job, user, fmt, schema=ImportJobOut)
+    else:
+        with ReadSessionLocal() as db:
+            job = ImportJobOut.model_validate(get_import_job(db, user, job_id))
+        if job.status == "done":
+            raise HTTPException(status_code=409, detail="Import already finished")
+        if job.format != fmt:
+            raise HTTPException(status_code=400, detail=f"Import job {job_id} is a {job.format} import")
+    import_stream(user, job.id, fmt, chunks, skip=job.rows_done)
+    with ReadSessionLocal() as db:
+        return ImportJobOut.model_validate(get_import_job(db, user, job.id))
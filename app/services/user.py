@@ -1,36 +1,88 @@
+import os
+
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
-from app.models.user import User, BlacklistedToken
+from app.models.user import User
 from app.schemas.user import RoleEnum
 from app.schemas.auth import RegisterRequest
-from app.utils.db_utils.database import get_db
-from app.utils.security import password_hash, verify_password, create_access_token, oauth_scheme, decode_access_token
+from app.utils.db_utils.database import SessionLocal, get_read_db
+from app.utils.db_utils.writer import after_commit
+from app.utils.invalidation import broadcast, on_broadcast
+from app.utils.security import password_hash_async, verify_and_rehash_async, create_access_token, oauth_scheme, \
+    decode_access_token, token_id
+from app.utils.revocation import revocation_store
+from app.utils.cache import TTLCache
 from fastapi import HTTPException, status, Depends
+from starlette.concurrency import run_in_threadpool
 from jose import jwt, JWTError, ExpiredSignatureError
 
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10000))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 300))
 
-def register_user(db: Session, data: RegisterRequest):
-    existing = db.query(User).filter_by(username=data.username).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="Username already taken")
-    user = User(
-        username=data.username,
-        email=data.email,
-        hashed_password=password_hash(data.password)
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+# username -> detached User, so an authenticated request needs no users query in the steady state.
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+on_broadcast("user", user_cache.invalidate)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    for username in {target.username, *inspect(target).attrs.username.history.deleted}:
+        after_commit(lambda username=username: user_cache.invalidate(username))
+        broadcast(connection, "user", username)
+
+
+def get_user_by_username(db: Session, username: str):
+    user = user_cache.get(username)
+    if user is None:
+        user = db.query(User).filter_by(username=username).first()
+        if user is not None:
+            db.expunge(user)
+            user_cache.set(username, user)
     return user
 
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(User).filter_by(username=username).first()
-    if not user or not verify_password(password, user.hashed_password):
+def _find_user(username: str):
+    with SessionLocal() as db:
+        return db.query(User).filter_by(username=username).first()
+
+
+def _create_user(data: RegisterRequest, hashed_password: str):
+    with SessionLocal() as db:
+        user = User(username=data.username, email=data.email, hashed_password=hashed_password)
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+
+
+def _store_hash(user_id: int, hashed_password: str):
+    with SessionLocal() as db:
+        db.get(User, user_id).hashed_password = hashed_password
+        db.commit()
+
+
+# Async so the request holds no threadpool thread while the password pool hashes; the queries run in the threadpool.
+async def register_user(data: RegisterRequest):
+    if await run_in_threadpool(_find_user, data.username):
+        raise HTTPException(status_code=400, detail="Username already taken")
+    hashed_password = await password_hash_async(data.password)
+    return await run_in_threadpool(_create_user, data, hashed_password)
+
+
+async def authenticate_user(username: str, password: str):
+    user = await run_in_threadpool(_find_user, username)
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await verify_and_rehash_async(password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        await run_in_threadpool(_store_hash, user.id, new_hash)
     return user
 
 
-def get_current_user(token: str = Depends(oauth_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth_scheme), db: Session = Depends(get_read_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid credentials",
@@ -44,7 +96,7 @@ def get_current_user(token: str = Depends(oauth_scheme), db: Session = Depends(g
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter_by(username=username).first()
+    user = get_user_by_username(db, username)
     if user is None:
         raise credentials_exception
     return user
@@ -63,20 +115,19 @@ def require_role(required_role: RoleEnum):
 
 
 def blacklist_token(db: Session, token: str):
-    blacklisted = BlacklistedToken(token=token)
-    db.add(blacklisted)
-    db.commit()
+    payload = verify_token(db, token)
+    revocation_store.revoke(db, token_id(payload, token), payload["exp"])
     return
 
 
 def verify_token(db: Session, token: str):
-    if db.query(BlacklistedToken).filter_by(token=token).first():
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been blacklisted")
-
     try:
         payload = decode_access_token(token)
-        return payload
     except ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+
+    if revocation_store.is_revoked(token_id(payload, token)):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been blacklisted")
+    return payload
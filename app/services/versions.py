@@ -0,0 +1,254 @@
+import datetime
+import difflib
+import heapq
+import json
+import os
+
+from sqlalchemy import func, make_url, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.events import Event, EventVersion, EventVersionArchive
+from app.utils.archive import read_member
+from app.utils.db_utils.database import DATABASE_URL, SQLITE_FILE
+
+VERSIONED_FIELDS = ("title", "description", "start_time", "end_time", "location", "is_recurring",
+                    "recurrence_pattern")
+# Every Nth version is stored as a full snapshot, so rebuilding any version reads at most N rows.
+VERSION_CHECKPOINT_INTERVAL = int(os.environ.get("VERSION_CHECKPOINT_INTERVAL", 10))
+# Append-only file the retention job moves pruned versions to; defaults to a file next to the SQLite database.
+VERSION_ARCHIVE_PATH = os.environ.get("VERSION_ARCHIVE_PATH") or (
+    f"{make_url(DATABASE_URL).database}.versions.gz" if SQLITE_FILE else "event_versions.archive.gz"
+)
+_DATETIME_FIELDS = ("start_time", "end_time", "created_at")
+
+
+def as_bool(value) -> bool:
+    # event_versions.is_recurring is a String column; SQLite hands booleans back as '0'/'1'.
+    return value in (True, 1, "1", "true", "True")
+
+
+def snapshot(event) -> dict:
+    return {field: getattr(event, field) for field in VERSIONED_FIELDS}
+
+
+def record_version(db: Session, event: Event, previous: dict | None = None) -> int:
+    """Append the event's current state as a new version.
+
+    `previous` is the state before the change; without it (a new event) a full snapshot is stored
+    as version 1. Otherwise only the fields that differ are written, unless a checkpoint is due.
+    """
+    number = 1 if previous is None else _next_version_number(db, event)
+    db.add(EventVersion(**version_row(event.id, event.owner_id, number, snapshot(event), previous)))
+    return number
+
+
+def version_row(event_id: int, owner_id: int, number: int, current: dict, previous: dict | None) -> dict:
+    """Column values of version `number` for an event that went from `previous` to `current`."""
+    changed = None
+    if previous is not None and (number - 1) % VERSION_CHECKPOINT_INTERVAL != 0:
+        changed = [field for field in VERSIONED_FIELDS if current[field] != previous[field]]
+    fields = current if changed is None else {field: current[field] for field in changed}
+    return dict(
+        event_id=event_id,
+        version_number=number,
+        owner_id=owner_id,
+        changed_fields=None if changed is None else json.dumps(changed),
+        created_at=datetime.datetime.now(),
+        **fields,
+    )
+
+
+def _bump_versions(condition):
+    # Incremented in SQL so that concurrent editors can never be handed the same number.
+    # Events created before the counter existed start from their highest stored version.
+    legacy = (
+        select(func.max(EventVersion.version_number))
+        .where(EventVersion.event_id == Event.id)
+        .scalar_subquery()
+    )
+    return (
+        update(Event)
+        .where(condition)
+        .values(current_version=func.coalesce(Event.current_version, legacy, 0) + 1)
+        .returning(Event.id, Event.current_version)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _next_version_number(db: Session, event: Event) -> int:
+    number = db.execute(_bump_versions(Event.id == event.id)).one().current_version
+    set_committed_value(event, "current_version", number)
+    return number
+
+
+def next_version_numbers(db: Session, event_ids: list[int]) -> dict[int, int]:
+    """Advance current_version of all `event_ids` in one UPDATE; returns event id -> new number."""
+    return dict(db.execute(_bump_versions(Event.id.in_(event_ids))).all())
+
+
+def _rows_for_range(db: Session, event_id: int, first: int | None, last: int | None):
+    # Rows from the nearest checkpoint at or before `first` up to `last`, in one ordered query.
+    query = db.query(EventVersion).filter(EventVersion.event_id == event_id)
+    if first is not None:
+        checkpoint = (
+            select(func.max(EventVersion.version_number))
+            .where(EventVersion.event_id == event_id,
+                   EventVersion.changed_fields.is_(None),
+                   EventVersion.version_number <= first)
+            .scalar_subquery()
+        )
+        # No checkpoint at or before `first` once retention archived it: start at the first live row.
+        query = query.filter(EventVersion.version_number >= func.coalesce(checkpoint, 0))
+    if last is not None:
+        query = query.filter(EventVersion.version_number <= last)
+    return query.order_by(EventVersion.version_number)
+
+
+def iter_states(rows):
+    """Yield (row, full state) for each stored row, applying deltas on top of the last checkpoint."""
+    state = {}
+    for row in rows:
+        fields = VERSIONED_FIELDS if row.changed_fields is None else json.loads(row.changed_fields)
+        for field in fields:
+            state[field] = getattr(row, field)
+        state["is_recurring"] = as_bool(state.get("is_recurring"))
+        yield row, dict(state)
+
+
+def materialize(row: EventVersion, state: dict) -> EventVersion:
+    # A detached, fully populated copy; never added to the session.
+    return EventVersion(
+        id=row.id,
+        event_id=row.event_id,
+        version_number=row.version_number,
+        owner_id=row.owner_id,
+        created_at=row.created_at,
+        changed_fields=row.changed_fields,
+        **state,
+    )
+
+
+def archive_record(row: EventVersion, state: dict) -> bytes:
+    """One archive line: the version fully materialized, so it never depends on rows that are gone."""
+    record = {"id": row.id, "event_id": row.event_id, "version_number": row.version_number,
+              "owner_id": row.owner_id, "created_at": row.created_at, **state}
+    return json.dumps(record, default=datetime.datetime.isoformat).encode()
+
+
+def _from_archive_record(line: bytes) -> EventVersion:
+    record = json.loads(line)
+    for field in _DATETIME_FIELDS:
+        if record[field] is not None:
+            record[field] = datetime.datetime.fromisoformat(record[field])
+    return EventVersion(changed_fields=None, **record)
+
+
+def archived_versions(db: Session, event_id: int, first: int | None = None, last: int | None = None,
+                      version_id: int | None = None):
+    """Archived versions of the event, oldest first; optionally only numbers in [first, last] or `version_id`."""
+    query = db.query(EventVersionArchive).filter(EventVersionArchive.event_id == event_id)
+    if first is not None:
+        query = query.filter(EventVersionArchive.version_number >= first)
+    if last is not None:
+        query = query.filter(EventVersionArchive.version_number <= last)
+    if version_id is not None:
+        query = query.filter(EventVersionArchive.version_id == version_id)
+    entries = query.all()
+    wanted = {entry.version_number for entry in entries}
+    found = {}
+    # Each member holds one event's versions from one retention run; read each member once.
+    for offset, length in dict.fromkeys((entry.offset, entry.length) for entry in entries):
+        for line in read_member(VERSION_ARCHIVE_PATH, offset, length):
+            version = _from_archive_record(line)
+            if version.event_id == event_id and version.version_number in wanted:
+                found[version.version_number] = version
+    return [found[number] for number in sorted(found)]
+
+
+def get_version(db: Session, event_id: int, version_number: int):
+    rows = _rows_for_range(db, event_id, version_number, version_number)
+    for row, state in iter_states(rows):
+        if row.version_number == version_number:
+            return materialize(row, state)
+    archived = archived_versions(db, event_id, version_number, version_number)
+    return archived[0] if archived else None
+
+
+def get_version_by_id(db: Session, event_id: int, version_id: int):
+    number = db.query(EventVersion.version_number).filter_by(event_id=event_id, id=version_id).scalar()
+    if number is None:
+        archived = archived_versions(db, event_id, version_id=version_id)
+        return archived[0] if archived else None
+    return get_version(db, event_id, number)
+
+
+def get_all_versions(db: Session, event_id: int, include_archived: bool = False):
+    return list(iter_versions(db, event_id, include_archived=include_archived))
+
+
+def iter_versions(db: Session, event_id: int, batch_size: int | None = None, include_archived: bool = False):
+    rows = _rows_for_range(db, event_id, None, None)
+    if batch_size:
+        rows = rows.yield_per(batch_size)
+    live = (materialize(row, state) for row, state in iter_states(rows))
+    if include_archived:
+        # Retention can prune between kept versions, so merge rather than prepend.
+        yield from heapq.merge(archived_versions(db, event_id), live, key=lambda version: version.version_number)
+    else:
+        yield from live
+
+
+def _changes(before: dict, after: dict) -> dict:
+    return {field: [before[field], after[field]] for field in VERSIONED_FIELDS if before[field] != after[field]}
+
+
+def _text_diff(before: str | None, after: str | None) -> list[str]:
+    return list(difflib.unified_diff((before or "").splitlines(), (after or "").splitlines(),
+                                     "before", "after", lineterm=""))
+
+
+def diff_range(db: Session, event_id: int, from_number: int, to_number: int, steps: bool = False,
+               text_fields: tuple[str, ...] = ()):
+    """Net diff between two versions plus, optionally, the change list of every step in between.
+
+    The whole range (from the checkpoint preceding it) is read in one ordered query and walked once,
+    merged with any archived versions in it. Only fields that differ are returned.
+    """
+    low, high = sorted((from_number, to_number))
+    start = end = previous = None
+    step_changes = []
+    live = ((row.version_number, state) for row, state in iter_states(_rows_for_range(db, event_id, low, high)))
+    archived = ((version.version_number, snapshot(version)) for version in archived_versions(db, event_id, low, high))
+    for number, state in heapq.merge(archived, live, key=lambda item: item[0]):
+        if number == low:
+            start = state
+        elif start is not None and steps:
+            step_changes.append({"version_number": number, "changes": _changes(previous, state)})
+        if number == high:
+            end = state
+        previous = state
+    if start is None or end is None:
+        return None
+
+    before, after = (start, end) if from_number <= to_number else (end, start)
+    result = {
+        "event_id": event_id,
+        "from_version": from_number,
+        "to_version": to_number,
+        "diff": {field: {"version_1": old, "version_2": new} for field, (old, new) in _changes(before, after).items()},
+    }
+    if steps:
+        result["steps"] = step_changes
+    if text_fields:
+        result["text_diff"] = {field: _text_diff(before[field], after[field])
+                               for field in text_fields if before[field] != after[field]}
+    return result
+
+
+def version_numbers(db: Session, event_id: int, version_ids: list[int]) -> dict[int, int]:
+    rows = db.query(EventVersion.id, EventVersion.version_number).filter(
+        EventVersion.event_id == event_id, EventVersion.id.in_(version_ids))
+    archived = db.query(EventVersionArchive.version_id, EventVersionArchive.version_number).filter(
+        EventVersionArchive.event_id == event_id, EventVersionArchive.version_id.in_(version_ids))
+    return dict(rows.union_all(archived).all())
@@ -0,0 +1,28 @@
+import fcntl
+import gzip
+import os
+
+
+def append_member(path: str, lines: list[bytes]) -> tuple[int, int]:
+    """Append `lines` as one gzip member and fsync; returns its (offset, length) in the file.
+
+    The file is only ever appended to, under an exclusive lock so several processes can share it.
+    A member written by a transaction that later fails is simply never referenced.
+    """
+    data = gzip.compress(b"\n".join(lines) + b"\n")
+    with open(path, "ab") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            offset = f.seek(0, os.SEEK_END)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    return offset, len(data)
+
+
+def read_member(path: str, offset: int, length: int) -> list[bytes]:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return gzip.decompress(f.read(length)).splitlines()
@@ -0,0 +1,23 @@
+import asyncio
+import logging
+
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.db_utils.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def run_with_session(job):
+    with SessionLocal() as db:
+        return job(db)
+
+
+async def periodic(interval: float, job):
+    """Run `job(db)` in the threadpool every `interval` seconds, with its own session."""
+    while True:
+        try:
+            await run_in_threadpool(run_with_session, job)
+        except Exception:
+            logger.exception("Background job %s failed", job.__name__)
+        await asyncio.sleep(interval)
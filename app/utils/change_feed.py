@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CHANGE_REPLAY_SIZE = int(os.environ.get("CHANGE_REPLAY_SIZE", 10000))
+CHANGE_QUEUE_SIZE = int(os.environ.get("CHANGE_QUEUE_SIZE", 1000))
+
+
+class Subscription:
+    """A connected client's queue of changes, filled on its own event loop.
+
+    A client that falls CHANGE_QUEUE_SIZE changes behind is not buffered further: its queue is
+    replaced by a single None, and the stream catches up from the change log instead.
+    """
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.overflowed = False
+
+    def _deliver(self, changes: list[dict]):
+        if self.overflowed:
+            return
+        if self.queue.qsize() + len(changes) > CHANGE_QUEUE_SIZE:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return
+        for change in changes:
+            self.queue.put_nowait(change)
+
+    def resume(self):
+        self.overflowed = False
+
+
+class ChangeFeed:
+    """In-process pub/sub of committed changes, keeping the most recent ones for clients that reconnect.
+
+    Changes are dicts with `seq`, `event_id` and `user_id`; a None `user_id` is meant for everyone holding a
+    permission on the event, which the `holders` callback given to start() looks up. `floor` is the seq up to
+    which the buffer is not complete: every change after it that this process published is still held in memory.
+    """
+
+    def __init__(self, replay_size: int = CHANGE_REPLAY_SIZE):
+        self._recent = deque(maxlen=replay_size)
+        self._subscribers: dict[int, set[Subscription]] = {}
+        self._lock = threading.Lock()
+        # None until start(): the buffer alone cannot say what happened before the process came up.
+        self.floor = None
+        self._holders = None
+        self._pending = queue.Queue()
+        self._dispatcher = None
+
+    def start(self, latest_seq: int, holders):
+        """`holders(event_ids)` returns {event_id: user ids holding a permission on it}, from the database."""
+        with self._lock:
+            self.floor = latest_seq if not self._recent else min(latest_seq, self._recent[0]["seq"] - 1)
+            self._holders = holders
+            if self._dispatcher is None:
+                # One thread, so subscribers get changes in seq order and the writer never waits on the lookup.
+                self._dispatcher = threading.Thread(target=self._dispatch_forever, name="change-feed", daemon=True)
+                self._dispatcher.start()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscribers.pop(subscription.user_id, None)
+
+    def publish(self, changes: list[dict]):
+        """Called from any thread once `changes` are committed, in seq order."""
+        with self._lock:
+            for change in changes:
+                if len(self._recent) == self._recent.maxlen and self.floor is not None:
+                    self.floor = self._recent[0]["seq"]
+                self._recent.append(change)
+            if self._dispatcher is not None:
+                self._pending.put(changes)
+
+    def _dispatch_forever(self):
+        while True:
+            changes = self._pending.get()
+            # Whatever else was published meanwhile goes out with it: one holders lookup for the lot.
+            while not self._pending.empty():
+                changes = changes + self._pending.get_nowait()
+            try:
+                self._dispatch(changes)
+            except Exception:
+                logger.exception("Change feed dispatch failed")
+
+    def _dispatch(self, changes: list[dict]):
+        with self._lock:
+            subscribers = {user_id: list(subscriptions) for user_id, subscriptions in self._subscribers.items()}
+        if not subscribers:
+            return
+        shared = {change["event_id"] for change in changes if change["user_id"] is None}
+        holders = self._holders(shared) if shared else {}
+        deliveries: dict[Subscription, list[dict]] = {}
+        for change in changes:
+            user_ids = holders.get(change["event_id"], ()) if change["user_id"] is None else (change["user_id"],)
+            for user_id in user_ids:
+                for subscription in subscribers.get(user_id, ()):
+                    deliveries.setdefault(subscription, []).append(change)
+        for subscription, batch in deliveries.items():
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, batch)
+            except RuntimeError:
+                # The subscriber's loop is closed; it unsubscribes on its way out.
+                pass
+
+    def recent(self, user_id: int, since: int) -> list[dict] | None:
+        """Changes after `since` for the user or for everyone on their event (the caller checks which events
+        those are), or None when the buffer does not reach back that far."""
+        with self._lock:
+            if self.floor is None or since < self.floor:
+                return None
+            return [change for change in self._recent
+                    if change["seq"] > since and change["user_id"] in (user_id, None)]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,75 @@
+from sqlalchemy import column, table, text
+from sqlalchemy.exc import OperationalError
+
+# SQLite R*Tree over occurrence times so free/busy is a window query instead of a scan. It has one
+# row per event_occurrences row, kept in step by triggers; who is busy is resolved from permissions
+# when queried, so sharing an event writes nothing here. Times are whole minutes since the epoch,
+# rounded outwards, so the index returns a superset that callers filter exactly.
+occurrences_rtree = table("event_occurrences_rtree", column("id"), column("start_lo"), column("end_hi"))
+
+
+def _start_minute(row: str) -> str:
+    return f"CAST(strftime('%s', {row}start_time) AS INTEGER) / 60"
+
+
+def _end_minute(row: str) -> str:
+    return f"(CAST(strftime('%s', {row}end_time) AS INTEGER) + 59) / 60"
+
+
+# The first index kept one row per (user with a permission, occurrence).
+_LEGACY = [
+    "DROP TRIGGER IF EXISTS busy_slots_ai",
+    "DROP TRIGGER IF EXISTS busy_slots_ad",
+    "DROP TRIGGER IF EXISTS event_occurrences_busy_ai",
+    "DROP TRIGGER IF EXISTS event_occurrences_busy_ad",
+    "DROP TRIGGER IF EXISTS permissions_busy_ai",
+    "DROP TRIGGER IF EXISTS permissions_busy_ad",
+    "DROP TRIGGER IF EXISTS permissions_busy_au",
+    "DROP TABLE IF EXISTS busy_slots_rtree",
+    "DROP TABLE IF EXISTS busy_slots",
+]
+
+DDL = [
+    "CREATE VIRTUAL TABLE event_occurrences_rtree USING rtree_i32(id, start_lo, end_hi)",
+    f"""CREATE TRIGGER event_occurrences_rtree_ai AFTER INSERT ON event_occurrences BEGIN
+        INSERT INTO event_occurrences_rtree VALUES (NEW.id, {_start_minute("NEW.")}, {_end_minute("NEW.")});
+    END""",
+    """CREATE TRIGGER event_occurrences_rtree_ad AFTER DELETE ON event_occurrences BEGIN
+        DELETE FROM event_occurrences_rtree WHERE id = OLD.id;
+    END""",
+    f"""CREATE TRIGGER event_occurrences_rtree_au AFTER UPDATE OF start_time, end_time ON event_occurrences BEGIN
+        UPDATE event_occurrences_rtree SET start_lo = {_start_minute("NEW.")}, end_hi = {_end_minute("NEW.")}
+        WHERE id = NEW.id;
+    END""",
+    # Backfill from whatever is already indexed.
+    f"""INSERT INTO event_occurrences_rtree
+    SELECT id, {_start_minute("")}, {_end_minute("")} FROM event_occurrences""",
+]
+
+_available = {}
+
+
+def install_busy_index(engine):
+    """Create the index on SQLite builds with R*Tree support; other databases use the B-tree path."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'event_occurrences_rtree'")).first():
+            return True
+    try:
+        with engine.begin() as conn:
+            for statement in _LEGACY + DDL:
+                conn.execute(text(statement))
+    except OperationalError:
+        # SQLite compiled without R*Tree.
+        return False
+    return True
+
+
+def busy_index_available(connection) -> bool:
+    engine = connection.engine
+    if engine not in _available:
+        _available[engine] = engine.dialect.name == "sqlite" and connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'event_occurrences_rtree'")
+        ).first() is not None
+    return _available[engine]
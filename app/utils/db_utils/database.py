@@ -1,21 +1,102 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, make_url, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 from dotenv import load_dotenv
 
+from app.utils.db_utils.busy_index import install_busy_index
+from app.utils.db_utils.list_index import install_list_index
+from app.utils.db_utils.search_index import install_search_index
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Opt-in: serve the hot routes from async handlers on an AsyncSession (see async_database.py).
+ASYNC_MODE = os.getenv("ASYNC_MODE", "false").lower() in ("1", "true", "yes")
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", 8))
+
+_url = make_url(DATABASE_URL)
+# WAL, the read pool and the group-commit writer only make sense for an on-disk SQLite database.
+SQLITE_FILE = _url.get_backend_name() == "sqlite" and _url.database not in (None, "", ":memory:")
+
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record=None, read_only: bool = False):
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        # WAL lets readers proceed while a write is in progress; it persists in the file once set.
+        cursor.execute("PRAGMA journal_mode=WAL")
+    else:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
 
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+if SQLITE_FILE:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    # Reads get their own pool of read-only connections, so they never queue behind the writer.
+    read_engine = create_engine(
+        f"sqlite:///file:{os.path.abspath(_url.database)}?mode=ro&uri=true",
+        connect_args={"check_same_thread": False},
+        pool_size=SQLITE_READ_POOL_SIZE,
+    )
+    event.listen(read_engine, "connect", lambda conn, record: apply_sqlite_pragmas(conn, record, read_only=True))
+else:
+    read_engine = engine
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, autocommit=False, autoflush=False)
 Base = declarative_base()
 
+def init_db():
+    Base.metadata.create_all(bind=engine)
+    # create_all never alters existing tables; add nullable columns that were introduced later.
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    # create_all skips tables that already exist, so indexes added to a model later are created here.
+    # An index that became unique replaces its non-unique predecessor, after removing duplicate rows.
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"]: index for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.unique and not existing.get(index.name, {}).get("unique"):
+                with engine.begin() as conn:
+                    if "deduplicate" in index.info:
+                        conn.execute(text(index.info["deduplicate"]))
+                    if index.name in existing:
+                        index.drop(bind=conn)
+                    index.create(bind=conn)
+            else:
+                index.create(bind=engine, checkfirst=True)
+    install_busy_index(engine)
+    install_list_index(engine)
+    install_search_index(engine)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,46 @@
+from sqlalchemy import text
+
+# SQLite index that pages a user's events in (start_time, id) order. Each permission row carries
+# its event's start_time; triggers keep the copy in step however the permission or the event is
+# written (single writes, batch endpoints, share upserts, rollback, import). A keyset page is then
+# one seek into ix_permissions_user_start, whatever the number of events the user or the table has.
+DDL = [
+    """CREATE TRIGGER permissions_start_ai AFTER INSERT ON permissions BEGIN
+        UPDATE permissions SET start_time = (SELECT start_time FROM events WHERE id = NEW.event_id)
+        WHERE id = NEW.id;
+    END""",
+    """CREATE TRIGGER permissions_start_au AFTER UPDATE OF event_id ON permissions BEGIN
+        UPDATE permissions SET start_time = (SELECT start_time FROM events WHERE id = NEW.event_id)
+        WHERE id = NEW.id;
+    END""",
+    """CREATE TRIGGER events_start_au AFTER UPDATE OF start_time ON events BEGIN
+        UPDATE permissions SET start_time = NEW.start_time WHERE event_id = NEW.id;
+    END""",
+    # Backfill rows written before the triggers existed.
+    """UPDATE permissions SET start_time = (SELECT start_time FROM events WHERE events.id = permissions.event_id)""",
+    "CREATE INDEX ix_permissions_user_start ON permissions (user_id, start_time, event_id)",
+]
+
+_available = {}
+
+
+def install_list_index(engine):
+    """Create the index on SQLite; other databases page through the events join instead."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'ix_permissions_user_start'")).first():
+            return True
+    with engine.begin() as conn:
+        for statement in DDL:
+            conn.execute(text(statement))
+    return True
+
+
+def list_index_available(connection) -> bool:
+    engine = connection.engine
+    if engine not in _available:
+        _available[engine] = engine.dialect.name == "sqlite" and connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'ix_permissions_user_start'")
+        ).first() is not None
+    return _available[engine]
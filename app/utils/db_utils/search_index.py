@@ -0,0 +1,64 @@
+from sqlalchemy import column, table, text
+from sqlalchemy.exc import OperationalError
+
+# SQLite FTS5 index over events' title, description and location. It is an external-content table:
+# the text lives only in `events`, and triggers keep the index in step with every insert, update
+# and delete, however it is issued (single writes, batch endpoints, rollback, import).
+events_fts = table("events_fts", column("rowid"), column("title"), column("description"), column("location"))
+
+_COLUMNS = "title, description, location"
+_NEW = "NEW.title, NEW.description, NEW.location"
+_OLD = "OLD.title, OLD.description, OLD.location"
+
+DDL = [
+    # remove_diacritics folds "café" to "cafe"; the prefix indexes make "meet*" a lookup instead of a scan.
+    f"""CREATE VIRTUAL TABLE events_fts USING fts5({_COLUMNS}, content='events', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    f"""CREATE TRIGGER events_fts_ai AFTER INSERT ON events BEGIN
+        INSERT INTO events_fts (rowid, {_COLUMNS}) VALUES (NEW.id, {_NEW});
+    END""",
+    f"""CREATE TRIGGER events_fts_ad AFTER DELETE ON events BEGIN
+        INSERT INTO events_fts (events_fts, rowid, {_COLUMNS}) VALUES ('delete', OLD.id, {_OLD});
+    END""",
+    f"""CREATE TRIGGER events_fts_au AFTER UPDATE OF {_COLUMNS} ON events BEGIN
+        INSERT INTO events_fts (events_fts, rowid, {_COLUMNS}) VALUES ('delete', OLD.id, {_OLD});
+        INSERT INTO events_fts (rowid, {_COLUMNS}) VALUES (NEW.id, {_NEW});
+    END""",
+    # Index whatever is already there.
+    "INSERT INTO events_fts (events_fts) VALUES ('rebuild')",
+]
+
+_available = {}
+
+
+def install_search_index(engine):
+    """Create the index on SQLite builds with FTS5; other databases search with LIKE instead."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'events_fts'")).first():
+            return True
+    try:
+        with engine.begin() as conn:
+            for statement in DDL:
+                conn.execute(text(statement))
+    except OperationalError:
+        # SQLite compiled without FTS5.
+        return False
+    return True
+
+
+def search_index_available(connection) -> bool:
+    engine = connection.engine
+    if engine not in _available:
+        _available[engine] = engine.dialect.name == "sqlite" and connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = 'events_fts'")
+        ).first() is not None
+    return _available[engine]
+
+
+def rebuild_search_index(connection):
+    """Re-read every event into the index, e.g. after rows were changed with the triggers dropped."""
+    connection.execute(text("INSERT INTO events_fts (events_fts) VALUES ('rebuild')"))
+    # Merge the b-tree segments the rebuild left behind, so queries touch as few as possible.
+    connection.execute(text("INSERT INTO events_fts (events_fts) VALUES ('optimize')"))
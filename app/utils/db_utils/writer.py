@@ -0,0 +1,180 @@
+import asyncio
+import contextvars
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.utils.db_utils.database import DATABASE_URL, SQLITE_FILE, SessionLocal, apply_sqlite_pragmas
+
+logger = logging.getLogger(__name__)
+
+SQLITE_GROUP_COMMIT = os.getenv("SQLITE_GROUP_COMMIT", "true").lower() in ("1", "true", "yes")
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 64))
+
+_local = threading.local()
+
+
+def after_commit(callback):
+    """Run `callback` once the current write is durable.
+
+    Inside a writer group that is after the group's COMMIT; elsewhere it runs straight away.
+    Cache invalidation goes through here so a reader cannot re-cache the pre-commit state.
+    """
+    pending = getattr(_local, "pending", None)
+    callback()
+    if pending is not None:
+        pending.append(callback)
+
+
+def on_commit(callback):
+    """Run `callback` only once the current write is durable: after the writer group's COMMIT, or
+    straight away outside one. Nothing runs if the group fails, unlike after_commit."""
+    pending = getattr(_local, "pending", None)
+    if pending is None:
+        callback()
+    else:
+        pending.append(callback)
+
+
+def as_schema(result, schema=None):
+    # Rows must be converted while their session is still open, before lazy loads become impossible.
+    if schema is None or result is None or isinstance(result, bool):
+        return result
+    if isinstance(result, list):
+        return [schema.model_validate(item, from_attributes=True) for item in result]
+    return schema.model_validate(result, from_attributes=True)
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "schema", "future", "context")
+
+    def __init__(self, fn, args, kwargs, schema):
+        self.fn, self.args, self.kwargs, self.schema = fn, args, kwargs, schema
+        self.future = Future()
+        # Runs in the submitter's context so per-request instrumentation still sees the job's queries.
+        self.context = contextvars.copy_context()
+
+    def __call__(self, session: Session):
+        return self.context.run(lambda: as_schema(self.fn(session, *self.args, **self.kwargs), self.schema))
+
+
+class GroupCommitWriter:
+    """Single writer for SQLite that turns concurrent write requests into group commits.
+
+    Each job is a service function run against its own Session inside a SAVEPOINT of the
+    writer's transaction, so `db.commit()` / `db.rollback()` in the service only release or
+    roll back that savepoint and a failing job never affects the others. Whatever is queued
+    when the writer becomes free is committed together: one fsync for the whole group.
+    """
+
+    def __init__(self, url: str, max_batch: int):
+        self.max_batch = max_batch
+        self.groups = 0
+        self.jobs = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._engine = create_engine(url, connect_args={"check_same_thread": False}, pool_size=1)
+        event.listen(self._engine, "connect", self._on_connect)
+        # pysqlite's implicit transactions break SAVEPOINT; take the write lock up front instead.
+        event.listen(self._engine, "begin", lambda conn: conn.exec_driver_sql("BEGIN IMMEDIATE"))
+
+    @staticmethod
+    def _on_connect(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, connection_record)
+        dbapi_connection.isolation_level = None
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="sqlite-writer", daemon=True)
+                    self._thread.start()
+
+    def submit(self, fn, *args, schema=None, **kwargs) -> Future:
+        self._ensure_started()
+        job = _Job(fn, args, kwargs, schema)
+        self._queue.put(job)
+        return job.future
+
+    def run(self, fn, *args, schema=None, **kwargs):
+        return self.submit(fn, *args, schema=schema, **kwargs).result()
+
+    async def run_async(self, fn, *args, schema=None, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, schema=schema, **kwargs))
+
+    def shutdown(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        self._engine.dispose()
+
+    def _loop(self):
+        with self._engine.connect() as connection:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                group = [job]
+                while len(group) < self.max_batch:
+                    try:
+                        job = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if job is None:
+                        self._queue.put(None)
+                        break
+                    group.append(job)
+                self._commit_group(connection, group)
+
+    def _commit_group(self, connection, group: list[_Job]):
+        _local.pending = callbacks = []
+        outcomes = []
+        try:
+            transaction = connection.begin()
+            for job in group:
+                session = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+                try:
+                    outcomes.append((job, job(session), None))
+                except BaseException as exc:
+                    session.rollback()
+                    outcomes.append((job, None, exc))
+                finally:
+                    session.close()
+            transaction.commit()
+        except BaseException as exc:
+            logger.exception("Group commit of %d writes failed", len(group))
+            if connection.in_transaction():
+                connection.rollback()
+            for job in group:
+                job.future.set_exception(exc)
+            return
+        finally:
+            _local.pending = None
+
+        self.groups += 1
+        self.jobs += len(group)
+        for callback in callbacks:
+            callback()
+        for job, result, exc in outcomes:
+            if exc is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(exc)
+
+
+db_writer = GroupCommitWriter(DATABASE_URL, GROUP_COMMIT_MAX_BATCH) if SQLITE_FILE and SQLITE_GROUP_COMMIT else None
+
+
+def write(fn, *args, schema=None, **kwargs):
+    """Run the service function `fn(db, *args, **kwargs)` as a write and return its result as `schema`."""
+    if db_writer is not None:
+        return db_writer.run(fn, *args, schema=schema, **kwargs)
+    with SessionLocal() as db:
+        return as_schema(fn(db, *args, **kwargs), schema)
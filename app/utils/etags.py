@@ -0,0 +1,52 @@
+import re
+
+from fastapi import HTTPException, Request, Response
+
+# Strong validators built from counters on the events row, so a request can be answered (304/412)
+# from one primary-key lookup instead of loading and serializing the resource.
+#   event      "e<id>.<current_version>.<permissions_version>"
+#   changelog  "c<id>.<current_version>.<archived_versions>", with ".all" when archived versions are included
+#   permissions "p<id>.<permissions_version>"
+_EVENT_ETAG = re.compile(r'^"e(\d+)\.(\d+)\.(\d+)"$')
+
+
+def event_etag(event_id: int, version: int | None, permissions_version: int | None) -> str:
+    return f'"e{event_id}.{version or 0}.{permissions_version or 0}"'
+
+
+def changelog_etag(event_id: int, version: int | None, archived: int | None, include_archived: bool = False) -> str:
+    return f'"c{event_id}.{version or 0}.{archived or 0}{".all" if include_archived else ""}"'
+
+
+def permissions_etag(event_id: int, permissions_version: int | None) -> str:
+    return f'"p{event_id}.{permissions_version or 0}"'
+
+
+def parse_event_etag(etag: str) -> tuple[int, int, int] | None:
+    match = _EVENT_ETAG.match(etag)
+    return tuple(int(part) for part in match.groups()) if match else None
+
+
+def _header_tags(request: Request, name: str) -> list[str] | None:
+    value = request.headers.get(name)
+    if value is None:
+        return None
+    return [tag.strip() for tag in value.split(",") if tag.strip()]
+
+
+def if_match(request: Request) -> list[str] | None:
+    """The If-Match tags (None without the header). Weak tags never match, per RFC 9110."""
+    tags = _header_tags(request, "if-match")
+    return None if tags is None else [tag for tag in tags if not tag.startswith("W/")]
+
+
+def not_modified(request: Request, etag: str) -> Response | None:
+    """A 304 for the request if its If-None-Match covers `etag` (weak comparison), else None."""
+    tags = _header_tags(request, "if-none-match")
+    if tags and ("*" in tags or etag in (tag.removeprefix("W/") for tag in tags)):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
+
+
+def precondition_failed():
+    raise HTTPException(status_code=412, detail="Precondition failed: the event has changed")
@@ -0,0 +1,116 @@
+from datetime import date, datetime, timedelta
+from typing import Iterable, Iterator
+
+# The small part of RFC 5545 the export and import need: VEVENTs with floating local times.
+CALENDAR_HEADER = "BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//neofi//events//EN\r\n"
+CALENDAR_FOOTER = "END:VCALENDAR\r\n"
+_MAX_LINE_OCTETS = 75
+
+
+def escape_text(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n") \
+        .replace("\n", "\\n")
+
+
+def unescape_text(value: str) -> str:
+    out, chars = [], iter(value)
+    for char in chars:
+        if char == "\\":
+            char = next(chars, "")
+            out.append("\n" if char in "nN" else char)
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def fold(line: str) -> str:
+    """Content line folded at 75 octets without splitting a UTF-8 sequence, CRLF-terminated."""
+    if len(line.encode()) <= _MAX_LINE_OCTETS:
+        return line + "\r\n"
+    parts, current, size = [], [], 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > _MAX_LINE_OCTETS:
+            parts.append("".join(current))
+            current, size = [], 1  # continuation lines start with a space
+        current.append(char)
+        size += width
+    parts.append("".join(current))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def format_datetime(value: datetime) -> str:
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def parse_datetime(value: str, params: dict) -> tuple[datetime, bool]:
+    """(datetime, is_date) for a DTSTART/DTEND value. TZID is ignored: the app stores naive times."""
+    value = value.strip().rstrip("Z")
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.combine(date(int(value[:4]), int(value[4:6]), int(value[6:8])), datetime.min.time()), True
+    return datetime.strptime(value, "%Y%m%dT%H%M%S"), False
+
+
+def vevent(uid: str, stamp: datetime, fields: dict) -> str:
+    """One VEVENT from an event's field values (as in EventBase)."""
+    lines = ["BEGIN:VEVENT", f"UID:{uid}", f"DTSTAMP:{format_datetime(stamp)}",
+             f"DTSTART:{format_datetime(fields['start_time'])}", f"DTEND:{format_datetime(fields['end_time'])}",
+             f"SUMMARY:{escape_text(fields['title'])}"]
+    if fields.get("description"):
+        lines.append(f"DESCRIPTION:{escape_text(fields['description'])}")
+    if fields.get("location"):
+        lines.append(f"LOCATION:{escape_text(fields['location'])}")
+    if fields.get("is_recurring") and fields.get("recurrence_pattern"):
+        lines.append(f"RRULE:{fields['recurrence_pattern'].removeprefix('RRULE:')}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    current = None
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _property(line: str) -> tuple[str, dict, str]:
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    return name.upper(), dict(param.upper().split("=", 1) for param in params if "=" in param), value
+
+
+def iter_vevents(lines: Iterable[str]) -> Iterator[dict]:
+    """Event field values (EventBase names) for each VEVENT, parsed one content line at a time."""
+    fields = None
+    for line in _unfold(lines):
+        name, params, value = _property(line)
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            fields = {}
+        elif fields is None:
+            continue
+        elif name == "END" and value.upper() == "VEVENT":
+            if "end_time" not in fields and "start_time" in fields:
+                # No DTEND: a date lasts the whole day, a date-time is instantaneous (RFC 5545 3.6.1).
+                fields["end_time"] = fields["start_time"] + timedelta(days=1 if fields.pop("_all_day") else 0)
+            fields.pop("_all_day", None)
+            yield fields
+            fields = None
+        elif name == "SUMMARY":
+            fields["title"] = unescape_text(value)
+        elif name == "DESCRIPTION":
+            fields["description"] = unescape_text(value)
+        elif name == "LOCATION":
+            fields["location"] = unescape_text(value)
+        elif name == "DTSTART":
+            fields["start_time"], fields["_all_day"] = parse_datetime(value, params)
+        elif name == "DTEND":
+            fields["end_time"], _ = parse_datetime(value, params)
+        elif name == "RRULE":
+            fields["is_recurring"], fields["recurrence_pattern"] = True, value
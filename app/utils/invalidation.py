@@ -0,0 +1,65 @@
+import datetime
+import os
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.user import Invalidation
+
+# Set by app.serve for its workers. Each process keeps its own in-memory caches, so a write made by one
+# is announced to the others through the invalidations table, which every worker polls.
+MULTI_WORKER = os.environ.get("MULTI_WORKER", "false").lower() in ("1", "true", "yes")
+INVALIDATION_POLL_INTERVAL = float(os.environ.get("INVALIDATION_POLL_INTERVAL", 0.2))
+INVALIDATION_KEEP_SECONDS = float(os.environ.get("INVALIDATION_KEEP_SECONDS", 600))
+
+_handlers = {}
+_last_seq = 0
+_previous = []
+
+
+def on_broadcast(cache: str, handler):
+    """Run `handler(key)` whenever any worker broadcasts `key` for `cache`."""
+    _handlers[cache] = handler
+
+
+def broadcast(db, cache: str, key: str):
+    """Announce `key` to every worker once the transaction `db` (a Session or Connection) commits.
+
+    The caller still updates its own cache as before; with a single process nothing is written.
+    """
+    if MULTI_WORKER:
+        db.execute(insert(Invalidation), {"cache": cache, "key": key, "created_at": datetime.datetime.now()})
+
+
+def start_invalidations(db: Session):
+    global _last_seq
+    _last_seq = db.scalar(select(func.max(Invalidation.seq))) or 0
+
+
+def apply_invalidations(db: Session):
+    """Run the handlers for everything broadcast since the last poll, this worker's own included.
+
+    The previous poll's entries are applied once more: a read that started before their write committed
+    may have cached the old value in between, the same race after_commit guards against in one process.
+    """
+    global _last_seq, _previous
+    rows = db.execute(
+        select(Invalidation.seq, Invalidation.cache, Invalidation.key)
+        .where(Invalidation.seq > _last_seq)
+        .order_by(Invalidation.seq)
+    ).all()
+    for _, cache, key in _previous + rows:
+        handler = _handlers.get(cache)
+        if handler is not None:
+            handler(key)
+    if rows:
+        _last_seq = rows[-1].seq
+    _previous = rows
+
+
+def prune_invalidations(db: Session):
+    # Every worker has long since applied these; the newest row stays so `seq` never restarts.
+    newest = db.scalar(select(func.max(Invalidation.seq))) or 0
+    cutoff = datetime.datetime.now() - datetime.timedelta(seconds=INVALIDATION_KEEP_SECONDS)
+    db.execute(delete(Invalidation).where(Invalidation.created_at < cutoff, Invalidation.seq < newest))
+    db.commit()
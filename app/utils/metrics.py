@@ -0,0 +1,180 @@
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# A request running more statements than this is logged as a likely N+1.
+QUERY_COUNT_WARN_THRESHOLD = int(os.environ.get("QUERY_COUNT_WARN_THRESHOLD", 50))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name, self.help_text, self.labels, self.buckets = name, help_text, labels, buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values: tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for label_values, counts, total in snapshot:
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...]):
+        self.name, self.help_text, self.labels = name, help_text, labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values: tuple, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{{{_labels(self.labels, values)}}} {value}" for values, value in self._values.items()]
+        return lines
+
+
+def _labels(names: tuple[str, ...], values: tuple) -> str:
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_duration = Histogram("http_request_duration_seconds", "Request latency by route.",
+                             ("method", "route", "status"), LATENCY_BUCKETS)
+request_queries = Histogram("http_request_queries", "SQL statements executed per request.",
+                            ("method", "route"), QUERY_BUCKETS)
+request_sql_time = Histogram("http_request_sql_seconds", "Time spent in SQL per request.",
+                             ("method", "route"), LATENCY_BUCKETS)
+query_threshold_exceeded = Counter("http_request_query_threshold_exceeded_total",
+                                   "Requests that ran more than QUERY_COUNT_WARN_THRESHOLD statements.",
+                                   ("method", "route"))
+
+# Extra metrics computed at scrape time (cache stats, pool state); each returns exposition lines.
+_collectors = []
+
+
+def register_collector(collector):
+    _collectors.append(collector)
+    return collector
+
+
+def gauge_lines(name: str, help_text: str, samples: dict[str, float], label: str, kind: str = "gauge") -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    return lines + [f'{name}{{{label}="{_escape(key)}"}} {value}' for key, value in samples.items()]
+
+
+def counter_lines(name: str, help_text: str, samples: dict[str, float], label: str) -> list[str]:
+    """For totals that only grow (and restart from zero with the process), so rate() can be taken."""
+    return gauge_lines(name, help_text, samples, label, kind="counter")
+
+
+def render() -> str:
+    lines = []
+    for metric in (request_duration, request_queries, request_sql_time, query_threshold_exceeded):
+        lines += metric.render()
+    for collector in _collectors:
+        lines += collector()
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+# Set by the middleware; thread-pool and writer work for the request run in a copy of this context,
+# and they all mutate the same RequestStats object.
+current_request = contextvars.ContextVar("current_request", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request.get()
+    if stats is not None and context is not None:
+        stats.queries += 1
+        stats.sql_seconds += time.perf_counter() - getattr(context, "_metrics_started", time.perf_counter())
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: per-route latency, statement count and SQL time, plus the N+1 warning."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            # Route templates, not raw paths, keep label cardinality bounded.
+            route_path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            request_duration.observe((method, route_path, status), elapsed)
+            request_queries.observe((method, route_path), stats.queries)
+            request_sql_time.observe((method, route_path), stats.sql_seconds)
+            if stats.queries > QUERY_COUNT_WARN_THRESHOLD:
+                query_threshold_exceeded.inc((method, route_path))
+                logger.warning("%s %s ran %d SQL statements (%.1f ms in SQL); likely N+1", method,
+                               scope.get("path"), stats.queries, stats.sql_seconds * 1000)
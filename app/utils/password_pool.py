@@ -0,0 +1,67 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+PASSWORD_POOL_KIND = os.environ.get("PASSWORD_POOL_KIND", "thread")  # "thread" or "process"
+PASSWORD_POOL_SIZE = int(os.environ.get("PASSWORD_POOL_SIZE", os.cpu_count() or 2))
+PASSWORD_POOL_QUEUE = int(os.environ.get("PASSWORD_POOL_QUEUE", 2 * PASSWORD_POOL_SIZE))
+PASSWORD_POOL_RETRY_AFTER = int(os.environ.get("PASSWORD_POOL_RETRY_AFTER", 1))
+
+
+class PasswordPool:
+    """Runs password hashing on its own workers with a bounded backlog.
+
+    At most `size` hashes run at once and `queue_size` more may wait; anything beyond that is
+    rejected with 503 straight away instead of tying up a request thread behind a login burst.
+    """
+
+    def __init__(self, kind: str, size: int, queue_size: int, retry_after: int):
+        self.kind = kind
+        self.size = size
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(size + queue_size)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    executor_class = ProcessPoolExecutor if self.kind == "process" else ThreadPoolExecutor
+                    self._executor = executor_class(max_workers=self.size)
+        return self._executor
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password operations, retry shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_pool = PasswordPool(PASSWORD_POOL_KIND, PASSWORD_POOL_SIZE, PASSWORD_POOL_QUEUE, PASSWORD_POOL_RETRY_AFTER)
@@ -0,0 +1,145 @@
+import calendar
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+# Hard stops for a single expansion, whatever the rule or window says: occurrences emitted, and periods
+# (days, weeks or months) scanned, for a BYDAY that rarely or never matches.
+MAX_OCCURRENCES = 10000
+MAX_PERIODS = 100000
+MAX_INTERVAL = 1000
+
+
+class RecurrenceError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    freq: str
+    interval: int = 1
+    count: int | None = None
+    until: datetime | None = None
+    by_day: tuple[int, ...] = ()
+
+
+def _parse_until(value: str) -> datetime:
+    # Event times are naive local times, so UNTIL must be one too; UTC ("Z") or an offset is rejected.
+    if value.upper().endswith("Z"):
+        raise ValueError("UNTIL must be a local time")
+    for fmt in ("%Y%m%dT%H%M%S", "%Y%m%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    until = datetime.fromisoformat(value)
+    if until.tzinfo is not None:
+        raise ValueError("UNTIL must be a local time")
+    return until
+
+
+def parse_rule(pattern: str) -> RecurrenceRule:
+    """Parse the supported RRULE subset: FREQ=DAILY|WEEKLY|MONTHLY, INTERVAL, COUNT, UNTIL (local time) and BYDAY
+    (plain weekdays, no ordinals such as 1MO)."""
+    body = pattern.strip()
+    if body.upper().startswith("RRULE:"):
+        body = body[6:]
+    try:
+        parts = dict(part.split("=", 1) for part in body.split(";") if part)
+        parts = {key.strip().upper(): value.strip() for key, value in parts.items()}
+        freq = parts.pop("FREQ").upper()
+        rule = RecurrenceRule(
+            freq=freq,
+            interval=int(parts.pop("INTERVAL", 1)),
+            count=int(parts.pop("COUNT")) if "COUNT" in parts else None,
+            until=_parse_until(parts.pop("UNTIL")) if "UNTIL" in parts else None,
+            by_day=tuple(sorted({WEEKDAYS.index(day.strip().upper()) for day in parts.pop("BYDAY").split(",")}))
+            if "BYDAY" in parts else (),
+        )
+    except (KeyError, ValueError) as exc:
+        raise RecurrenceError(f"Invalid recurrence pattern: {pattern!r}") from exc
+    if freq not in FREQUENCIES or not 1 <= rule.interval <= MAX_INTERVAL or (rule.count is not None and rule.count < 1) or parts:
+        raise RecurrenceError(f"Unsupported recurrence pattern: {pattern!r}")
+    return rule
+
+
+def _add_months(value: datetime, months: int) -> tuple[int, int]:
+    index = value.year * 12 + value.month - 1 + months
+    return index // 12, index % 12 + 1
+
+
+def _period_start(rule: RecurrenceRule, dtstart: datetime, period: int) -> datetime:
+    """No candidate of `period` falls before this."""
+    if rule.freq == "DAILY":
+        return dtstart + timedelta(days=period * rule.interval)
+    if rule.freq == "WEEKLY":
+        return dtstart - timedelta(days=dtstart.weekday()) + timedelta(weeks=period * rule.interval)
+    year, month = _add_months(dtstart, period * rule.interval)
+    return dtstart.replace(year=year, month=month, day=1)
+
+
+def _period_candidates(rule: RecurrenceRule, dtstart: datetime, period_start: datetime):
+    if rule.freq == "DAILY":
+        if not rule.by_day or period_start.weekday() in rule.by_day:
+            yield period_start
+    elif rule.freq == "WEEKLY":
+        for weekday in rule.by_day or (dtstart.weekday(),):
+            yield period_start + timedelta(days=weekday)
+    else:
+        year, month = period_start.year, period_start.month
+        days_in_month = calendar.monthrange(year, month)[1]
+        if rule.by_day:
+            for day in range(1, days_in_month + 1):
+                if calendar.weekday(year, month, day) in rule.by_day:
+                    yield dtstart.replace(year=year, month=month, day=day)
+        elif dtstart.day <= days_in_month:
+            yield dtstart.replace(year=year, month=month)
+
+
+def _first_period(rule: RecurrenceRule, dtstart: datetime, not_before: datetime) -> int:
+    # Without COUNT every period is independent, so whole periods before the window can be skipped.
+    if rule.count is not None or not_before <= dtstart:
+        return 0
+    if rule.freq == "MONTHLY":
+        months = (not_before.year - dtstart.year) * 12 + not_before.month - dtstart.month
+        return max(0, months // rule.interval - 1)
+    days = {"DAILY": 1, "WEEKLY": 7}[rule.freq] * rule.interval
+    return max(0, (not_before - dtstart).days // days - 1)
+
+
+def expand(rule: RecurrenceRule, dtstart: datetime, duration: timedelta, window_start: datetime,
+           window_end: datetime):
+    """Yield (start, end) of every occurrence that overlaps [window_start, window_end), in order."""
+    emitted = 0
+    first = _first_period(rule, dtstart, window_start - duration)
+    try:
+        for period in range(first, first + MAX_PERIODS):
+            period_start = _period_start(rule, dtstart, period)
+            if period_start >= window_end or (rule.until is not None and period_start > rule.until):
+                return
+            for start in _period_candidates(rule, dtstart, period_start):
+                if start < dtstart:
+                    continue
+                if start >= window_end or (rule.until is not None and start > rule.until):
+                    return
+                emitted += 1
+                if start + duration > window_start:
+                    yield start, start + duration
+                if emitted >= MAX_OCCURRENCES or (rule.count is not None and emitted >= rule.count):
+                    return
+    except (OverflowError, ValueError):
+        # The next period is past datetime.max (year 9999); nothing can occur there.
+        return
+
+
+def ends_before(rule: RecurrenceRule, dtstart: datetime, horizon: datetime) -> bool:
+    """True when the rule produces no occurrence at or after `horizon`."""
+    if rule.until is not None and rule.until < horizon:
+        return True
+    if rule.count is not None:
+        last = None
+        for last, _ in expand(rule, dtstart, timedelta(0), dtstart, datetime.max):
+            pass
+        return last is None or last < horizon
+    return False
@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.user import RevokedToken
+from app.utils.invalidation import broadcast, on_broadcast
+
+REVOCATION_PURGE_INTERVAL = float(os.environ.get("REVOCATION_PURGE_INTERVAL", 60))
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None)
+
+
+class RevocationStore:
+    """Revoked token ids held in memory until their `exp`, backed by the revoked_tokens table.
+
+    Both sides only ever hold tokens that could still be presented, so they stay bounded by the
+    number of live tokens; a lookup that misses the dict means "not revoked" without a query.
+    """
+
+    def __init__(self, purge_interval: float = REVOCATION_PURGE_INTERVAL):
+        self.purge_interval = purge_interval
+        self._revoked: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._next_purge = 0.0
+
+    def load(self, db: Session):
+        self.purge(db)
+        rows = db.query(RevokedToken.jti, RevokedToken.expires_at).all()
+        with self._lock:
+            for jti, expires_at in rows:
+                self._revoked[jti] = expires_at.replace(tzinfo=timezone.utc).timestamp()
+
+    def is_revoked(self, jti: str) -> bool:
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def revoke(self, db: Session, jti: str, expires_at: float):
+        if self.is_revoked(jti):
+            return
+        db.add(RevokedToken(jti=jti, expires_at=_utc(expires_at)))
+        broadcast(db, "revoked_token", f"{expires_at} {jti}")
+        try:
+            db.commit()
+        except IntegrityError:
+            # Already persisted by another process; only the in-memory side was missing.
+            db.rollback()
+        self.remember(jti, expires_at)
+        if time.monotonic() >= self._next_purge:
+            self.purge(db)
+
+    def remember(self, jti: str, expires_at: float):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def _remember_broadcast(self, key: str):
+        # Revoked by another worker: the row is already in the table, only this process's dict is behind.
+        expires_at, jti = key.split(" ", 1)
+        self.remember(jti, float(expires_at))
+
+    def purge(self, db: Session):
+        now = time.time()
+        self._next_purge = time.monotonic() + self.purge_interval
+        with self._lock:
+            for jti in [jti for jti, expires_at in self._revoked.items() if expires_at <= now]:
+                del self._revoked[jti]
+        db.query(RevokedToken).filter(RevokedToken.expires_at <= _utc(now)).delete()
+        db.commit()
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+revocation_store = RevocationStore()
+on_broadcast("revoked_token", revocation_store._remember_broadcast)
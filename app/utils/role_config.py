@@ -1,8 +1,36 @@
-def get_user_role(user_id: int, event) -> str:
-    for perm in event.permissions:
-        if perm.user_id == user_id:
-            return perm.role
-    return ""
+import os
+
+from sqlalchemy.orm import Session
+
+from app.models.permission import Permission
+from app.utils.cache import TTLCache
+from app.utils.db_utils.writer import after_commit
+
+ROLE_CACHE_SIZE = int(os.environ.get("ROLE_CACHE_SIZE", 10000))
+ROLE_CACHE_TTL = float(os.environ.get("ROLE_CACHE_TTL", 60))
+
+# (user_id, event_id) -> role. Only granted roles are cached, so a new grant never waits on an expiry.
+role_cache = TTLCache(maxsize=ROLE_CACHE_SIZE, ttl=ROLE_CACHE_TTL)
+
+
+def get_user_role(db: Session, user_id: int, event_id: int) -> str:
+    key = (user_id, event_id)
+    role = role_cache.get(key)
+    if role is None:
+        role = db.query(Permission.role).filter_by(user_id=user_id, event_id=event_id).scalar() or ""
+        if role:
+            role_cache.set(key, role)
+    return role
+
+
+def invalidate_role(user_id: int, event_id: int):
+    after_commit(lambda: role_cache.invalidate((user_id, event_id)))
+
+
+def invalidate_event_roles(*event_ids: int):
+    event_ids = set(event_ids)
+    after_commit(lambda: role_cache.invalidate_where(lambda key: key[1] in event_ids))
+
 
 def can_view(role: str) -> bool:
     return role in ["owner", "editor", "viewer"]
@@ -14,4 +42,4 @@ def can_delete(role: str) -> bool:
     return role == "owner"
 
 def can_share(role: str) -> bool:
-    return role == "owner"
\ No newline at end of file
+    return role == "owner"
@@ -1,3 +1,6 @@
+import hashlib
+import time
+import uuid
 from datetime import datetime, timedelta
 
 from passlib.context import CryptContext
@@ -6,32 +9,78 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import os
 
+from app.utils.cache import TTLCache
+from app.utils.password_pool import password_pool
+
 oauth_scheme= OAuth2PasswordBearer(tokenUrl='/login')
 
-pass_context = CryptContext(schemes=['bcrypt'], deprecated="auto")
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+
+# min/max pinned to the configured cost so that verify_and_update flags hashes made with any other cost.
+pass_context = CryptContext(schemes=['bcrypt'], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS,
+                            bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS)
 
 SECRET_KEY = os.getenv('SECRET_KEY')
 ALGORITHM = os.environ.get("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRY = int(os.environ.get("ACCESS_TOKEN_EXPIRY", 30))
+CLAIMS_CACHE_SIZE = int(os.environ.get("CLAIMS_CACHE_SIZE", 10000))
 
+# token -> verified claims; each entry lives until the token's own `exp`.
+claims_cache = TTLCache(maxsize=CLAIMS_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRY * 60)
 
-def password_hash(password: str) -> str:
+
+def _hash(password: str) -> str:
     return pass_context.hash(password)
 
 
-def verify_password(password: str, hash_password: str) -> bool:
+def _verify(password: str, hash_password: str) -> bool:
     return pass_context.verify(password, hash_password)
 
 
+def _verify_and_update(password: str, hash_password: str) -> tuple[bool, str | None]:
+    return pass_context.verify_and_update(password, hash_password)
+
+
+def password_hash(password: str) -> str:
+    return password_pool.run(_hash, password)
+
+
+def verify_password(password: str, hash_password: str) -> bool:
+    return password_pool.run(_verify, password, hash_password)
+
+
+def verify_and_rehash(password: str, hash_password: str) -> tuple[bool, str | None]:
+    # Returns (valid, new_hash); new_hash is set when the stored hash used a different cost factor.
+    return password_pool.run(_verify_and_update, password, hash_password)
+
+
+async def password_hash_async(password: str) -> str:
+    return await password_pool.run_async(_hash, password)
+
+
+async def verify_and_rehash_async(password: str, hash_password: str) -> tuple[bool, str | None]:
+    return await password_pool.run_async(_verify_and_update, password, hash_password)
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expiry_time = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRY)
-    to_encode.update({'exp': expiry_time})
+    to_encode.update({'exp': expiry_time, 'jti': uuid.uuid4().hex})
     return jwt.encode(to_encode, algorithm=ALGORITHM, key=SECRET_KEY)
 
 
 def decode_access_token(token: str):
-    return jwt.decode(token, key=SECRET_KEY, algorithms=ALGORITHM)
+    payload = claims_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, key=SECRET_KEY, algorithms=ALGORITHM)
+        if 'exp' in payload:
+            claims_cache.set(token, payload, ttl=payload['exp'] - time.time())
+    return payload
+
+
+def token_id(payload: dict, token: str) -> str:
+    # Tokens issued before jti was added are identified by their digest.
+    return payload.get('jti') or hashlib.sha256(token.encode()).hexdigest()
 
 
 
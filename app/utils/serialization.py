@@ -0,0 +1,37 @@
+from functools import lru_cache
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+
+class JSONBytesResponse(Response):
+    """Response whose body is already JSON bytes; Starlette sends it as-is."""
+    media_type = "application/json"
+
+
+@lru_cache(maxsize=None)
+def adapter(schema) -> TypeAdapter:
+    # Building the validator/serializer is the expensive part; do it once per type.
+    return TypeAdapter(schema)
+
+
+def precompile(*schemas):
+    for schema in schemas:
+        adapter(schema)
+        adapter(list[schema])
+
+
+def dump_json(content, schema) -> bytes:
+    """Validate `content` (ORM rows or schema instances, or a list of them) as `schema` and encode it.
+
+    Validation and encoding both run in pydantic-core and the result goes straight to bytes,
+    without the `jsonable_encoder` + stdlib `json` round trip.
+    """
+    type_adapter = adapter(list[schema] if isinstance(content, list) else schema)
+    return type_adapter.dump_json(type_adapter.validate_python(content, from_attributes=True))
+
+
+def json_response(content, schema, status_code: int = 200, headers: dict | None = None) -> JSONBytesResponse:
+    # Returning a Response makes FastAPI skip its own response_model validation; the route's
+    # response_model still documents the body.
+    return JSONBytesResponse(dump_json(content, schema), status_code=status_code, headers=headers)
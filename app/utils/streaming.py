@@ -0,0 +1,59 @@
+import os
+
+from anyio import from_thread
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from app.utils.db_utils.database import ReadSessionLocal
+from app.utils.serialization import dump_json
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = int(os.environ.get("STREAM_BATCH_SIZE", 1000))
+STREAM_CHUNK_ROWS = int(os.environ.get("STREAM_CHUNK_ROWS", 100))
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def stream_response(produce, media_type: str, headers: dict | None = None) -> StreamingResponse:
+    """Stream the byte chunks `produce(db)` yields.
+
+    The generator opens its own session: the request's session is closed as soon as the handler
+    returns, before the body is sent.
+    """
+    def body():
+        with ReadSessionLocal() as db:
+            yield from produce(db)
+
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+
+def ndjson_response(produce, schema) -> StreamingResponse:
+    """Stream `produce(db)` as one JSON document per line, in small chunks so memory stays flat."""
+    def lines(db):
+        chunk = []
+        for row in produce(db):
+            chunk.append(dump_json(row, schema))
+            if len(chunk) >= STREAM_CHUNK_ROWS:
+                yield b"\n".join(chunk) + b"\n"
+                chunk = []
+        if chunk:
+            yield b"\n".join(chunk) + b"\n"
+
+    return stream_response(lines, NDJSON_MEDIA_TYPE)
+
+
+def iter_body(request: Request):
+    """The request body as a blocking iterator, for code running in the threadpool.
+
+    Each chunk is awaited on the event loop as it is needed, so the upload is never buffered whole.
+    """
+    stream = request.stream()
+    while True:
+        try:
+            chunk = from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            return
+        if chunk:
+            yield chunk
@@ -0,0 +1,43 @@
+"""Per-request cost of get_current_user with cold vs. warm claims/user caches.
+
+    python -m benchmarks.auth_cache --iterations 2000 [--json]
+"""
+import argparse
+
+from benchmarks.common import use_temp_database, init_schema, make_user, Timer, report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    init_schema()
+    from app.utils.db_utils.database import SessionLocal
+    from app.utils.security import create_access_token, claims_cache
+    from app.services.user import get_current_user, user_cache
+
+    results = []
+    with SessionLocal() as db:
+        user = make_user(db, "bench")
+        token = create_access_token({"sub": user.username})
+
+        for mode in ("cold", "warm"):
+            with Timer() as timer:
+                for _ in range(args.iterations):
+                    if mode == "cold":
+                        claims_cache.clear()
+                        user_cache.clear()
+                    get_current_user(token=token, db=db)
+            results.append({
+                "mode": mode,
+                "iterations": args.iterations,
+                "us_per_request": timer.elapsed / args.iterations * 1e6,
+            })
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
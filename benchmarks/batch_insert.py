@@ -0,0 +1,43 @@
+"""Events/sec for POST /api/events/batch: per-event commits vs. the bulk engine.
+
+    python -m benchmarks.batch_insert --sizes 10,100,1000 [--json]
+"""
+import argparse
+
+from benchmarks.common import use_temp_database, init_schema, make_user, event_payloads, Timer, report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    init_schema()
+    from app.utils.db_utils.database import SessionLocal
+    from app.services import events
+
+    results = []
+    with SessionLocal() as db:
+        user = make_user(db, "bench")
+        for size in [int(s) for s in args.sizes.split(",")]:
+            payload = event_payloads(size)
+
+            with Timer() as legacy:
+                for event_in in payload:
+                    events.create_event(db, user, event_in)
+            with Timer() as bulk:
+                events.create_events_batch(db, user, payload)
+
+            results.append({
+                "batch_size": size,
+                "per_event_eps": size / legacy.elapsed,
+                "bulk_eps": size / bulk.elapsed,
+                "speedup": legacy.elapsed / bulk.elapsed,
+            })
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Events/sec for updating and deleting N events: one PUT/DELETE per event vs. /batch/update and /batch/delete.
+
+Requests go through the full app in-process (auth, permission checks, group-commit writer).
+
+    python -m benchmarks.batch_update --sizes 10,100,1000 [--json]
+"""
+import argparse
+import asyncio
+
+from benchmarks.common import use_temp_database, init_schema, make_user, event_payloads, asgi_request, Timer, report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    init_schema()
+    from app.main import app
+    from app.utils.db_utils.database import SessionLocal
+    from app.utils.security import create_access_token
+    from app.services import events
+
+    with SessionLocal() as db:
+        user = make_user(db, "bench")
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench"})}
+
+    def seed(size: int) -> list[int]:
+        with SessionLocal() as db:
+            return [event.id for event in events.create_events_batch(db, user, event_payloads(size))]
+
+    def body(event_id: int, n: int) -> dict:
+        payload = event_payloads(1)[0].model_dump(mode="json")
+        return dict(payload, title=f"Updated {n}", id=event_id)
+
+    async def run(requests):
+        return [(await asgi_request(app, method, path, headers, payload))[0] for method, path, payload in requests]
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        row = {"events": size}
+        for operation in ("update", "delete"):
+            single_ids, batch_ids = seed(size), seed(size)
+            if operation == "update":
+                single = [("PUT", f"/api/events/{event_id}", body(event_id, n)) for n, event_id in enumerate(single_ids)]
+                batch = [("POST", "/api/events/batch/update", [body(event_id, n) for n, event_id in enumerate(batch_ids)])]
+            else:
+                single = [("DELETE", f"/api/events/{event_id}", None) for event_id in single_ids]
+                batch = [("POST", "/api/events/batch/delete", batch_ids)]
+            with Timer() as per_request:
+                statuses = asyncio.run(run(single))
+            with Timer() as bulk:
+                statuses += asyncio.run(run(batch))
+            assert all(status < 300 for status in statuses), statuses
+            row[f"{operation}_per_request_eps"] = size / per_request.elapsed
+            row[f"{operation}_batch_eps"] = size / bulk.elapsed
+            row[f"{operation}_speedup"] = per_request.elapsed / bulk.elapsed
+        results.append(row)
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
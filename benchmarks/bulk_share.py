@@ -0,0 +1,81 @@
+"""Grants/sec for sharing an event with N users: the old per-recipient path vs. the set-based upsert.
+
+"per_recipient" is the previous share_permission loop (one SELECT per recipient to choose insert
+or update, then one commit); "upsert" is share_permission now; "multi" shares --events events
+with the same N users in one share_events call. Each run re-shares (half new users, half role
+changes), so both the insert and the update branch are exercised.
+
+    python -m benchmarks.bulk_share --recipients 10,1000,10000 --events 10 [--json]
+"""
+import argparse
+
+from benchmarks.common import use_temp_database, init_schema, make_user, event_payloads, Timer, report
+
+
+def per_recipient(db, event_id, shares):
+    from app.models.permission import Permission
+
+    for share in shares:
+        permission = db.query(Permission).filter_by(event_id=event_id, user_id=share.user_id).first()
+        if permission:
+            permission.role = share.role.value
+        else:
+            db.add(Permission(event_id=event_id, user_id=share.user_id, role=share.role.value))
+    db.commit()
+    return db.query(Permission).filter_by(event_id=event_id).all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipients", default="10,1000,10000")
+    parser.add_argument("--events", type=int, default=10, help="events shared at once in the multi-event run")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.recipients.split(",")]
+
+    use_temp_database()
+    init_schema()
+    from sqlalchemy import insert
+    from app.utils.db_utils.database import SessionLocal
+    from app.models.user import User
+    from app.schemas.events import PermissionShare
+    from app.services import events
+
+    with SessionLocal() as db:
+        owner = make_user(db, "owner")
+        db.execute(insert(User), [{"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"}
+                                  for i in range(max(sizes) * 2)])
+        db.commit()
+        user_ids = [user_id for (user_id,) in db.query(User.id).filter(User.id != owner.id).order_by(User.id)]
+
+    def shares(size: int, role: str, offset: int = 0):
+        return [PermissionShare(user_id=user_id, role=role) for user_id in user_ids[offset:offset + size]]
+
+    results = []
+    for size in sizes:
+        row = {"recipients": size}
+        for mode in ("per_recipient", "upsert", "multi"):
+            with SessionLocal() as db:
+                count = args.events if mode == "multi" else 1
+                event_ids = [event.id for event in events.create_events_batch(db, owner, event_payloads(count))]
+                first, second = shares(size, "viewer"), shares(size, "editor", size // 2)
+                if mode == "per_recipient":
+                    per_recipient(db, event_ids[0], first)
+                    with Timer() as timer:
+                        per_recipient(db, event_ids[0], second)
+                elif mode == "upsert":
+                    events.share_permission(db, event_ids[0], first)
+                    with Timer() as timer:
+                        events.share_permission(db, event_ids[0], second)
+                else:
+                    events.share_events(db, owner, event_ids, first)
+                    with Timer() as timer:
+                        events.share_events(db, owner, event_ids, second)
+            row[f"{mode}_grants_per_s"] = size * count / timer.elapsed
+        row["upsert_speedup"] = row["upsert_grants_per_s"] / row["per_recipient_grants_per_s"]
+        results.append(row)
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Delivery latency of GET /api/events/changes as the number of subscribers grows, and catch-up speed.
+
+One owner shares an event with --subscribers users, each holding an SSE connection, then updates it
+--updates times. Latency is from sending the update until each subscriber has read the change.
+Catch-up is a client resuming from seq 0 after --backlog changes: first served from the in-memory
+replay buffer, then, after a server restart, from the change_log table.
+
+    python -m benchmarks.change_feed --subscribers 1,10,100 --updates 50 --backlog 5000 [--json]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+
+from benchmarks.common import use_temp_database, start_server, HttpConnection, percentile, Timer, report
+
+PASSWORD = "benchmark-password"
+# The database starts empty, so users get ids in registration order.
+_user_ids = itertools.count(1)
+
+
+class SseClient:
+    def __init__(self, port: int, headers: dict):
+        self.port, self.headers = port, headers
+        self.reader = self.writer = None
+        self._buffer = b""
+
+    async def connect(self, last_event_id: int | None = None):
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.port)
+        headers = dict(self.headers, **({"Last-Event-ID": str(last_event_id)} if last_event_id is not None else {}))
+        lines = ["GET /api/events/changes HTTP/1.1", "Host: 127.0.0.1", *(f"{k}: {v}" for k, v in headers.items())]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+        await self.writer.drain()
+        while await self.reader.readline() != b"\r\n":
+            pass
+
+    async def next(self) -> dict:
+        """The next message's fields, skipping heartbeats."""
+        while True:
+            while b"\n\n" not in self._buffer:
+                size = int((await self.reader.readline()).strip(), 16)
+                self._buffer += await self.reader.readexactly(size)
+                await self.reader.readline()
+            message, self._buffer = self._buffer.split(b"\n\n", 1)
+            fields = dict(line.split(": ", 1) for line in message.decode().split("\n") if not line.startswith(":"))
+            if fields:
+                return fields
+
+    def close(self):
+        self.writer.close()
+
+
+async def register(conn: HttpConnection, username: str) -> tuple[int, dict]:
+    body = {"username": username, "email": f"{username}@example.com", "password": PASSWORD}
+    _, _, data = await conn.request("POST", "/api/auth/register", body)
+    return next(_user_ids), {"Authorization": f"Bearer {json.loads(data)['access_token']}"}
+
+
+EVENT = {"title": "Standup", "start_time": "2025-01-01T09:00:00", "end_time": "2025-01-01T09:15:00"}
+
+
+async def fan_out(port: int, subscribers: int, updates: int, run: int) -> dict:
+    conn = HttpConnection(port)
+    _, owner = await register(conn, f"owner{run}")
+    viewers = [await register(conn, f"viewer{run}_{i}") for i in range(subscribers)]
+    _, _, data = await conn.request("POST", "/api/events/", EVENT, owner)
+    event_id = json.loads(data)["id"]
+    clients = [SseClient(port, headers) for _, headers in viewers]
+    for client in clients:
+        await client.connect()
+        await client.next()  # ready
+    shares = [{"user_id": user_id, "role": "viewer"} for user_id, _ in viewers]
+    await conn.request("POST", f"/api/events/{event_id}/share", shares, owner)
+    for client in clients:
+        await client.next()  # permission.updated
+
+    latencies, write_latencies = [], []
+    for number in range(updates):
+        started = time.perf_counter()
+        await conn.request("PUT", f"/api/events/{event_id}", dict(EVENT, title=f"Standup {number}"), owner)
+        write_latencies.append(time.perf_counter() - started)
+
+        async def receive(client):
+            await client.next()
+            latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(receive(client) for client in clients))
+    for client in clients:
+        client.close()
+    await conn.close()
+    return {"subscribers": subscribers, "deliveries": len(latencies),
+            "write_p50_ms": percentile(write_latencies, 50) * 1000,
+            "deliver_p50_ms": percentile(latencies, 50) * 1000, "deliver_p95_ms": percentile(latencies, 95) * 1000}
+
+
+async def seed_backlog(port: int, backlog: int) -> dict:
+    conn = HttpConnection(port)
+    _, headers = await register(conn, "backlog")
+    for start in range(0, backlog, 1000):
+        batch = [dict(EVENT, title=f"Backlog {i}") for i in range(start, min(backlog, start + 1000))]
+        await conn.request("POST", "/api/events/batch", batch, headers)
+    await conn.close()
+    return headers
+
+
+async def catch_up(port: int, headers: dict, backlog: int) -> float:
+    client = SseClient(port, headers)
+    with Timer() as timer:
+        await client.connect(last_event_id=0)
+        for _ in range(backlog):
+            await client.next()
+    client.close()
+    return backlog / timer.elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", default="1,10,100")
+    parser.add_argument("--updates", type=int, default=50)
+    parser.add_argument("--backlog", type=int, default=5000)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    # The backlog must fit in the replay buffer for the first catch-up to be served from memory.
+    env = {"CHANGE_REPLAY_SIZE": str(max(args.backlog, int(os.environ.get("CHANGE_REPLAY_SIZE", 10000))))}
+    proc, port = start_server(env)
+    try:
+        results = [asyncio.run(fan_out(port, int(n), args.updates, run))
+                   for run, n in enumerate(args.subscribers.split(","))]
+        headers = asyncio.run(seed_backlog(port, args.backlog))
+        from_buffer = asyncio.run(catch_up(port, headers, args.backlog))
+    finally:
+        proc.terminate()
+        proc.wait()
+    proc, port = start_server(env)
+    try:
+        from_table = asyncio.run(catch_up(port, headers, args.backlog))
+    finally:
+        proc.terminate()
+        proc.wait()
+    report(results, args.json)
+    report([{"backlog": args.backlog, "buffer_changes_per_s": from_buffer, "table_changes_per_s": from_table}],
+           args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def use_temp_database(name: str = "bench.db") -> str:
+    # Must run before anything under app/ is imported: the engine reads DATABASE_URL at import time.
+    directory = tempfile.mkdtemp(prefix="neofi-bench-")
+    path = os.path.join(directory, name)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    return path
+
+
+def init_schema():
+    from app.utils.db_utils.database import init_db
+    import app.models.events, app.models.permission, app.models.user  # noqa: F401  (register tables)
+
+    init_db()
+
+
+def make_user(db, username: str):
+    from app.models.user import User
+
+    user = User(username=username, email=f"{username}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def event_payloads(count: int, start: datetime = datetime(2025, 1, 1, 9)):
+    from app.schemas.events import EventCreate
+
+    return [
+        EventCreate(
+            title=f"Event {i}",
+            description=f"Synthetic event number {i}",
+            start_time=start + timedelta(hours=i),
+            end_time=start + timedelta(hours=i, minutes=30),
+            location="Room 1",
+        )
+        for i in range(count)
+    ]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def report(results: list[dict], as_json: bool = False):
+    if as_json:
+        print(json.dumps(results, indent=2))
+        return
+    if not results:
+        return
+    columns = list(results[0])
+    widths = [max(len(str(c)), *(len(_fmt(r[c])) for r in results)) for c in columns]
+    print("  ".join(str(c).ljust(w) for c, w in zip(columns, widths)))
+    for row in results:
+        print("  ".join(_fmt(row[c]).ljust(w) for c, w in zip(columns, widths)))
+
+
+def _fmt(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def free_port() -> int:
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(env: dict | None = None, port: int | None = None, args: list[str] | None = None):
+    """Run app.main under uvicorn in a subprocess and wait until it accepts connections."""
+    import socket
+    import subprocess
+    import sys
+
+    port = port or free_port()
+    command = args or [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(command, env={**os.environ, "PORT": str(port), **(env or {})})
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc, port
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client; avoids pulling an HTTP library into the benchmarks."""
+
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body=None, headers: dict | None = None):
+        import asyncio
+
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}", f"Content-Length: {len(payload)}"]
+        if body is not None:
+            lines.append("Content-Type: application/json")
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+        if status in (204, 304):
+            data = b""
+        elif "content-length" in response_headers:
+            data = await self.reader.readexactly(int(response_headers["content-length"]))
+        else:
+            data = b""
+            while (size := int((await self.reader.readline()).strip() or b"0", 16)) > 0:
+                data += await self.reader.readexactly(size)
+                await self.reader.readline()
+            await self.reader.readline()
+        if response_headers.get("connection") == "close":
+            await self.close()
+        return status, response_headers, data
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def run_clients(port: int, clients: int, requests_per_client: int, make_request, connect=None):
+    """Drive `clients` concurrent connections; make_request(conn, i) returns one awaitable request.
+
+    `connect()` makes a connection; the default is an HttpConnection to `port`.
+    """
+    import asyncio
+
+    latencies, errors = [], 0
+    connect = connect or (lambda: HttpConnection(port))
+
+    async def client(index: int):
+        nonlocal errors
+        conn = connect()
+        for i in range(requests_per_client):
+            started = time.perf_counter()
+            try:
+                status, _, _ = await make_request(conn, index * requests_per_client + i)
+                if status >= 500:
+                    errors += 1
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                errors += 1
+                await conn.close()
+            latencies.append(time.perf_counter() - started)
+        await conn.close()
+
+    with Timer() as timer:
+        await asyncio.gather(*(client(i) for i in range(clients)))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / timer.elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+async def asgi_request(app, method: str, path: str, headers: dict | None = None, body=None):
+    """Call an ASGI app in-process. Returns (status, body bytes, seconds to first body byte)."""
+    path, _, query = path.partition("?")
+    payload = json.dumps(body).encode() if body is not None else b""
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    if body is not None:
+        raw_headers.append((b"content-type", b"application/json"))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": raw_headers, "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80),
+    }
+    import asyncio
+
+    received = False
+    finished = asyncio.Event()
+
+    async def receive():
+        # Streaming responses poll receive() for a disconnect; only report one once the response is done.
+        nonlocal received
+        if received:
+            await finished.wait()
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    started = time.perf_counter()
+    result = {"status": 0, "chunks": [], "ttfb": None}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            if result["ttfb"] is None and message.get("body"):
+                result["ttfb"] = time.perf_counter() - started
+            result["chunks"].append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    finished.set()
+    return result["status"], b"".join(result["chunks"]), result["ttfb"] or 0.0
+
+
+class AsgiConnection:
+    """HttpConnection look-alike that calls the ASGI app in-process, for run_clients(connect=...)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, body=None, headers: dict | None = None):
+        status, data, _ = await asgi_request(self.app, method, path, headers, body)
+        return status, {}, data
+
+    async def close(self):
+        pass
@@ -0,0 +1,56 @@
+"""Sync vs. async serving under concurrent clients (GET /api/events/{id} and GET /api/events/).
+
+    python -m benchmarks.concurrency --clients 50,200,1000 --requests 5 [--json]
+"""
+import argparse
+import asyncio
+import json
+import resource
+
+from benchmarks.common import use_temp_database, start_server, run_clients, HttpConnection, report
+
+
+async def seed(port: int) -> tuple[dict, int]:
+    conn = HttpConnection(port)
+    user = {"username": "bench", "email": "bench@example.com", "password": "benchmark-pw"}
+    status, _, body = await conn.request("POST", "/api/auth/register", user)
+    if status != 200:
+        status, _, body = await conn.request("POST", "/api/auth/login", user)
+    headers = {"Authorization": "Bearer " + json.loads(body)["access_token"]}
+    event = {"title": "Bench", "start_time": "2025-01-01T09:00:00", "end_time": "2025-01-01T10:00:00"}
+    _, _, body = await conn.request("POST", "/api/events/", event, headers)
+    await conn.close()
+    return headers, json.loads(body)["id"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", default="50,200,1000")
+    parser.add_argument("--requests", type=int, default=5, help="requests per client")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    results = []
+    for mode in ("sync", "async"):
+        use_temp_database(f"{mode}.db")
+        proc, port = start_server({"ASYNC_MODE": "true" if mode == "async" else "false"})
+        try:
+            headers, event_id = asyncio.run(seed(port))
+            for clients in [int(c) for c in args.clients.split(",")]:
+                def request(conn, i):
+                    path = f"/api/events/{event_id}" if i % 2 else "/api/events/?limit=20"
+                    return conn.request("GET", path, headers=headers)
+
+                stats = asyncio.run(run_clients(port, clients, args.requests, request))
+                results.append({"mode": mode, "clients": clients, **stats})
+        finally:
+            proc.terminate()
+            proc.wait()
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
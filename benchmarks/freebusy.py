@@ -0,0 +1,70 @@
+"""Free/busy latency over the R*Tree busy index vs. the B-tree (permissions -> occurrences) path.
+
+    python -m benchmarks.freebusy --users 100 --events-per-user 1000 --query-users 10 [--json]
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.common import use_temp_database, init_schema, make_user, percentile, Timer, report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--events-per-user", type=int, default=1000)
+    parser.add_argument("--query-users", type=int, default=10)
+    parser.add_argument("--days", type=int, default=365, help="period the events are spread over")
+    parser.add_argument("--window-days", type=int, default=1)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    init_schema()
+    from app.utils.db_utils import busy_index
+    from app.utils.db_utils.database import SessionLocal, engine
+    from app.schemas.events import EventCreate
+    from app.services import availability, events
+
+    random.seed(0)
+    start = datetime(2025, 1, 1)
+    span = timedelta(days=args.days)
+    with SessionLocal() as db:
+        users = [make_user(db, f"user{i}") for i in range(args.users)]
+        for user in users:
+            payloads = []
+            for i in range(args.events_per_user):
+                event_start = start + timedelta(minutes=random.randrange(span // timedelta(minutes=1)))
+                payloads.append(EventCreate(title=f"Event {i}", start_time=event_start,
+                                            end_time=event_start + timedelta(minutes=random.choice((30, 60, 90)))))
+            events.create_events_batch(db, user, payloads)
+
+        queries = []
+        for _ in range(args.samples):
+            window_start = start + span * random.random()
+            queries.append((random.sample([u.id for u in users], args.query_users), window_start,
+                            window_start + timedelta(days=args.window_days)))
+
+        results = []
+        for path, available in (("btree", False), ("rtree", True)):
+            busy_index._available[engine] = available and busy_index.install_busy_index(engine)
+            samples, intervals = [], 0
+            for user_ids, window_start, window_end in queries:
+                with Timer() as timer:
+                    result = availability.free_busy(db, user_ids, window_start, window_end)
+                samples.append(timer.elapsed)
+                intervals += sum(len(entry["busy"]) for entry in result)
+            results.append({
+                "path": path,
+                "events": args.users * args.events_per_user,
+                "query_users": args.query_users,
+                "avg_busy_blocks": intervals / len(queries),
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+            })
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Keyset page latency of the event list at the start, middle and end of a large list, over
+ix_permissions_user_start vs. the events join (permissions -> events, then a sort).
+
+"dense" owns every event; "sparse" has a permission on one event in --sparse-every. A flat row
+means a page costs the same wherever it starts and however many events the user or table has.
+
+    python -m benchmarks.list_paging --events 200000 --page 100 [--json]
+"""
+import argparse
+import statistics
+
+from benchmarks.common import use_temp_database, init_schema, make_user, event_payloads, Timer, report
+
+CHUNK = 10000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--sparse-every", type=int, default=1000)
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    init_schema()
+    from sqlalchemy import insert
+    from app.utils.db_utils import list_index
+    from app.utils.db_utils.database import SessionLocal, engine
+    from app.models.permission import Permission
+    from app.schemas.events import EventOut
+    from app.utils.db_utils.writer import as_schema
+    from app.services import events
+
+    with SessionLocal() as db:
+        dense, sparse = make_user(db, "dense"), make_user(db, "sparse")
+        event_ids = []
+        payloads = event_payloads(args.events)
+        for start in range(0, args.events, CHUNK):
+            event_ids.extend(event.id for event in events.create_events_batch(db, dense, payloads[start:start + CHUNK]))
+        db.execute(insert(Permission), [{"event_id": event_id, "user_id": sparse.id, "role": "viewer"}
+                                        for event_id in event_ids[::args.sparse_every]])
+        db.commit()
+
+        def page(user, after):
+            return as_schema(events.list_events(db, user, limit=args.page + 1, after=after), EventOut)
+
+        results = []
+        for path, available in (("join", False), ("index", True)):
+            list_index._available[engine] = available
+            for user in (dense, sparse):
+                # Cursors at the start, middle and end of the user's list, taken from its own pages.
+                visible = event_ids if user is dense else event_ids[::args.sparse_every]
+                row = {"path": path, "user": user.username, "visible": len(visible)}
+                for position, index in (("first", None), ("middle", len(visible) // 2), ("last", -args.page)):
+                    after = None
+                    if index is not None:
+                        event = db.get(events.Event, visible[index])
+                        after = (event.start_time, event.id)
+                    samples = []
+                    for _ in range(args.samples):
+                        with Timer() as timer:
+                            page(user, after)
+                        samples.append(timer.elapsed)
+                    row[f"{position}_ms"] = statistics.median(samples) * 1000
+                results.append(row)
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Event-endpoint latency while a login storm is running.
+
+Measures GET /api/events/{id} p50/p99 with no background load, then again while `--storm`
+clients hammer POST /api/auth/login. Pool settings are passed through to the server, e.g.
+
+    PASSWORD_POOL_SIZE=2 python -m benchmarks.login_storm --storm 100 [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+
+from benchmarks.common import use_temp_database, start_server, run_clients, HttpConnection, report
+
+USER = {"username": "bench", "email": "bench@example.com", "password": "benchmark-pw"}
+
+
+async def seed(port: int) -> tuple[dict, int]:
+    conn = HttpConnection(port)
+    _, _, body = await conn.request("POST", "/api/auth/register", USER)
+    headers = {"Authorization": "Bearer " + json.loads(body)["access_token"]}
+    event = {"title": "Bench", "start_time": "2025-01-01T09:00:00", "end_time": "2025-01-01T10:00:00"}
+    _, _, body = await conn.request("POST", "/api/events/", event, headers)
+    await conn.close()
+    return headers, json.loads(body)["id"]
+
+
+async def measure(port: int, headers: dict, event_id: int, storm: int, clients: int, requests: int):
+    login = {"username": USER["username"], "password": USER["password"]}
+    stop = asyncio.Event()
+    outcomes = {"ok": 0, "rejected": 0}
+
+    async def stormer():
+        conn = HttpConnection(port)
+        while not stop.is_set():
+            status, _, _ = await conn.request("POST", "/api/auth/login", login)
+            outcomes["ok" if status == 200 else "rejected"] += 1
+        await conn.close()
+
+    storm_tasks = [asyncio.create_task(stormer()) for _ in range(storm)]
+    await asyncio.sleep(0.5 if storm else 0)
+    stats = await run_clients(port, clients, requests,
+                              lambda conn, i: conn.request("GET", f"/api/events/{event_id}", headers=headers))
+    stop.set()
+    await asyncio.gather(*storm_tasks)
+    return {**stats, "logins_ok": outcomes["ok"], "logins_503": outcomes["rejected"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storm", type=int, default=100, help="concurrent login clients")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=50, help="event requests per client")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    proc, port = start_server()
+    try:
+        headers, event_id = asyncio.run(seed(port))
+        results = []
+        for storm in (0, args.storm):
+            stats = asyncio.run(measure(port, headers, event_id, storm, args.clients, args.requests))
+            results.append({"login_clients": storm, "pool_size": os.environ.get("PASSWORD_POOL_SIZE", "cpu"),
+                            "pool_queue": os.environ.get("PASSWORD_POOL_QUEUE", "2x"), **stats})
+    finally:
+        proc.terminate()
+        proc.wait()
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Query latency of GET /api/events/search at scale, FTS5 vs. the LIKE scan it replaces.
+
+Seeds --events events whose titles and descriptions are drawn from a Zipf-distributed vocabulary
+(so there are very common and very rare words), spread over --users owners; the "heavy" user owns
+--heavy-share of all events. Each query is timed through app.services.search for both a heavy and a
+light user; "like" runs the fallback used when FTS5 is unavailable (skip it with --no-like at 1M rows).
+
+    python -m benchmarks.search --events 1000000 --users 1000 --repeat 20 [--no-like] [--json]
+"""
+import argparse
+import itertools
+import random
+
+from benchmarks.common import use_temp_database, init_schema, make_user, percentile, Timer, report
+
+VOCABULARY = [f"term{i}" for i in range(20000)]
+QUERIES = {
+    "common word": "term0",
+    "mid word": "term300",
+    "rare word": "term15000",
+    "two words": "term1 term40",
+    "prefix": "term12",
+}
+
+
+def seed(events: int, users: int, heavy_share: float, seed_value: int):
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from app.utils.db_utils.database import SessionLocal
+    from app.models.events import Event
+    from app.models.permission import Permission
+    from app.models.user import User
+
+    rng = random.Random(seed_value)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+    start = datetime(2025, 1, 1, 9)
+    with SessionLocal() as db:
+        heavy = make_user(db, "heavy")
+        db.execute(insert(User), [{"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"}
+                                  for i in range(users - 1)])
+        owner_ids = [heavy.id] + [user_id for (user_id,) in db.query(User.id).filter(User.id != heavy.id)]
+        light_id = owner_ids[1]
+        db.commit()
+        for first in range(0, events, 50000):
+            count = min(50000, events - first)
+            owners = [heavy.id if rng.random() < heavy_share else rng.choice(owner_ids[1:]) for _ in range(count)]
+            rows = [{
+                "title": " ".join(rng.choices(VOCABULARY, cum_weights=cum_weights, k=4)),
+                "description": " ".join(rng.choices(VOCABULARY, cum_weights=cum_weights, k=30)),
+                "location": rng.choice(VOCABULARY[:200]),
+                "start_time": start + timedelta(minutes=first + i), "end_time": start + timedelta(minutes=first + i + 30),
+                "is_recurring": False, "owner_id": owner,
+            } for i, owner in enumerate(owners)]
+            ids = list(db.scalars(insert(Event).returning(Event.id), rows))
+            db.execute(insert(Permission), [{"event_id": event_id, "user_id": owner, "role": "owner"}
+                                            for event_id, owner in zip(ids, owners)])
+            db.commit()
+        light = db.get(User, light_id)
+        db.refresh(heavy)
+        return heavy, light
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--heavy-share", type=float, default=0.1, help="fraction of events owned by one user")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-like", action="store_true", help="skip the LIKE baseline")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    init_schema()
+    with Timer() as seeding:
+        heavy, light = seed(args.events, args.users, args.heavy_share, args.seed)
+    print(f"seeded {args.events} events (FTS index maintained by triggers) in {seeding.elapsed:.1f}s")
+    from app.utils.db_utils.database import ReadSessionLocal
+    from app.services import search
+
+    def latencies(run, db) -> list[float]:
+        run(db)  # warm the page cache
+        samples = []
+        for _ in range(args.repeat):
+            with Timer() as timer:
+                run(db)
+            samples.append(timer.elapsed * 1000)
+        return samples
+
+    results = []
+    with ReadSessionLocal() as db:
+        for name, query in QUERIES.items():
+            for label, user in (("heavy", heavy), ("light", light)):
+                query_words = search.words(query)
+                row = {"query": name, "user": label,
+                       "hits": len(search._ranked_ids(db, user, query_words, args.events, 0))}
+                fts = latencies(lambda session: search.search_events(session, user, query, args.limit), db)
+                row["fts_p50_ms"], row["fts_p95_ms"] = percentile(fts, 50), percentile(fts, 95)
+                if not args.no_like:
+                    like = latencies(lambda session: search._like_ids(session, user, query_words, args.limit, 0), db)
+                    row["like_p50_ms"] = percentile(like, 50)
+                results.append(row)
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Rows/sec turned into a JSON body for EventOut, VersionOut and PermissionOut.
+
+"default" is what a route returning ORM rows with `response_model` used to cost: model_validate per
+row, FastAPI's response_model validation and serialization, then JSONResponse's stdlib json.dumps.
+"fast" is app.utils.serialization.json_response: one precompiled TypeAdapter validating straight
+from the ORM rows and dumping to bytes. Rows are loaded once; only serialization is timed.
+
+    python -m benchmarks.serialization --rows 10000 --shares 3 --repeat 5 [--json]
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+
+from benchmarks.common import use_temp_database, init_schema, make_user, event_payloads, Timer, report
+
+
+def seed(rows: int, shares: int):
+    from sqlalchemy import insert
+    from app.utils.db_utils.database import SessionLocal
+    from app.models.events import EventVersion
+    from app.models.permission import Permission
+    from app.services import events
+
+    with SessionLocal() as db:
+        owner = make_user(db, "owner")
+        others = [make_user(db, f"guest{i}") for i in range(shares)]
+        created = events.create_events_batch(db, owner, event_payloads(rows))
+        db.execute(insert(Permission), [{"event_id": event.id, "user_id": other.id, "role": "viewer"}
+                                        for event in created for other in others])
+        start = datetime(2025, 1, 1)
+        db.execute(insert(EventVersion), [
+            {"event_id": created[0].id, "version_number": n, "title": f"Edit {n}", "description": "Synthetic",
+             "start_time": start, "end_time": start + timedelta(hours=1), "owner_id": owner.id}
+            for n in range(2, rows + 1)
+        ])
+        db.commit()
+
+
+def default_body(rows, schema) -> bytes:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    field = create_response_field("response", list[schema])
+    instances = [schema.model_validate(row, from_attributes=True) for row in rows]
+    content = asyncio.run(serialize_response(field=field, response_content=instances))
+    return JSONResponse(content).body
+
+
+def fast_body(rows, schema) -> bytes:
+    from app.utils.serialization import json_response
+
+    return json_response(rows, schema).body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--shares", type=int, default=3, help="extra permissions per event")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per measurement; the best is reported")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    init_schema()
+    seed(args.rows, args.shares)
+    from sqlalchemy.orm import selectinload
+    from app.utils.db_utils.database import SessionLocal
+    from app.models.events import Event, EventVersion
+    from app.models.permission import Permission
+    from app.schemas.events import EventOut, VersionOut, PermissionOut
+    from app.utils.serialization import precompile
+
+    precompile(EventOut, VersionOut, PermissionOut)
+    results = []
+    with SessionLocal() as db:
+        data = {
+            "EventOut": (db.query(Event).options(selectinload(Event.permissions)).limit(args.rows).all(), EventOut),
+            "VersionOut": (db.query(EventVersion).limit(args.rows).all(), VersionOut),
+            "PermissionOut": (db.query(Permission).limit(args.rows).all(), PermissionOut),
+        }
+        for name, (rows, schema) in data.items():
+            row = {"schema": name, "rows": len(rows)}
+            bodies = {}
+            for mode, serialize in (("default", default_body), ("fast", fast_body)):
+                serialize(rows[:10], schema)
+                best = float("inf")
+                for _ in range(args.repeat):
+                    with Timer() as timer:
+                        bodies[mode] = serialize(rows, schema)
+                    best = min(best, timer.elapsed)
+                row[f"{mode}_rows_per_s"] = len(rows) / best
+            row["speedup"] = row["fast_rows_per_s"] / row["default_rows_per_s"]
+            row["same_body"] = bodies["default"] == bodies["fast"]
+            results.append(row)
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
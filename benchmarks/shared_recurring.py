@@ -0,0 +1,73 @@
+"""Cost of sharing a recurring event with many users, changing its schedule, and free/busy over it.
+
+The busy index holds each occurrence once and resolves users through permissions when queried,
+so sharing and rescheduling should cost about the same whatever --users is.
+
+    python -m benchmarks.shared_recurring --users 100,2000 [--json]
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.common import use_temp_database, init_schema, make_user, percentile, Timer, report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", default="100,2000")
+    parser.add_argument("--pattern", default="FREQ=DAILY")
+    parser.add_argument("--query-users", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=50)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    init_schema()
+    from sqlalchemy import text
+    from app.utils.db_utils.database import SessionLocal
+    from app.schemas.events import EventCreate, EventUpdate, PermissionShare
+    from app.services import availability, events
+
+    start = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(days=1, hours=9)
+    results = []
+    with SessionLocal() as db:
+        for count in map(int, args.users.split(",")):
+            owner = make_user(db, f"owner{count}")
+            guests = [make_user(db, f"guest{count}-{i}") for i in range(count)]
+            before = db.execute(text("SELECT count(*) FROM event_occurrences_rtree")).scalar()
+            event = events.create_event(db, owner, EventCreate(
+                title="Standup", start_time=start, end_time=start + timedelta(minutes=15), is_recurring=True,
+                recurrence_pattern=args.pattern))
+            occurrences = db.execute(text("SELECT count(*) FROM event_occurrences WHERE event_id = :id"),
+                                     {"id": event.id}).scalar()
+
+            with Timer() as share:
+                events.share_permission(db, event.id, [PermissionShare(user_id=guest.id, role="viewer")
+                                                       for guest in guests])
+            with Timer() as reschedule:
+                events.update_event(db, event.id, EventUpdate(
+                    title="Standup", start_time=start + timedelta(minutes=30), end_time=start + timedelta(minutes=45),
+                    is_recurring=True, recurrence_pattern=args.pattern))
+            index_rows = db.execute(text("SELECT count(*) FROM event_occurrences_rtree")).scalar() - before
+
+            user_ids = [guest.id for guest in guests[:args.query_users]]
+            day, week = [], []
+            for i in range(args.samples):
+                window = start + timedelta(days=i % 28)
+                for samples, length in ((day, timedelta(days=1)), (week, timedelta(days=7))):
+                    with Timer() as timer:
+                        availability.free_busy(db, user_ids, window, window + length)
+                    samples.append(timer.elapsed)
+            results.append({
+                "users": count,
+                "occurrences": occurrences,
+                "busy_index_rows": index_rows,
+                "share_ms": share.elapsed * 1000,
+                "reschedule_ms": reschedule.elapsed * 1000,
+                "freebusy_day_p50_ms": percentile(day, 50) * 1000,
+                "freebusy_week_p50_ms": percentile(week, 50) * 1000,
+            })
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
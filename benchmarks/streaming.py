@@ -0,0 +1,89 @@
+"""Peak RSS and time-to-first-byte for large listing/changelog responses, JSON vs. NDJSON.
+
+Each measurement runs in a fresh process so ru_maxrss reflects that response alone.
+
+    python -m benchmarks.streaming --rows 100000 [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks.common import use_temp_database, init_schema, make_user, event_payloads, asgi_request, Timer, report
+
+CASES = {
+    "list_ndjson": ("/api/events/", True),
+    "list_json_page": ("/api/events/?limit=1000", False),
+    "changelog_json": ("/api/events/{event_id}/changelog", False),
+    "changelog_ndjson": ("/api/events/{event_id}/changelog", True),
+}
+
+
+def seed(rows: int):
+    from sqlalchemy import insert
+    from app.utils.db_utils.database import SessionLocal
+    from app.models.events import EventVersion
+    from app.services import events
+
+    with SessionLocal() as db:
+        user = make_user(db, "bench")
+        created = events.create_events_batch(db, user, event_payloads(rows))
+        event = created[0]
+        start = datetime(2025, 1, 1)
+        db.execute(insert(EventVersion), [
+            {"event_id": event.id, "version_number": n, "title": f"Edit {n}", "description": "Synthetic",
+             "start_time": start, "end_time": start + timedelta(hours=1), "owner_id": user.id}
+            for n in range(2, rows + 1)
+        ])
+        db.commit()
+        return event.id
+
+
+def measure(case: str, event_id: int):
+    from app.main import app
+    from app.utils.security import create_access_token
+
+    path, ndjson = CASES[case]
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench"})}
+    if ndjson:
+        headers["Accept"] = "application/x-ndjson"
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with Timer() as timer:
+        status, body, ttfb = asyncio.run(asgi_request(app, "GET", path.format(event_id=event_id), headers))
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rows = body.count(b"\n") if ndjson else len(json.loads(body))
+    return {"case": case, "status": status, "rows": rows, "ttfb_ms": ttfb * 1000, "total_ms": timer.elapsed * 1000,
+            "peak_rss_delta_mb": (peak - baseline) / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--case", choices=list(CASES))
+    parser.add_argument("--event-id", type=int)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(measure(args.case, args.event_id)))
+        return
+
+    use_temp_database()
+    init_schema()
+    event_id = seed(args.rows)
+    results = []
+    for case in CASES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.streaming", "--case", case, "--event-id", str(event_id)],
+            env=os.environ, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Per-route throughput and p50/p95/p99 latency for the main API, in-process and over uvicorn.
+
+Every run seeds a fresh SQLite database with synthetic users, events, shares and versions
+(deterministic for a given --seed), then drives each route with concurrent clients. Each
+transport runs in its own process so it gets its own database and app import.
+
+    python -m benchmarks.suite --users 20 --events-per-user 50 --shares 2 --versions 5 \\
+        --clients 1,16 --requests 20 [--routes get,list] [--transports inprocess,uvicorn] \\
+        [--output run.json] [--compare baseline.json] [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.common import (
+    use_temp_database, init_schema, start_server, run_clients, HttpConnection, AsgiConnection, report,
+)
+
+PASSWORD = "benchmark-pw"
+TRANSPORTS = ("inprocess", "uvicorn")
+
+
+def event_body(n: int) -> dict:
+    start = datetime(2025, 1, 1, 9) + timedelta(hours=n)
+    return {"title": f"Event {n}", "description": f"Synthetic event {n}", "location": "Room 1",
+            "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=30)).isoformat()}
+
+
+def seed(args) -> dict:
+    """Create the synthetic data set and return what the request builders need to address it."""
+    from sqlalchemy import insert
+    from app.utils.db_utils.database import SessionLocal
+    from app.models.events import EventVersion
+    from app.models.permission import Permission
+    from app.models.user import User
+    from app.schemas.events import EventCreate, EventUpdate
+    from app.services import events
+    from app.utils.security import password_hash
+
+    rng = random.Random(args.seed)
+    hashed = password_hash(PASSWORD)
+    with SessionLocal() as db:
+        users = [User(username=f"user{i}", email=f"user{i}@example.com", hashed_password=hashed)
+                 for i in range(args.users)]
+        db.add_all(users)
+        db.commit()
+
+        events_by_user = {}
+        for user in users:
+            payloads = [EventCreate(**event_body(rng.randrange(24 * 365))) for _ in range(args.events_per_user)]
+            events_by_user[user.id] = [event.id for event in events.create_events_batch(db, user, payloads)]
+
+        shares = []
+        for owner_id, event_ids in events_by_user.items():
+            others = [user.id for user in users if user.id != owner_id]
+            for event_id in event_ids:
+                shares += [{"event_id": event_id, "user_id": user_id, "role": rng.choice(["viewer", "editor"])}
+                           for user_id in rng.sample(others, min(args.shares, len(others)))]
+        if shares:
+            db.execute(insert(Permission), shares)
+            db.commit()
+
+        for event_ids in events_by_user.values():
+            for event_id in event_ids:
+                event = events.get_event_by_id(db, event_id)
+                state = EventUpdate.model_validate(event, from_attributes=True).model_dump()
+                for n in range(args.versions):
+                    state["title"] = f"{event.title} rev {n}"
+                    events.update_event(db, event_id, EventUpdate(**state))
+
+        versions = {}
+        for event_id, version_id in db.query(EventVersion.event_id, EventVersion.id).order_by(EventVersion.id):
+            versions.setdefault(event_id, []).append(version_id)
+
+        return {
+            "users": [{"id": user.id, "username": user.username} for user in users],
+            "events": events_by_user,
+            "versions": versions,
+        }
+
+
+class Workload:
+    """Builds the i-th request for each route; request i belongs to user i % users."""
+
+    def __init__(self, data: dict, args):
+        from app.utils.security import create_access_token
+
+        self.users = data["users"]
+        self.events = data["events"]
+        self.versions = data["versions"]
+        self.batch_size = args.batch_size
+        self.last_version = 1 + args.versions
+        self.headers = {user["id"]: {"Authorization": "Bearer " + create_access_token({"sub": user["username"]})}
+                        for user in self.users}
+
+    def _pick(self, i: int):
+        user = self.users[i % len(self.users)]
+        event_ids = self.events[user["id"]]
+        return user, event_ids[(i // len(self.users)) % len(event_ids)], self.headers[user["id"]]
+
+    def build(self, route: str, i: int):
+        user, event_id, headers = self._pick(i)
+        if route == "create":
+            return "POST", "/api/events/", event_body(i), headers
+        if route == "batch":
+            return "POST", "/api/events/batch", [event_body(i * self.batch_size + n) for n in range(self.batch_size)], \
+                headers
+        if route == "list":
+            return "GET", "/api/events/?limit=50", None, headers
+        if route == "get":
+            return "GET", f"/api/events/{event_id}", None, headers
+        if route == "update":
+            return "PUT", f"/api/events/{event_id}", dict(event_body(i), title=f"Updated {i}"), headers
+        if route == "share":
+            other = self.users[(i + 1) % len(self.users)]["id"]
+            return "POST", f"/api/events/{event_id}/share", [{"user_id": other, "role": "viewer"}], headers
+        if route == "changelog":
+            return "GET", f"/api/events/{event_id}/changelog", None, headers
+        if route == "diff":
+            return "GET", f"/api/events/{event_id}/diff?from_version=1&to_version={self.last_version}", None, headers
+        if route == "rollback":
+            version_ids = self.versions[event_id]
+            return "POST", f"/api/events/{event_id}/rollback/{version_ids[i % len(version_ids)]}", None, headers
+        if route == "login":
+            return "POST", "/api/auth/login", {"username": user["username"], "password": PASSWORD}, None
+        raise ValueError(route)
+
+
+ROUTES = ("create", "batch", "list", "get", "update", "share", "changelog", "diff", "rollback", "login")
+
+
+def run_transport(args) -> list[dict]:
+    use_temp_database(f"{args.transport}.db")
+    init_schema()
+    workload = Workload(seed(args), args)
+
+    proc = None
+    if args.transport == "uvicorn":
+        proc, port = start_server()
+        connect = lambda: HttpConnection(port)  # noqa: E731
+    else:
+        from app.main import app
+
+        connect = lambda: AsgiConnection(app)  # noqa: E731
+
+    results = []
+    try:
+        for route in args.routes.split(","):
+            for clients in [int(c) for c in args.clients.split(",")]:
+                def request(conn, i, route=route):
+                    method, path, body, headers = workload.build(route, i)
+                    return conn.request(method, path, body, headers)
+
+                if args.warmup:
+                    # First calls pay for statement compilation and cold caches; keep them out of the numbers.
+                    asyncio.run(run_clients(None, 1, args.warmup, request, connect=connect))
+                stats = asyncio.run(run_clients(None, clients, args.requests, request, connect=connect))
+                results.append({"transport": args.transport, "route": route, "clients": clients, **stats})
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    return results
+
+
+def metadata(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "json")},
+    }
+
+
+def compare(results: list[dict], baseline_path: str) -> list[dict]:
+    with open(baseline_path) as f:
+        baseline = {(r["transport"], r["route"], r["clients"]): r for r in json.load(f)["results"]}
+    rows = []
+    for result in results:
+        before = baseline.get((result["transport"], result["route"], result["clients"]))
+        if before is None:
+            continue
+        rows.append({
+            "transport": result["transport"], "route": result["route"], "clients": result["clients"],
+            **{f"{metric}_change_%": _change(before[metric], result[metric]) for metric in ("rps", "p50_ms", "p99_ms")},
+        })
+    return rows
+
+
+def _change(before: float, after: float) -> float:
+    return (after - before) / before * 100 if before else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--events-per-user", type=int, default=50)
+    parser.add_argument("--shares", type=int, default=2, help="extra users each event is shared with")
+    parser.add_argument("--versions", type=int, default=5, help="updates applied to each seeded event")
+    parser.add_argument("--batch-size", type=int, default=50, help="events per /batch request")
+    parser.add_argument("--clients", default="1,16")
+    parser.add_argument("--requests", type=int, default=20, help="requests per client per route")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed requests before each measurement")
+    parser.add_argument("--routes", default=",".join(ROUTES))
+    parser.add_argument("--transports", default=",".join(TRANSPORTS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results and run metadata to this JSON file")
+    parser.add_argument("--compare", help="JSON file from an earlier --output run to diff against")
+    parser.add_argument("--json", action="store_true")
+    parser.add_argument("--transport", choices=TRANSPORTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.transport:
+        print(json.dumps(run_transport(args)))
+        return
+
+    results = []
+    for transport in args.transports.split(","):
+        output = subprocess.run([sys.executable, "-m", "benchmarks.suite", *sys.argv[1:], "--transport", transport],
+                                env=os.environ, capture_output=True, text=True, check=True).stdout
+        results += json.loads(output.strip().splitlines()[-1])
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"meta": metadata(args), "results": results}, f, indent=2)
+    report(results, args.json)
+    if args.compare:
+        print()
+        report(compare(results, args.compare), args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Rows/sec and peak memory for bulk export and import, per format.
+
+Seeds --events events (each with --versions versions) owned by one user, exports them with
+app.services.transfer in every format, then imports each export back for a second user. Peak memory
+is tracemalloc's high-water mark during a second, untimed run (tracing slows Python several times over);
+it should stay flat as --events grows.
+
+    python -m benchmarks.transfer --events 10000,100000 --versions 3 [--json]
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.common import use_temp_database, init_schema, make_user, event_payloads, Timer, report
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", default="10000,100000")
+    parser.add_argument("--versions", type=int, default=3, help="versions per event, including the first")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    init_schema()
+    from app.utils.db_utils.database import SessionLocal, ReadSessionLocal
+    from app.services import events, transfer
+    from app.schemas.events import EventBatchUpdate
+
+    results = []
+    for size in [int(s) for s in args.events.split(",")]:
+        with SessionLocal() as db:
+            owner, target, traced = (make_user(db, f"{name}{size}") for name in ("owner", "target", "traced"))
+            db.refresh(owner)
+            db.refresh(target)
+            db.expunge_all()
+        for start in range(0, size, 5000):
+            with SessionLocal() as db:
+                created = events.create_events_batch(db, owner, event_payloads(min(5000, size - start)))
+                for number in range(2, args.versions + 1):
+                    events.update_events_batch(db, owner, [
+                        EventBatchUpdate(**dict(event_in.model_dump(), title=f"Event v{number}"), id=event.id)
+                        for event, event_in in zip(created, event_payloads(len(created)))
+                    ])
+        for fmt in transfer.EXPORT_MEDIA_TYPES:
+            row = {"events": size, "format": fmt}
+            path = os.path.join(tempfile.mkdtemp(), f"export.{fmt}")
+
+            def export():
+                with ReadSessionLocal() as db, open(path, "wb") as f:
+                    for chunk in transfer.export_events(db, owner, fmt):
+                        f.write(chunk)
+
+            def load(user):
+                with open(path, "rb") as f:
+                    return transfer.import_upload(user, fmt, iter(lambda: f.read(1 << 16), b""))
+
+            with Timer() as timer:
+                export()
+            row["export_rows_per_s"] = size / timer.elapsed
+            row["file_mb"] = os.path.getsize(path) / 2 ** 20
+            with Timer() as timer:
+                job = load(target)
+            assert job.status == "done" and job.events_created == size, job
+            row["import_rows_per_s"] = job.rows_done / timer.elapsed
+
+            tracemalloc.start()
+            export()
+            row["export_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.reset_peak()
+            load(traced)
+            row["import_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            results.append(row)
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
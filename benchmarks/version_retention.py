@@ -0,0 +1,111 @@
+"""What version retention buys: event_versions rows, database size and changelog latency before and after a pass.
+
+Seeds --events events with --versions versions each, one version per day going back from today, then runs
+app.services.retention.apply_retention with the policy given on the command line. Reports the pass's rows/sec,
+the archive file's size, and GET /changelog latency (median over the events) for the live versions and with
+include_archived=true.
+
+    python -m benchmarks.version_retention --events 200 --versions 500 --keep-last 20 --keep-days 30 --thin weekly
+"""
+import argparse
+import asyncio
+import os
+import statistics
+
+from benchmarks.common import use_temp_database, init_schema, make_user, asgi_request, Timer, report
+
+
+def seed(events: int, versions_per_event: int):
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert, update
+    from app.utils.db_utils.database import SessionLocal
+    from app.models.events import Event, EventVersion
+    from app.models.permission import Permission
+    from app.services import versions
+
+    now = datetime.now()
+    with SessionLocal() as db:
+        owner = make_user(db, "bench")
+        start = datetime(2025, 1, 1, 9)
+        event_ids = list(db.scalars(insert(Event).returning(Event.id), [
+            {"title": f"Event {i}", "description": "Synthetic", "start_time": start, "end_time": start,
+             "location": "Room 1", "is_recurring": False, "owner_id": owner.id,
+             "current_version": versions_per_event} for i in range(events)
+        ]))
+        db.execute(insert(Permission), [{"event_id": event_id, "user_id": owner.id, "role": "owner"}
+                                        for event_id in event_ids])
+        for event_id in event_ids:
+            rows, previous = [], None
+            for number in range(1, versions_per_event + 1):
+                current = {"title": f"Edit {number}", "description": "Synthetic", "start_time": start,
+                           "end_time": start, "location": f"Room {number % 7}", "is_recurring": False,
+                           "recurrence_pattern": None}
+                row = versions.version_row(event_id, owner.id, number, current, previous)
+                row["created_at"] = now - timedelta(days=versions_per_event - number, hours=1)
+                rows.append(row)
+                previous = current
+            db.execute(insert(EventVersion), rows)
+        db.execute(update(Event).values(title=f"Edit {versions_per_event}"))
+        db.commit()
+        return event_ids
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--versions", type=int, default=500, help="versions per event, one per day")
+    parser.add_argument("--keep-last", type=int, default=20)
+    parser.add_argument("--keep-days", type=int, default=30)
+    parser.add_argument("--thin", default="weekly", choices=["", "daily", "weekly"])
+    parser.add_argument("--samples", type=int, default=20, help="events whose changelog is timed")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    path = use_temp_database()
+    os.environ.update(VERSION_KEEP_LAST=str(args.keep_last), VERSION_KEEP_DAYS=str(args.keep_days),
+                      VERSION_THIN=args.thin)
+    init_schema()
+    event_ids = seed(args.events, args.versions)
+    from sqlalchemy import text
+    from app.main import app
+    from app.models.events import EventVersion
+    from app.services import retention, versions
+    from app.utils.db_utils.database import SessionLocal
+    from app.utils.security import create_access_token
+
+    headers = {"Authorization": "Bearer " + create_access_token({"sub": "bench"})}
+    sample = event_ids[:args.samples]
+
+    def changelog_ms(query: str = "") -> float:
+        async def timed():
+            times = []
+            for event_id in sample:
+                with Timer() as timer:
+                    status, _, _ = await asgi_request(app, "GET", f"/api/events/{event_id}/changelog{query}", headers)
+                assert status == 200, status
+                times.append(timer.elapsed * 1000)
+            return statistics.median(times)
+        return asyncio.run(timed())
+
+    def snapshot(stage: str) -> dict:
+        with SessionLocal() as db:
+            rows = db.query(EventVersion).count()
+            db.execute(text("VACUUM"))
+            db.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        archive = versions.VERSION_ARCHIVE_PATH
+        return {"stage": stage, "version_rows": rows, "db_mb": os.path.getsize(path) / 2 ** 20,
+                "archive_mb": os.path.getsize(archive) / 2 ** 20 if os.path.exists(archive) else 0.0,
+                "changelog_ms": changelog_ms(), "with_archive_ms": changelog_ms("?include_archived=true")}
+
+    results = [snapshot("before")]
+    with SessionLocal() as db, Timer() as timer:
+        retention.apply_retention(db)
+    results.append(snapshot("after"))
+    pruned = results[0]["version_rows"] - results[1]["version_rows"]
+    results[1]["pruned_rows_per_s"] = pruned / timer.elapsed
+    results[0]["pruned_rows_per_s"] = 0.0
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
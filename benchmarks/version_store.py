@@ -0,0 +1,84 @@
+"""Storage size and reconstruction latency: delta versions with checkpoints vs. full snapshots.
+
+A full-snapshot store is the delta store with VERSION_CHECKPOINT_INTERVAL=1.
+
+    python -m benchmarks.version_store --events 50 --edits 100 [--json]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+
+from benchmarks.common import use_temp_database, init_schema, make_user, event_payloads, percentile, Timer, report
+
+
+def run_scheme(args):
+    path = use_temp_database()
+    init_schema()
+    from sqlalchemy import text
+    from app.utils.db_utils.database import SessionLocal, engine
+    from app.schemas.events import EventUpdate
+    from app.services import events, versions
+
+    random.seed(0)
+    description = "Agenda. " * 500
+    with SessionLocal() as db:
+        user = make_user(db, "bench")
+        created = [events.create_event(db, user, e.model_copy(update={"description": description}))
+                   for e in event_payloads(args.events)]
+        for event in created:
+            state = versions.snapshot(event)
+            for edit in range(args.edits):
+                if edit % 5 == 4:
+                    state["description"] = description + f" Revision {edit}."
+                else:
+                    state[random.choice(["title", "location"])] = f"Edit {edit}"
+                events.update_event(db, event.id, EventUpdate(**state))
+
+        pairs = db.execute(text("SELECT event_id, id FROM event_versions")).all()
+        samples = []
+        for event_id, version_id in random.sample(pairs, min(args.samples, len(pairs))):
+            with Timer() as timer:
+                events.get_event_version(db, event_id, version_id)
+            samples.append(timer.elapsed)
+
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    return {
+        "scheme": args.scheme,
+        "versions": len(pairs),
+        "db_size_mb": os.path.getsize(path) / 1e6,
+        "rebuild_p50_ms": percentile(samples, 50) * 1000,
+        "rebuild_p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--edits", type=int, default=100)
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--scheme", choices=["snapshot", "delta"])
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    if args.scheme:
+        print(json.dumps(run_scheme(args)))
+        return
+
+    results = []
+    for scheme, interval in (("snapshot", "1"), ("delta", os.environ.get("VERSION_CHECKPOINT_INTERVAL", "10"))):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.version_store", "--scheme", scheme, "--events", str(args.events),
+             "--edits", str(args.edits), "--samples", str(args.samples)],
+            env={**os.environ, "VERSION_CHECKPOINT_INTERVAL": interval},
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
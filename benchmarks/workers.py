@@ -0,0 +1,114 @@
+"""Throughput of `python -m app.serve` as the worker count grows, and how fast workers see each other's writes.
+
+Each run starts the server with --workers N on the same database and drives --clients connections through a
+read mix (event list and single events). Coherence is the time from revoking a share until every client
+connection, spread over the workers by the kernel, gets 403 for the event; it is bounded by
+INVALIDATION_POLL_INTERVAL. Scaling stops at the number of cores.
+
+    python -m benchmarks.workers --workers 1,2,4 --clients 64 --requests 200 [--json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+from benchmarks.common import (use_temp_database, start_server, free_port, HttpConnection, run_clients, percentile,
+                               report)
+
+PASSWORD = "benchmark-password"
+EVENT = {"title": "Review", "start_time": "2025-01-01T09:00:00", "end_time": "2025-01-01T10:00:00"}
+
+
+async def register(conn: HttpConnection, username: str) -> dict:
+    body = {"username": username, "email": f"{username}@example.com", "password": PASSWORD}
+    _, _, data = await conn.request("POST", "/api/auth/register", body)
+    return {"Authorization": f"Bearer {json.loads(data)['access_token']}"}
+
+
+async def seed(port: int, events: int) -> dict:
+    conn = HttpConnection(port)
+    owner, reader = await register(conn, "owner"), await register(conn, "reader")
+    _, _, data = await conn.request("POST", "/api/events/batch", [dict(EVENT, title=f"Review {i}")
+                                                                  for i in range(events)], owner)
+    event_ids = [event["id"] for event in json.loads(data)]
+    await conn.close()
+    # The reader is user 2 in a fresh database.
+    return {"owner": owner, "reader": reader, "reader_id": 2, "event_ids": event_ids}
+
+
+async def throughput(port: int, seeded: dict, clients: int, requests: int) -> dict:
+    owner, event_ids = seeded["owner"], seeded["event_ids"]
+
+    def make_request(conn, i):
+        if i % 4 == 0:
+            return conn.request("GET", "/api/events/?limit=20", headers=owner)
+        return conn.request("GET", f"/api/events/{event_ids[i % len(event_ids)]}", headers=owner)
+
+    return await run_clients(port, clients, requests, make_request)
+
+
+async def coherence(port: int, seeded: dict, clients: int, rounds: int) -> list[float]:
+    owner, reader, event_id = seeded["owner"], seeded["reader"], seeded["event_ids"][0]
+    writer = HttpConnection(port)
+    conns = [HttpConnection(port) for _ in range(clients)]
+    lags = []
+    for _ in range(rounds):
+        await writer.request("POST", f"/api/events/{event_id}/share",
+                             [{"user_id": seeded["reader_id"], "role": "viewer"}], owner)
+        # Let every worker pick up the share, then cache the reader's role on each connection.
+        await asyncio.sleep(1)
+        await asyncio.gather(*(conn.request("GET", f"/api/events/{event_id}", headers=reader) for conn in conns))
+        started = time.perf_counter()
+        await writer.request("DELETE", f"/api/events/{event_id}/permissions/{seeded['reader_id']}", headers=owner)
+
+        async def until_denied(conn):
+            while (await conn.request("GET", f"/api/events/{event_id}", headers=reader))[0] != 403:
+                pass
+            lags.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(until_denied(conn) for conn in conns))
+    for conn in [writer, *conns]:
+        await conn.close()
+    return lags
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    use_temp_database()
+    seeded, results = None, []
+    for workers in map(int, args.workers.split(",")):
+        port = free_port()
+        command = [sys.executable, "-m", "app.serve", "--workers", str(workers), "--host", "127.0.0.1",
+                   "--port", str(port), "--log-level", "warning"]
+        proc, port = start_server(port=port, args=command)
+        try:
+            if seeded is None:
+                seeded = asyncio.run(seed(port, args.events))
+            asyncio.run(throughput(port, seeded, args.clients, 10))  # warm up every worker
+            row = {"workers": workers, **asyncio.run(throughput(port, seeded, args.clients, args.requests))}
+            lags = asyncio.run(coherence(port, seeded, min(args.clients, 16), args.rounds))
+            row["coherence_p50_ms"] = percentile(lags, 50) * 1000
+            row["coherence_max_ms"] = max(lags) * 1000
+            results.append(row)
+        finally:
+            proc.terminate()
+            proc.wait()
+    for row in results:
+        row["speedup"] = row["rps"] / results[0]["rps"]
+    report(results, args.json)
+    if not args.json:
+        print(f"cores: {os.cpu_count()}")
+
+
+if __name__ == "__main__":
+    main()
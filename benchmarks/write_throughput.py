@@ -0,0 +1,63 @@
+"""Writes/sec for POST /api/events/ at increasing client concurrency, with and without group commit.
+
+"per-request" is every request committing on its own pooled connection (SQLITE_GROUP_COMMIT=false);
+"group" funnels writes through the single writer. Use --synchronous FULL to count an fsync per commit.
+
+    python -m benchmarks.write_throughput --clients 1,8,32,128 --requests 50 [--synchronous FULL] [--json]
+"""
+import argparse
+import asyncio
+import json
+import resource
+
+from benchmarks.common import use_temp_database, start_server, run_clients, HttpConnection, report
+
+
+async def login(port: int) -> dict:
+    conn = HttpConnection(port)
+    user = {"username": "bench", "email": "bench@example.com", "password": "benchmark-pw"}
+    status, _, body = await conn.request("POST", "/api/auth/register", user)
+    if status != 200:
+        status, _, body = await conn.request("POST", "/api/auth/login", user)
+    await conn.close()
+    return {"Authorization": "Bearer " + json.loads(body)["access_token"]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", default="1,8,32,128")
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--synchronous", default="NORMAL", choices=["OFF", "NORMAL", "FULL"])
+    parser.add_argument("--async-mode", action="store_true")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    results = []
+    for mode in ("per-request", "group"):
+        use_temp_database(f"{mode}.db")
+        proc, port = start_server({
+            "SQLITE_GROUP_COMMIT": "true" if mode == "group" else "false",
+            "SQLITE_SYNCHRONOUS": args.synchronous,
+            "ASYNC_MODE": "true" if args.async_mode else "false",
+        })
+        try:
+            headers = asyncio.run(login(port))
+            for clients in [int(c) for c in args.clients.split(",")]:
+                def request(conn, i):
+                    event = {"title": f"Write {i}", "start_time": "2025-01-01T09:00:00",
+                             "end_time": "2025-01-01T10:00:00"}
+                    return conn.request("POST", "/api/events/", event, headers)
+
+                stats = asyncio.run(run_clients(port, clients, args.requests, request))
+                results.append({"mode": mode, "clients": clients, **stats})
+        finally:
+            proc.terminate()
+            proc.wait()
+    report(results, args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+import os
+import tempfile
+
+# The engine reads DATABASE_URL when app/ is first imported, so point it at a throwaway file first.
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='neofi-test-'), 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret")
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from app.models.permission import Permission
+from app.models.user import User
+from app.schemas.events import EventCreate, EventUpdate, EventBatchUpdate, PermissionShare
+from app.services import events
+from app.utils.db_utils.database import SessionLocal, init_db
+
+START = datetime(2025, 3, 1, 9)
+
+
+def make_user(db, username: str) -> User:
+    user = User(username=username, email=f"{username}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def pages(db, user, size: int) -> list[int]:
+    ids, after = [], None
+    while page := events.list_events(db, user, limit=size, after=after):
+        ids.extend(event.id for event in page)
+        after = (page[-1].start_time, page[-1].id)
+    return ids
+
+
+def test_pages_follow_start_time_through_every_write_path():
+    init_db()
+    with SessionLocal() as db:
+        owner, guest, viewer = make_user(db, "pager"), make_user(db, "pager-guest"), make_user(db, "pager-viewer")
+        created = events.create_events_batch(db, owner, [
+            EventCreate(title=f"E{i}", start_time=START + timedelta(hours=i), end_time=START + timedelta(hours=i + 1))
+            for i in range(10)
+        ])
+        ids = [event.id for event in created]
+        events.share_permission(db, ids[0], [PermissionShare(user_id=guest.id, role="editor")])
+        db.execute(insert(Permission), [{"event_id": event_id, "user_id": viewer.id, "role": "viewer"}
+                                        for event_id in ids])
+        db.commit()
+
+        events.update_event(db, ids[0], EventUpdate(title="E0", start_time=START + timedelta(days=1),
+                                                    end_time=START + timedelta(days=1, hours=1)))
+        events.update_events_batch(db, owner, [EventBatchUpdate(id=ids[1], title="E1",
+                                                                start_time=START - timedelta(days=1),
+                                                                end_time=START - timedelta(hours=23))])
+
+        expected = sorted(ids, key=lambda event_id: (db.get(events.Event, event_id).start_time, event_id))
+        assert expected[0] == ids[1] and expected[-1] == ids[0]
+        for user in (owner, viewer):
+            assert pages(db, user, 3) == expected
+        assert pages(db, guest, 3) == [ids[0]]
+        in_window = events.list_events(db, owner, end=START + timedelta(hours=4))
+        assert [event.id for event in in_window] == expected[:3]
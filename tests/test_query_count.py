@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app.models.permission import Permission
+from app.models.user import User
+from app.schemas.events import EventCreate, EventOut
+from app.services import events
+from app.utils.db_utils.database import SessionLocal, init_db
+from app.utils.db_utils.writer import as_schema
+from app.utils.metrics import current_request, RequestStats
+
+SIZES = (1, 10, 100)
+SHARES = (0, 3, 20)
+
+PATHS = {
+    "list": lambda db, owner, event_ids, n: as_schema(events.list_events(db, owner, limit=n), EventOut),
+    "list permissions_limit=1": lambda db, owner, event_ids, n: as_schema(
+        events.list_events(db, owner, limit=n, permissions_limit=1), EventOut),
+    "list permissions_limit=0": lambda db, owner, event_ids, n: as_schema(
+        events.list_events(db, owner, limit=n, permissions_limit=0), EventOut),
+    "stream": lambda db, owner, event_ids, n: [EventOut.model_validate(event, from_attributes=True)
+                                    for event in events.stream_events(db, owner, 1000, limit=n)],
+    "batch create result": lambda db, owner, event_ids, n: as_schema(
+        events._load_events(db, event_ids[:n]), EventOut),
+}
+
+
+def count_queries(fn) -> int:
+    stats = RequestStats()
+    token = current_request.set(stats)
+    try:
+        fn()
+    finally:
+        current_request.reset(token)
+    return stats.queries
+
+
+def make_user(db, username: str) -> User:
+    user = User(username=username, email=f"{username}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture(scope="module")
+def owners():
+    """One owner per share count, each with max(SIZES) events shared with that many other users."""
+    init_db()
+    start = datetime(2025, 1, 1, 9)
+    payloads = [EventCreate(title=f"Event {i}", start_time=start + timedelta(hours=i),
+                            end_time=start + timedelta(hours=i, minutes=30)) for i in range(max(SIZES))]
+    owners = {}
+    with SessionLocal() as db:
+        for shares in SHARES:
+            owner = make_user(db, f"owner{shares}")
+            guests = [make_user(db, f"guest{shares}-{i}") for i in range(shares)]
+            event_ids = [event.id for event in events.create_events_batch(db, owner, payloads)]
+            if guests:
+                db.execute(insert(Permission), [{"event_id": event_id, "user_id": guest.id, "role": "viewer"}
+                                                for event_id in event_ids for guest in guests])
+                db.commit()
+            owners[shares] = (owner.id, event_ids)
+    return owners
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_statement_count_is_constant(owners, path):
+    owner_id, event_ids = owners[0]
+    with SessionLocal() as db:
+        # Warm up one-off lookups that are cached per engine (e.g. which indexes exist).
+        PATHS[path](db, db.get(User, owner_id), event_ids, 1)
+    counts = {}
+    for shares, (owner_id, event_ids) in owners.items():
+        for size in SIZES:
+            with SessionLocal() as db:
+                owner = db.get(User, owner_id)
+                result = []
+                counts[shares, size] = count_queries(
+                    lambda: result.extend(PATHS[path](db, owner, event_ids, size)))
+                assert len(result) == size
+                if path == "list permissions_limit=0":
+                    assert all(event.permissions == [] for event in result)
+                elif path == "list permissions_limit=1":
+                    assert all(len(event.permissions) == 1 for event in result)
+                else:
+                    assert all(len(event.permissions) == shares + 1 for event in result)
+    assert len(set(counts.values())) == 1, counts
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from app.models.events import Event, EventOccurrence
+from app.models.permission import Permission
+from app.models.user import User
+from app.schemas.events import EventCreate
+from app.services.recurrence import (RECURRENCE_HORIZON_DAYS, RECURRENCE_LOOKBACK_DAYS, occurrences_for,
+                                     refresh_all_occurrences, list_occurrences)
+from app.utils.db_utils.database import SessionLocal, init_db
+from app.utils.recurrence import RecurrenceError, parse_rule, expand, ends_before
+
+MONDAY = datetime(2026, 1, 5, 9)
+HOUR = timedelta(hours=1)
+
+
+@pytest.mark.parametrize("pattern", [
+    "FREQ=DAILY;INTERVAL=1000000000",
+    "FREQ=WEEKLY;INTERVAL=0",
+    "FREQ=DAILY;UNTIL=2026-01-20T00:00:00+05:00",
+    "FREQ=DAILY;UNTIL=20260120T000000Z",
+    "FREQ=MONTHLY;BYDAY=1MO",
+    "FREQ=MONTHLY;BYDAY=-1FR",
+])
+def test_rejected_patterns(pattern):
+    with pytest.raises(RecurrenceError):
+        parse_rule(pattern)
+    with pytest.raises(ValidationError):
+        EventCreate(title="t", start_time=MONDAY, end_time=MONDAY + HOUR, is_recurring=True,
+                    recurrence_pattern=pattern)
+
+
+def test_local_until_and_plain_byday_accepted():
+    rule = parse_rule("FREQ=WEEKLY;BYDAY=mo, fr;UNTIL=2026-01-20T00:00:00")
+    assert rule.by_day == (0, 4)
+    assert rule.until == datetime(2026, 1, 20)
+
+
+def test_byday_that_never_matches_terminates():
+    rule = parse_rule("FREQ=DAILY;INTERVAL=7;BYDAY=TU")
+    assert list(expand(rule, MONDAY, HOUR, MONDAY, MONDAY + timedelta(days=3650))) == []
+    assert list(expand(rule, MONDAY, HOUR, MONDAY, datetime.max)) == []
+
+
+def test_count_rule_that_never_matches_ends():
+    rule = parse_rule("FREQ=DAILY;INTERVAL=7;BYDAY=TU;COUNT=3")
+    assert ends_before(rule, MONDAY, MONDAY + timedelta(days=365))
+
+
+def test_expansion_stops_at_datetime_max():
+    # Every 1000 months: the 97th occurrence would be past year 9999.
+    rule = parse_rule("FREQ=MONTHLY;INTERVAL=1000;COUNT=200")
+    starts = [start for start, _ in expand(rule, MONDAY, HOUR, MONDAY, datetime.max)]
+    assert len(starts) == 96 and starts[-1].year > 9900
+    assert ends_before(rule, MONDAY, datetime(9999, 1, 1))
+
+
+def test_plain_rules_unchanged():
+    rule = parse_rule("FREQ=WEEKLY;BYDAY=MO,WE;COUNT=4")
+    starts = [start for start, _ in expand(rule, MONDAY, HOUR, MONDAY, MONDAY + timedelta(days=60))]
+    assert starts == [MONDAY, MONDAY + timedelta(days=2), MONDAY + timedelta(days=7), MONDAY + timedelta(days=9)]
+
+
+def old_daily_event(**fields):
+    start = datetime(2000, 1, 3, 9)
+    return SimpleNamespace(start_time=start, end_time=start + HOUR, is_recurring=True,
+                           recurrence_pattern="FREQ=DAILY", **fields)
+
+
+def test_old_event_is_indexed_from_the_lookback():
+    now = datetime.now()
+    spans, since, until = occurrences_for(old_daily_event())
+    assert since > now - timedelta(days=RECURRENCE_LOOKBACK_DAYS + 1)
+    assert spans[0][1] > since and spans[-1][0] < until
+    assert until > now + timedelta(days=RECURRENCE_HORIZON_DAYS - 1)
+    assert len(spans) <= RECURRENCE_LOOKBACK_DAYS + RECURRENCE_HORIZON_DAYS + 1
+
+
+def test_refresh_of_old_event_terminates_and_old_windows_still_expand():
+    init_db()
+    with SessionLocal() as db:
+        user = User(username="recurring", email="recurring@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        # Written before the index existed: never expanded.
+        event = Event(title="Standup", owner_id=user.id, **vars(old_daily_event()))
+        db.add(event)
+        db.flush()
+        db.add(Permission(user_id=user.id, event_id=event.id, role="owner"))
+        db.commit()
+
+        refresh_all_occurrences(db)
+        db.expire_all()
+        assert event.occurrences_until > datetime.now() + timedelta(days=RECURRENCE_HORIZON_DAYS // 2)
+        indexed = db.query(EventOccurrence).filter_by(event_id=event.id).count()
+        assert indexed <= RECURRENCE_LOOKBACK_DAYS + RECURRENCE_HORIZON_DAYS + 1
+
+        # A second run finds nothing stale.
+        refresh_all_occurrences(db)
+        assert db.query(EventOccurrence).filter_by(event_id=event.id).count() == indexed
+
+        week = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(days=7)
+        assert [o["start_time"] for o in list_occurrences(db, user, week, week + timedelta(days=7))] == [
+            week + timedelta(days=day, hours=9) for day in range(7)]
+        old_week = datetime(2001, 1, 1)
+        assert len(list_occurrences(db, user, old_week, old_week + timedelta(days=7))) == 7
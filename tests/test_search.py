@@ -0,0 +1,17 @@
+from app.services.search import highlight, _like_pattern
+
+
+def test_snippet_text_is_escaped():
+    snippet = 'x<img src=x onerror="alert(1)"> \x02standup\x03 & <b>notes</b>…'
+    assert highlight(snippet) == ('x&lt;img src=x onerror=&quot;alert(1)&quot;&gt; <mark>standup</mark> &amp; '
+                                  '&lt;b&gt;notes&lt;/b&gt;…')
+
+
+def test_no_snippet():
+    assert highlight(None) is None
+
+
+def test_like_pattern_is_literal():
+    assert _like_pattern("a_b") == "%a\\_b%"
+    assert _like_pattern("50%") == "%50\\%%"
+    assert _like_pattern("a\\b") == "%a\\\\b%"